@@ -11,8 +11,13 @@ SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-product
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Short-lived tokens for EventSource, which can only pass credentials in the URL
+STREAM_TOKEN_SCOPE = "run_events"
+STREAM_TOKEN_EXPIRE_SECONDS = 60
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def hash_password(password: str) -> str:
     """Hash a password for storing."""
@@ -55,16 +60,59 @@ def decode_token(token: str) -> dict:
             detail="Could not validate credentials"
         )
 
+def create_stream_token(user: dict) -> str:
+    """Create a short-lived token that only opens run event streams."""
+    return create_access_token(
+        {"sub": user["id"], "username": user.get("username"), "scope": STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+
+def _user_from_payload(payload: dict) -> dict:
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+    
+    return {"id": user_id, "username": payload.get("username")}
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Dependency to get current authenticated user."""
     token = credentials.credentials
     payload = decode_token(token)
     
-    user_id = payload.get("sub")
-    if user_id is None:
+    # Scoped tokens (stream tokens) are not valid for the rest of the API
+    if payload.get("scope"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
     
-    return {"id": user_id, "username": payload.get("username")}
+    return _user_from_payload(payload)
+
+async def get_current_user_for_stream(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> dict:
+    """
+    Authenticate an event stream by bearer header or by a stream token in ?token=.
+    
+    Only short-lived stream tokens are accepted in the URL, so regular access
+    tokens never end up in proxy or access logs.
+    """
+    if credentials is not None:
+        return await get_current_user(credentials)
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
+    
+    payload = decode_token(token)
+    if payload.get("scope") != STREAM_TOKEN_SCOPE:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Pass a stream token from POST /runs/events/token, not an access token"
+        )
+    return _user_from_payload(payload)
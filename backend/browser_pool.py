@@ -0,0 +1,323 @@
+"""
+Browser Pool for sharing warm Chromium instances across scraping runs.
+Runs lease isolated BrowserContexts instead of launching their own browser.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set
+from playwright.async_api import async_playwright, Browser, BrowserContext
+
+logger = logging.getLogger(__name__)
+
+BROWSER_LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process'
+]
+
+# How often acquire_context re-reads browser memory from /proc
+MEMORY_CHECK_INTERVAL = 10.0
+
+
+class _BrowserSlot:
+    """A launched browser plus the bookkeeping needed to recycle it."""
+
+    def __init__(self, browser: Browser, pid: Optional[int] = None):
+        self.browser = browser
+        self.pid = pid  # Root process of this browser's process tree, if it could be found
+        self.active_contexts = 0
+        self.total_contexts = 0
+        self.retiring = False
+
+
+class BrowserPool:
+    """Process-wide pool of long-lived browsers handing out isolated contexts."""
+
+    def __init__(
+        self,
+        max_browsers: int = 2,
+        max_contexts_per_browser: int = 8,
+        recycle_after_contexts: int = 100,
+        memory_threshold_mb: Optional[int] = None
+    ):
+        self.max_browsers = max_browsers
+        self.max_contexts_per_browser = max_contexts_per_browser
+        self.recycle_after_contexts = recycle_after_contexts
+        # Default: half of the machine's memory for all pooled browsers together
+        self.memory_threshold_mb = memory_threshold_mb if memory_threshold_mb is not None else _default_memory_threshold_mb()
+        self._last_memory_check = 0.0
+
+        self.playwright = None
+        self.slots: List[_BrowserSlot] = []
+        self.context_slots: Dict[BrowserContext, _BrowserSlot] = {}
+        self._condition: Optional[asyncio.Condition] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def start(self):
+        """Start Playwright (browsers are launched lazily on first lease)."""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+                logger.info("Browser pool started")
+
+    async def acquire_context(self, **context_options) -> BrowserContext:
+        """
+        Lease a new isolated context from the least loaded browser.
+
+        Waits when every browser is at its context cap and no more browsers
+        may be launched. The lease ends when the context is closed.
+        """
+        await self.start()
+        condition = self._get_condition()
+
+        async with condition:
+            while True:
+                self._drop_disconnected_slots()
+                await self._retire_if_over_memory()
+                slot = self._pick_slot()
+                if slot is None and self._live_slot_count() < self.max_browsers:
+                    slot = await self._launch_slot()
+                if slot is not None:
+                    break
+                await condition.wait()
+
+            slot.active_contexts += 1
+            slot.total_contexts += 1
+            if slot.total_contexts >= self.recycle_after_contexts:
+                logger.info(f"Browser reached {slot.total_contexts} contexts, recycling after current leases")
+                slot.retiring = True
+
+        try:
+            context = await slot.browser.new_context(**context_options)
+        except Exception:
+            await self._release_slot(slot)
+            raise
+
+        self.context_slots[context] = slot
+        context.on("close", lambda _: asyncio.ensure_future(self._on_context_closed(context)))
+        return context
+
+    async def release_context(self, context: BrowserContext):
+        """End a lease by closing the context."""
+        try:
+            await context.close()
+        except Exception as e:
+            logger.debug(f"Error closing leased context: {str(e)}")
+        await self._on_context_closed(context)
+
+    async def _on_context_closed(self, context: BrowserContext):
+        slot = self.context_slots.pop(context, None)
+        if slot is not None:
+            await self._release_slot(slot)
+
+    async def _release_slot(self, slot: _BrowserSlot):
+        condition = self._get_condition()
+        async with condition:
+            slot.active_contexts -= 1
+            if slot.retiring and slot.active_contexts <= 0:
+                await self._close_slot(slot)
+            condition.notify_all()
+
+    async def _on_browser_disconnected(self, slot: _BrowserSlot):
+        condition = self._get_condition()
+        async with condition:
+            self._drop_disconnected_slots()
+            condition.notify_all()
+
+    def _drop_disconnected_slots(self):
+        """Forget browsers that crashed or disconnected so they no longer count toward the pool."""
+        for slot in [slot for slot in self.slots if not slot.browser.is_connected()]:
+            self.slots.remove(slot)
+            logger.warning(f"Pooled browser disconnected after {slot.total_contexts} contexts. Browsers in pool: {len(self.slots)}")
+
+    def _pick_slot(self) -> Optional[_BrowserSlot]:
+        candidates = [
+            slot for slot in self.slots
+            if not slot.retiring
+            and slot.browser.is_connected()
+            and slot.active_contexts < self.max_contexts_per_browser
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda slot: slot.active_contexts)
+
+    def _live_slot_count(self) -> int:
+        # Retiring browsers only drain their leases, so a replacement may launch beside them
+        return len([slot for slot in self.slots if slot.browser.is_connected() and not slot.retiring])
+
+    async def _launch_slot(self) -> _BrowserSlot:
+        known_roots = _browser_root_pids(_process_table())
+        browser = await self.playwright.chromium.launch(headless=True, args=BROWSER_LAUNCH_ARGS)
+        new_roots = _browser_root_pids(_process_table()) - known_roots
+        slot = _BrowserSlot(browser, pid=new_roots.pop() if len(new_roots) == 1 else None)
+        self.slots.append(slot)
+        browser.on("disconnected", lambda _: asyncio.ensure_future(self._on_browser_disconnected(slot)))
+        logger.info(f"Launched pooled browser. Browsers in pool: {len(self.slots)}")
+        return slot
+
+    async def _close_slot(self, slot: _BrowserSlot):
+        if slot in self.slots:
+            self.slots.remove(slot)
+        try:
+            await slot.browser.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled browser: {str(e)}")
+        logger.info(f"Recycled pooled browser after {slot.total_contexts} contexts. Browsers in pool: {len(self.slots)}")
+
+    async def _retire_if_over_memory(self):
+        """
+        Recycle the largest browser when pooled browsers together exceed the memory threshold.
+
+        Memory is read at most every MEMORY_CHECK_INTERVAL seconds, and only one
+        browser is retired at a time so the pool stays warm while it drains.
+        """
+        if not self.memory_threshold_mb or not self.slots:
+            return
+        if any(slot.retiring for slot in self.slots):
+            return
+        now = time.monotonic()
+        if now - self._last_memory_check < MEMORY_CHECK_INTERVAL:
+            return
+        self._last_memory_check = now
+
+        usage = self._slot_rss_mb()
+        total_mb = sum(usage.values())
+        if total_mb < self.memory_threshold_mb or not usage:
+            return
+        slot = max(usage, key=usage.get)
+        logger.warning(
+            f"Browser memory at {total_mb:.0f}MB (threshold {self.memory_threshold_mb}MB), "
+            f"recycling the largest browser ({usage[slot]:.0f}MB)"
+        )
+        slot.retiring = True
+        if slot.active_contexts <= 0:
+            await self._close_slot(slot)
+
+    def _slot_rss_mb(self) -> Dict[_BrowserSlot, float]:
+        """Resident memory of each pooled browser's process tree."""
+        table = _process_table()
+        return {
+            slot: _tree_rss_mb(table, slot.pid)
+            for slot in self.slots
+            if slot.pid is not None and slot.browser.is_connected()
+        }
+
+    def get_status(self) -> Dict:
+        """Get current status of the browser pool."""
+        self._drop_disconnected_slots()
+        return {
+            "browsers": len(self.slots),
+            "max_browsers": self.max_browsers,
+            "active_contexts": sum(slot.active_contexts for slot in self.slots),
+            "contexts_per_browser": [slot.total_contexts for slot in self.slots],
+            "retiring": len([slot for slot in self.slots if slot.retiring]),
+            "rss_mb": round(sum(self._slot_rss_mb().values()), 1),
+            "memory_threshold_mb": self.memory_threshold_mb
+        }
+
+    async def close(self):
+        """Close all pooled browsers and stop Playwright."""
+        for context in list(self.context_slots.keys()):
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self.context_slots.clear()
+
+        for slot in list(self.slots):
+            await self._close_slot(slot)
+
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+        logger.info("Browser pool closed")
+
+
+def _process_table() -> Dict[int, tuple]:
+    """pid -> (parent pid, command name, rss pages) for every process, read from /proc."""
+    table = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return table
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, fields after it are fixed
+        name = stat[stat.find('(') + 1:stat.rfind(')')]
+        fields = stat[stat.rfind(')') + 2:].split()
+        table[int(entry)] = (int(fields[1]), name, int(fields[21]))
+    return table
+
+def _descendants(table: Dict[int, tuple], root: int) -> Set[int]:
+    children: Dict[int, List[int]] = {}
+    for pid, (parent, _, _) in table.items():
+        children.setdefault(parent, []).append(pid)
+    found = set()
+    frontier = [root]
+    while frontier:
+        for child in children.get(frontier.pop(), []):
+            if child not in found:
+                found.add(child)
+                frontier.append(child)
+    return found
+
+def _is_browser(name: str) -> bool:
+    return 'chrom' in name.lower() or 'headless_shell' in name
+
+def _browser_root_pids(table: Dict[int, tuple]) -> Set[int]:
+    """Top-level browser processes under this process (one per launched browser)."""
+    return {
+        pid for pid in _descendants(table, os.getpid())
+        if _is_browser(table[pid][1]) and not _is_browser(table.get(table[pid][0], (0, '', 0))[1])
+    }
+
+def _tree_rss_mb(table: Dict[int, tuple], root: int) -> float:
+    """Resident memory of a process and all its descendants."""
+    if root not in table:
+        return 0.0
+    pids = _descendants(table, root) | {root}
+    return sum(table[pid][2] for pid in pids) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def _default_memory_threshold_mb() -> int:
+    """Half of physical memory, or 4GB when it cannot be read."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) // 1024 // 2
+    except (OSError, ValueError, IndexError):
+        pass
+    return 4096
+
+
+# Global browser pool instance
+browser_pool = BrowserPool(
+    max_browsers=int(os.environ.get('BROWSER_POOL_MAX_BROWSERS', '2')),
+    max_contexts_per_browser=int(os.environ.get('BROWSER_POOL_MAX_CONTEXTS', '8')),
+    recycle_after_contexts=int(os.environ.get('BROWSER_POOL_RECYCLE_AFTER', '100')),
+    memory_threshold_mb=int(os.environ['BROWSER_POOL_MEMORY_MB']) if os.environ.get('BROWSER_POOL_MEMORY_MB') else None
+)
+
+def get_browser_pool() -> BrowserPool:
+    """Get the global browser pool instance."""
+    return browser_pool
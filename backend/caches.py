@@ -0,0 +1,417 @@
+"""
+Shared caches for scraped data that outlive a single run.
+
+Entries live either in MongoDB or in a local SQLite file. Both backends
+expire entries after a TTL and evict the least recently used ones once
+they hold more than max_entries. CACHE_BACKEND (mongo, disk or off) and
+CACHE_PATH select the storage for every cache; TTLs and sizes are set per
+cache (PLACE_CACHE_*, ENRICHMENT_CACHE_*, SEARCH_CACHE_*).
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / 'cache' / 'scrapi_cache.sqlite3'
+
+# Hosts that serve pages for many unrelated businesses; these are cached per page, not per domain
+SHARED_HOSTS = {
+    'facebook.com', 'instagram.com', 'linkedin.com', 'twitter.com', 'x.com', 'tiktok.com',
+    'youtube.com', 'google.com', 'sites.google.com', 'business.site', 'linktr.ee',
+    'yelp.com', 'tripadvisor.com', 'wixsite.com', 'wordpress.com', 'blogspot.com'
+}
+
+class MongoCacheBackend:
+    """Cache entries stored in a MongoDB collection."""
+
+    def __init__(self, db, collection_name: str, ttl_seconds: int, max_entries: int, evict_every: int = 100):
+        self.collection = db[collection_name]
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._writes = 0
+        self._indexes_ready = False
+
+    async def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        # key and accessed_at indexes come from the registry in db_indexes; the TTL depends on settings
+        try:
+            await self.collection.create_index("stored_at", expireAfterSeconds=self.ttl_seconds)
+        except Exception as e:
+            # An existing TTL index with another expiry; reads still enforce the configured TTL
+            logger.warning(f"Could not create TTL index on {self.collection.name}: {str(e)}")
+        self._indexes_ready = True
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        await self._ensure_indexes()
+        return await self.collection.find_one_and_update(
+            {"key": key},
+            {"$set": {"accessed_at": datetime.now(timezone.utc)}},
+            projection={"_id": 0}
+        )
+
+    async def set(self, key: str, value: Any, **meta):
+        await self._ensure_indexes()
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"key": key},
+            {"$set": {"value": value, "stored_at": now, "accessed_at": now, **meta}},
+            upsert=True
+        )
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            await self._evict()
+
+    async def delete(self, key: str):
+        await self.collection.delete_one({"key": key})
+
+    async def _evict(self):
+        """Drop the least recently used entries above max_entries."""
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = await self.collection.find({}, {"_id": 1}).sort("accessed_at", 1).limit(excess).to_list(excess)
+        await self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in oldest]}})
+        logger.info(f"Evicted {len(oldest)} entries from {self.collection.name}")
+
+
+class DiskCacheBackend:
+    """Cache entries stored in a local SQLite file, for single-host deployments."""
+
+    def __init__(self, path: Path, table: str, ttl_seconds: int, max_entries: int, evict_every: int = 100):
+        self.path = Path(path)
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT, meta TEXT, stored_at REAL, accessed_at REAL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def _get_sync(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        now = datetime.now(timezone.utc).timestamp()
+        row = conn.execute(
+            f"SELECT value, meta, stored_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[2] > self.ttl_seconds:
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return {
+            "key": key,
+            "value": json.loads(row[0]),
+            "stored_at": datetime.fromtimestamp(row[2], timezone.utc),
+            **json.loads(row[1])
+        }
+
+    def _set_sync(self, key: str, value: Any, meta: Dict[str, Any]):
+        conn = self._connect()
+        now = datetime.now(timezone.utc).timestamp()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, meta, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, json.dumps(value, default=str), json.dumps(meta, default=str), now, now)
+        )
+        conn.commit()
+
+    def _delete_sync(self, key: str):
+        conn = self._connect()
+        conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        conn.commit()
+
+    def _evict_sync(self):
+        conn = self._connect()
+        cutoff = datetime.now(timezone.utc).timestamp() - self.ttl_seconds
+        conn.execute(f"DELETE FROM {self.table} WHERE stored_at < ?", (cutoff,))
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        conn.commit()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        async with self._lock:
+            return await asyncio.to_thread(self._get_sync, key)
+
+    async def set(self, key: str, value: Any, **meta):
+        async with self._lock:
+            await asyncio.to_thread(self._set_sync, key, value, meta)
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                await asyncio.to_thread(self._evict_sync)
+
+    async def delete(self, key: str):
+        async with self._lock:
+            await asyncio.to_thread(self._delete_sync, key)
+
+
+def create_cache_backend(db, name: str, ttl_seconds: int, max_entries: int):
+    """Build the backend selected by CACHE_BACKEND, or None when caching is off."""
+    backend = os.environ.get('CACHE_BACKEND', 'mongo').lower()
+    if backend == 'off':
+        return None
+    if backend == 'disk':
+        path = Path(os.environ.get('CACHE_PATH', str(DEFAULT_CACHE_PATH)))
+        return DiskCacheBackend(path, name, ttl_seconds, max_entries)
+    if db is None:
+        return None
+    return MongoCacheBackend(db, name, ttl_seconds, max_entries)
+
+
+def _entry_age(entry: Dict[str, Any]) -> timedelta:
+    stored_at = entry['stored_at']
+    if stored_at.tzinfo is None:
+        stored_at = stored_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - stored_at
+
+
+class PlaceCache:
+    """
+    Place details keyed by placeId, shared across runs.
+
+    Entries remember whether reviews and images were extracted, so a run that
+    asks for them never gets a cached entry without them.
+    """
+
+    def __init__(self, backend, ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    async def get(
+        self,
+        place_id: str,
+        max_staleness_seconds: Optional[float] = None,
+        need_reviews: bool = False,
+        need_images: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached place, or None on a miss or a stale entry."""
+        try:
+            entry = await self.backend.get(place_id)
+        except Exception as e:
+            logger.warning(f"Place cache read failed for {place_id}: {str(e)}")
+            return None
+        if not entry:
+            return None
+        if need_reviews and not entry.get('has_reviews'):
+            return None
+        if need_images and not entry.get('has_images'):
+            return None
+
+        max_age = self.ttl_seconds if max_staleness_seconds is None else min(max_staleness_seconds, self.ttl_seconds)
+        if _entry_age(entry) > timedelta(seconds=max_age):
+            return None
+        return copy.deepcopy(entry['value'])
+
+    async def set(self, place_id: str, place_data: Dict[str, Any], has_reviews: bool = False, has_images: bool = False):
+        try:
+            await self.backend.set(
+                place_id,
+                copy.deepcopy(place_data),
+                has_reviews=has_reviews,
+                has_images=has_images
+            )
+        except Exception as e:
+            logger.warning(f"Place cache write failed for {place_id}: {str(e)}")
+
+
+class EnrichmentCache:
+    """
+    Website enrichment results (email and social links) keyed by domain.
+
+    Chains whose branches share one website are crawled once. Failed fetches
+    are cached too, for a shorter negative TTL, and concurrent lookups of the
+    same domain wait on a single in-flight fetch.
+    """
+
+    def __init__(self, backend, ttl_seconds: int, negative_ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def cache_key(url: str) -> Optional[str]:
+        """
+        Domain of a website URL, or domain, path and query for shared hosting platforms.
+
+        The query is kept for shared hosts because it can name the real site,
+        as in google.com/url?q=<site> redirects.
+        """
+        parsed = urlparse(url if '://' in url else f'http://{url}')
+        host = (parsed.hostname or '').lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        if not host:
+            return None
+        if host in SHARED_HOSTS or any(host.endswith('.' + shared) for shared in SHARED_HOSTS):
+            key = f"{host}{parsed.path.rstrip('/').lower()}"
+            return f"{key}?{parsed.query}" if parsed.query else key
+        return host
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            entry = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Enrichment cache read failed for {key}: {str(e)}")
+            return None
+        if not entry:
+            return None
+        max_age = self.negative_ttl_seconds if entry.get('failed') else self.ttl_seconds
+        if _entry_age(entry) > timedelta(seconds=max_age):
+            return None
+        return copy.deepcopy(entry['value'])
+
+    async def set(self, key: str, result: Dict[str, Any]):
+        try:
+            await self.backend.set(key, copy.deepcopy(result), failed=bool(result.get('failed')))
+        except Exception as e:
+            logger.warning(f"Enrichment cache write failed for {key}: {str(e)}")
+
+    async def get_or_fetch(
+        self,
+        url: str,
+        fetch: Callable[[str], Awaitable[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached result for url's domain, fetching it at most once.
+
+        fetch returns {'email', 'socialMedia'} or {'failed': True}. Returns
+        None only if the fetch shared with another caller was interrupted.
+        """
+        key = self.cache_key(url)
+        if key is None:
+            return await fetch(url)
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            result = await asyncio.shield(in_flight)
+            return copy.deepcopy(result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        result = None
+        try:
+            result = await self.get(key)
+            if result is None:
+                result = await fetch(url)
+                await self.set(key, result)
+            return result
+        finally:
+            del self._in_flight[key]
+            future.set_result(copy.deepcopy(result))
+
+
+class SearchCache:
+    """
+    Place URLs discovered for a search query, keyed by the normalized query.
+
+    Each entry records how many results the search asked for, so a later run
+    asking for no more than that can skip discovery, while one asking for more
+    starts from the cached URLs and only adds the delta.
+    """
+
+    def __init__(self, backend, ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return ' '.join(query.lower().split())
+
+    async def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return {'urls', 'requested'} for a query, or None on a miss."""
+        key = self.normalize(query)
+        try:
+            entry = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Search cache read failed for '{key}': {str(e)}")
+            return None
+        if not entry or _entry_age(entry) > timedelta(seconds=self.ttl_seconds):
+            return None
+        return entry['value']
+
+    async def set(self, query: str, urls: List[str], requested: int):
+        key = self.normalize(query)
+        try:
+            await self.backend.set(key, {"urls": urls, "requested": requested})
+        except Exception as e:
+            logger.warning(f"Search cache write failed for '{key}': {str(e)}")
+
+
+# Global cache instances, created on first use
+place_cache: Optional[PlaceCache] = None
+enrichment_cache: Optional[EnrichmentCache] = None
+search_cache: Optional[SearchCache] = None
+
+def get_place_cache(db=None) -> Optional[PlaceCache]:
+    """Get the shared place cache, or None when caching is turned off."""
+    global place_cache
+    if place_cache is None:
+        ttl_seconds = int(float(os.environ.get('PLACE_CACHE_TTL_HOURS', '168')) * 3600)
+        backend = create_cache_backend(
+            db,
+            'place_cache',
+            ttl_seconds,
+            int(os.environ.get('PLACE_CACHE_MAX_ENTRIES', '100000'))
+        )
+        if backend is not None:
+            place_cache = PlaceCache(backend, ttl_seconds)
+    return place_cache
+
+def get_enrichment_cache(db=None) -> Optional[EnrichmentCache]:
+    """Get the shared website enrichment cache, or None when caching is turned off."""
+    global enrichment_cache
+    if enrichment_cache is None:
+        ttl_seconds = int(float(os.environ.get('ENRICHMENT_CACHE_TTL_HOURS', '72')) * 3600)
+        negative_ttl_seconds = int(float(os.environ.get('ENRICHMENT_CACHE_NEGATIVE_TTL_MINUTES', '60')) * 60)
+        backend = create_cache_backend(
+            db,
+            'enrichment_cache',
+            ttl_seconds,
+            int(os.environ.get('ENRICHMENT_CACHE_MAX_ENTRIES', '50000'))
+        )
+        if backend is not None:
+            enrichment_cache = EnrichmentCache(backend, ttl_seconds, negative_ttl_seconds)
+    return enrichment_cache
+
+def get_search_cache(db=None) -> Optional[SearchCache]:
+    """Get the shared search result cache, or None when caching is turned off."""
+    global search_cache
+    if search_cache is None:
+        ttl_seconds = int(float(os.environ.get('SEARCH_CACHE_TTL_HOURS', '24')) * 3600)
+        backend = create_cache_backend(
+            db,
+            'search_cache',
+            ttl_seconds,
+            int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', '10000'))
+        )
+        if backend is not None:
+            search_cache = SearchCache(backend, ttl_seconds)
+    return search_cache
@@ -0,0 +1,97 @@
+"""
+Run checkpoints for resuming interrupted scraping runs.
+
+One document per run in the run_checkpoints collection records the place
+URLs discovered for each search term, how many search attempts each term
+used, and the placeIds whose items are already stored in the dataset.
+When a run is reclaimed after a restart, the scraper reloads this state,
+re-queues the discovered URLs and skips places that were already extracted.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+class RunCheckpoint:
+    """Buffered checkpoint state for one run."""
+
+    def __init__(self, db, run_id: str):
+        self.db = db
+        self.run_id = run_id
+        self.terms: Dict[str, Dict] = {}
+        self.completed_place_ids: Set[str] = set()
+        self._pending_urls: Dict[str, List[str]] = {}
+
+    @staticmethod
+    def _term_key(term: str) -> str:
+        # Terms are user input and may contain '.' or '$', which are not valid field names
+        return hashlib.md5(term.encode('utf-8')).hexdigest()
+
+    async def load(self) -> bool:
+        """Load saved state. Returns True if this run has a checkpoint to resume from."""
+        doc = await self.db.run_checkpoints.find_one({"run_id": self.run_id}, {"_id": 0})
+        if not doc:
+            return False
+        self.terms = doc.get('terms') or {}
+        self.completed_place_ids = set(doc.get('completed_place_ids') or [])
+        return True
+
+    def get_urls(self, term: str) -> List[str]:
+        """Place URLs already discovered for a term."""
+        return list(self.terms.get(self._term_key(term), {}).get('urls', []))
+
+    def get_attempts(self, term: str) -> int:
+        return self.terms.get(self._term_key(term), {}).get('attempts', 0)
+
+    def is_search_complete(self, term: str) -> bool:
+        return self.terms.get(self._term_key(term), {}).get('search_complete', False)
+
+    def add_url(self, term: str, url: str):
+        """Buffer a newly discovered URL; written on the next flush."""
+        self._pending_urls.setdefault(term, []).append(url)
+
+    async def record_attempt(self, term: str, attempt: int):
+        self.terms.setdefault(self._term_key(term), {'term': term})['attempts'] = attempt
+        await self._update_term(term, {"$set": {f"terms.{self._term_key(term)}.attempts": attempt}})
+
+    async def mark_search_complete(self, term: str):
+        """Persist the term's URLs and stop it from being searched again on resume."""
+        await self.flush()
+        self.terms.setdefault(self._term_key(term), {'term': term})['search_complete'] = True
+        await self._update_term(term, {"$set": {f"terms.{self._term_key(term)}.search_complete": True}})
+
+    async def record_completed(self, place_ids: Iterable[str]):
+        """Record places whose items have been written to the dataset."""
+        place_ids = [place_id for place_id in place_ids if place_id]
+        if not place_ids:
+            return
+        self.completed_place_ids.update(place_ids)
+        await self.db.run_checkpoints.update_one(
+            {"run_id": self.run_id},
+            {
+                "$addToSet": {"completed_place_ids": {"$each": place_ids}},
+                "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
+            },
+            upsert=True
+        )
+
+    async def flush(self):
+        """Write buffered URLs for every term."""
+        pending, self._pending_urls = self._pending_urls, {}
+        for term, urls in pending.items():
+            key = self._term_key(term)
+            await self._update_term(term, {"$addToSet": {f"terms.{key}.urls": {"$each": urls}}})
+            self.terms.setdefault(key, {'term': term}).setdefault('urls', []).extend(urls)
+
+    async def _update_term(self, term: str, update: Dict):
+        update.setdefault("$set", {})
+        update["$set"][f"terms.{self._term_key(term)}.term"] = term
+        update["$set"]["updated_at"] = datetime.now(timezone.utc).isoformat()
+        await self.db.run_checkpoints.update_one({"run_id": self.run_id}, update, upsert=True)
+
+    async def delete(self):
+        """Drop the checkpoint once the run has finished."""
+        await self.db.run_checkpoints.delete_one({"run_id": self.run_id})
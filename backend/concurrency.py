@@ -0,0 +1,145 @@
+"""
+Concurrency helpers for scraping pipelines.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class ThrottledError(Exception):
+    """Raised when the target site signals rate limiting (e.g. HTTP 429)."""
+
+
+class AdaptiveLimiter:
+    """
+    Caps the number of in-flight operations.
+
+    In adaptive mode the cap is halved on timeouts or throttling and grows
+    back by one after a streak of successes, never exceeding max_limit.
+    """
+
+    def __init__(self, max_limit: int, adaptive: bool = False, min_limit: int = 1, increase_after: int = 5):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.adaptive = adaptive
+        self.increase_after = increase_after
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self.backoffs = 0
+        self._success_streak = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            while self.in_flight >= self.limit:
+                await self._condition.wait()
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+    async def record_success(self):
+        """Grow the limit again after a streak of successful operations."""
+        if not self.adaptive:
+            return
+        async with self._condition:
+            self._success_streak += 1
+            if self._success_streak >= self.increase_after and self.limit < self.max_limit:
+                self.limit += 1
+                self._success_streak = 0
+                self._condition.notify_all()
+
+    async def record_backoff(self):
+        """Halve the limit after a timeout or throttling response."""
+        if not self.adaptive:
+            return
+        async with self._condition:
+            self.backoffs += 1
+            self._success_streak = 0
+            new_limit = max(self.min_limit, self.limit // 2)
+            if new_limit != self.limit:
+                logger.info(f"Backing off concurrency {self.limit} -> {new_limit}")
+            self.limit = new_limit
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_limit": self.max_limit,
+            "limit": self.limit,
+            "adaptive": self.adaptive,
+            "backoffs": self.backoffs
+        }
+
+
+# Global cap on concurrent searches shared by every run in this process
+_search_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_search_semaphore() -> asyncio.Semaphore:
+    """Get the process-wide semaphore limiting parallel searches across runs."""
+    global _search_semaphore
+    if _search_semaphore is None:
+        _search_semaphore = asyncio.Semaphore(int(os.environ.get('MAX_PARALLEL_SEARCHES', '6')))
+    return _search_semaphore
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation signal for a run.
+
+    Long-running loops call raise_if_cancelled() between steps, and owners of
+    browser resources register on_cancel callbacks that close them, so in-flight
+    Playwright calls fail immediately instead of waiting for their timeouts.
+    """
+
+    def __init__(self):
+        self._event = asyncio.Event()
+        self._callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        if self._event.is_set():
+            return
+        self._event.set()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    def on_cancel(self, callback):
+        """Register a callback (sync or async) to run on cancel; runs now if already cancelled."""
+        if self.cancelled:
+            self._run_callback(callback)
+        else:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise asyncio.CancelledError()
+
+    async def wait(self):
+        await self._event.wait()
+
+    def _run_callback(self, callback):
+        try:
+            result = callback()
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(result)
+        except Exception as e:
+            logger.debug(f"Cancel callback failed: {str(e)}")
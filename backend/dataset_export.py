@@ -0,0 +1,234 @@
+"""
+Streaming dataset export.
+
+Items are read from the Motor cursor in batches and encoded chunk by chunk,
+so exports run in constant memory regardless of dataset size.
+
+Columnar formats (Parquet, Arrow IPC, Excel) use a fixed schema derived from
+the Google Maps result fields. They are written batch by batch to a temporary
+file, which is then streamed back.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import tempfile
+from typing import Any, AsyncIterator, Dict, List
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+COLUMNAR_FORMATS = {"parquet", "arrow", "xlsx"}
+
+# Scalar columns of a Google Maps result, in export order, with their Arrow types
+PLACE_COLUMNS = [
+    ("title", "string"),
+    ("category", "string"),
+    ("rating", "float64"),
+    ("reviewsCount", "int64"),
+    ("totalScore", "float64"),
+    ("address", "string"),
+    ("city", "string"),
+    ("state", "string"),
+    ("countryCode", "string"),
+    ("phone", "string"),
+    ("phoneVerified", "bool"),
+    ("website", "string"),
+    ("email", "string"),
+    ("emailVerified", "bool"),
+    ("openingHours", "string"),
+    ("priceLevel", "string"),
+    ("url", "string"),
+    ("placeId", "string")
+]
+
+SOCIAL_PLATFORMS = ["facebook", "instagram", "twitter", "linkedin", "youtube", "tiktok"]
+
+REVIEW_FIELDS = [("reviewerName", "string"), ("rating", "int64"), ("text", "string"), ("date", "string")]
+
+# Excel sheets hold 1,048,576 rows, one of which is the header
+XLSX_MAX_ROWS = 1048576 - 1
+
+FILE_CHUNK_SIZE = 256 * 1024
+
+async def iter_dataset_items(db, run_id: str, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the run's item data in lists of up to batch_size."""
+    cursor = db.dataset_items.find({"run_id": run_id}, {"_id": 0, "data": 1}).batch_size(batch_size)
+    batch = []
+    async for item in cursor:
+        batch.append(item.get('data') or {})
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def get_csv_header(db, run_id: str) -> List[str]:
+    """Union of data keys across the run's items, computed server-side."""
+    pipeline = [
+        {"$match": {"run_id": run_id}},
+        {"$project": {"keys": {"$objectToArray": "$data"}}},
+        {"$unwind": "$keys"},
+        {"$group": {"_id": "$keys.k"}}
+    ]
+    keys = await db.dataset_items.aggregate(pipeline, allowDiskUse=True).to_list(None)
+    return sorted(key["_id"] for key in keys)
+
+def _csv_value(value: Any) -> Any:
+    # Nested values (socialMedia, reviews, images) are written as JSON
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+async def stream_json(db, run_id: str) -> AsyncIterator[bytes]:
+    """Encode the dataset as one JSON array."""
+    yield b"["
+    first = True
+    async for batch in iter_dataset_items(db, run_id):
+        parts = []
+        for data in batch:
+            parts.append(("\n" if first else ",\n") + json.dumps(data, indent=2, default=str))
+            first = False
+        yield "".join(parts).encode()
+    yield b"\n]" if not first else b"]"
+
+async def stream_jsonl(db, run_id: str) -> AsyncIterator[bytes]:
+    """Encode the dataset as newline-delimited JSON, one item per line."""
+    async for batch in iter_dataset_items(db, run_id):
+        yield "".join(json.dumps(data, default=str) + "\n" for data in batch).encode()
+
+async def stream_csv(db, run_id: str, header: List[str]) -> AsyncIterator[bytes]:
+    """Encode the dataset as CSV with a precomputed header."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=header, extrasaction='ignore')
+    writer.writeheader()
+    async for batch in iter_dataset_items(db, run_id):
+        for data in batch:
+            writer.writerow({key: _csv_value(value) for key, value in data.items()})
+        yield output.getvalue().encode()
+        output.seek(0)
+        output.truncate(0)
+    if output.tell():
+        yield output.getvalue().encode()
+
+def _place_arrow_schema():
+    import pyarrow as pa
+
+    arrow_types = {"string": pa.string(), "float64": pa.float64(), "int64": pa.int64(), "bool": pa.bool_()}
+    review_type = pa.struct([(name, arrow_types[arrow_type]) for name, arrow_type in REVIEW_FIELDS])
+    return pa.schema(
+        [(name, arrow_types[arrow_type]) for name, arrow_type in PLACE_COLUMNS]
+        + [
+            ("socialMedia", pa.struct([(platform, pa.string()) for platform in SOCIAL_PLATFORMS])),
+            ("images", pa.list_(pa.string())),
+            ("reviews", pa.list_(review_type)),
+            # Fields outside the Maps schema (e.g. from other actors), as JSON
+            ("extra", pa.string())
+        ]
+    )
+
+def _coerce(value: Any, arrow_type: str) -> Any:
+    if value is None:
+        return None
+    try:
+        if arrow_type == "float64":
+            return float(value)
+        if arrow_type == "int64":
+            return int(value)
+        if arrow_type == "bool":
+            return bool(value)
+        return str(value)
+    except (TypeError, ValueError):
+        return None
+
+def _place_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map one item onto the fixed columnar schema."""
+    row = {name: _coerce(data.get(name), arrow_type) for name, arrow_type in PLACE_COLUMNS}
+
+    social = data.get('socialMedia') or {}
+    row['socialMedia'] = {platform: social.get(platform) for platform in SOCIAL_PLATFORMS} if social else None
+    row['images'] = [str(image) for image in data.get('images') or []]
+    row['reviews'] = [
+        {name: _coerce(review.get(name), arrow_type) for name, arrow_type in REVIEW_FIELDS}
+        for review in data.get('reviews') or []
+        if isinstance(review, dict)
+    ]
+
+    known = {name for name, _ in PLACE_COLUMNS} | {'socialMedia', 'images', 'reviews'}
+    extra = {key: value for key, value in data.items() if key not in known}
+    row['extra'] = json.dumps(extra, default=str) if extra else None
+    return row
+
+def _flat_row(data: Dict[str, Any]) -> List[Any]:
+    """Flatten one item for spreadsheets: socialMedia into columns, lists as text."""
+    row = _place_row(data)
+    social = row['socialMedia'] or {}
+    return (
+        [row[name] for name, _ in PLACE_COLUMNS]
+        + [social.get(platform) for platform in SOCIAL_PLATFORMS]
+        + [
+            "\n".join(row['images']) or None,
+            len(row['reviews']),
+            json.dumps(row['reviews'], ensure_ascii=False) if row['reviews'] else None,
+            row['extra']
+        ]
+    )
+
+def _flat_header() -> List[str]:
+    return (
+        [name for name, _ in PLACE_COLUMNS]
+        + [f"socialMedia_{platform}" for platform in SOCIAL_PLATFORMS]
+        + ["images", "reviewsExported", "reviews", "extra"]
+    )
+
+async def _write_columnar(db, run_id: str, format: str, output):
+    """Write the dataset to a binary file object in the given columnar format."""
+    if format == "xlsx":
+        from openpyxl import Workbook
+
+        # Write-only workbooks stream rows to disk instead of keeping cells in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("dataset")
+        sheet.append(_flat_header())
+        async for batch in iter_dataset_items(db, run_id):
+            for data in batch:
+                sheet.append(_flat_row(data))
+        await asyncio.to_thread(workbook.save, output)
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _place_arrow_schema()
+    if format == "parquet":
+        writer = pq.ParquetWriter(output, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(output, schema)
+
+    try:
+        async for batch in iter_dataset_items(db, run_id):
+            table = pa.Table.from_pylist([_place_row(data) for data in batch], schema=schema)
+            # Each batch becomes one Parquet row group / Arrow record batch
+            await asyncio.to_thread(writer.write_table, table)
+    finally:
+        writer.close()
+
+async def stream_columnar(db, run_id: str, format: str) -> AsyncIterator[bytes]:
+    """Encode the dataset as Parquet, Arrow IPC or Excel and stream the result."""
+    with tempfile.TemporaryFile() as output:
+        await _write_columnar(db, run_id, format, output)
+        output.seek(0)
+        while True:
+            chunk = output.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
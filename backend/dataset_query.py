@@ -0,0 +1,145 @@
+"""
+Structured queries over dataset items.
+
+A DatasetQuery combines typed filters (numeric ranges, value lists and
+presence flags), sorting, paging and facet counts. The whole query runs as
+one aggregation: an index-backed $match and $sort on the run's items,
+then a $facet that returns the requested page, the total and every facet
+from the same pass. Filtering and faceting happen in the database instead
+of the browser pulling large pages to do it.
+"""
+
+import re
+from typing import Any, Dict, List
+from models import DatasetQuery
+from dataset_search import ensure_search_terms, parse_query
+
+RANGE_FIELDS = ["rating", "reviewsCount", "totalScore"]
+VALUE_FIELDS = ["category", "city", "state", "countryCode"]
+PRESENCE_FIELDS = {"has_email": "email", "has_phone": "phone", "has_website": "website"}
+
+SORT_FIELDS = {"created_at", "rating", "reviewsCount", "totalScore", "title"}
+FACETS = set(VALUE_FIELDS) | {"rating", "presence"}
+
+# Lower bounds of the rating facet buckets
+RATING_BUCKETS = [0, 1, 2, 3, 4, 4.5]
+
+MAX_LIMIT = 1000
+MAX_FACET_LIMIT = 200
+
+FIELD_NAME_RE = re.compile(r"^\w+$")
+
+def _is_present(field: str) -> Dict[str, Any]:
+    """Expression: the data field holds a non-empty value."""
+    return {"$gt": [{"$strLenCP": {"$ifNull": [{"$toString": f"$data.{field}"}, ""]}}, 0]}
+
+def validate_query(query: DatasetQuery):
+    """Raise ValueError for sort fields, facets, fields or paging the API does not support."""
+    if query.sort_by not in SORT_FIELDS:
+        raise ValueError(f"Unsupported sort_by '{query.sort_by}'; use one of {sorted(SORT_FIELDS)}")
+    if query.sort_order not in ("asc", "desc"):
+        raise ValueError("sort_order must be 'asc' or 'desc'")
+    unknown = set(query.facets) - FACETS
+    if unknown:
+        raise ValueError(f"Unsupported facets {sorted(unknown)}; use any of {sorted(FACETS)}")
+    if query.fields and not all(FIELD_NAME_RE.match(field) for field in query.fields):
+        raise ValueError("fields must be plain data field names")
+    if query.page < 1 or not 1 <= query.limit <= MAX_LIMIT:
+        raise ValueError(f"page must be at least 1 and limit between 1 and {MAX_LIMIT}")
+
+def build_match(run_id: str, query: DatasetQuery) -> Dict[str, Any]:
+    """MongoDB filter for the query's typed filters."""
+    match: Dict[str, Any] = {"run_id": run_id}
+
+    for field in RANGE_FIELDS:
+        bounds = getattr(query, field)
+        if bounds is None:
+            continue
+        condition = {}
+        if bounds.min is not None:
+            condition["$gte"] = bounds.min
+        if bounds.max is not None:
+            condition["$lte"] = bounds.max
+        if condition:
+            match[f"data.{field}"] = condition
+
+    for field in VALUE_FIELDS:
+        values = getattr(query, field)
+        if values:
+            match[f"data.{field}"] = {"$in": values}
+
+    for flag, field in PRESENCE_FIELDS.items():
+        present = getattr(query, flag)
+        if present is not None:
+            # Missing, null and empty values all count as absent
+            match[f"data.{field}"] = {"$nin" if present else "$in": [None, ""]}
+
+    if query.search:
+        match["search.terms"] = {"$all": parse_query(query.search)}
+
+    return match
+
+def _facet_pipeline(facet: str, limit: int) -> List[Dict[str, Any]]:
+    if facet == "rating":
+        return [{"$bucket": {
+            "groupBy": "$data.rating",
+            "boundaries": RATING_BUCKETS + [5.01],
+            "default": "unrated",
+            "output": {"count": {"$sum": 1}}
+        }}]
+    if facet == "presence":
+        return [{"$group": {
+            "_id": None,
+            **{flag: {"$sum": {"$cond": [_is_present(field), 1, 0]}} for flag, field in PRESENCE_FIELDS.items()}
+        }}, {"$project": {"_id": 0}}]
+    return [
+        {"$group": {"_id": f"$data.{facet}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": limit}
+    ]
+
+def build_pipeline(run_id: str, query: DatasetQuery) -> List[Dict[str, Any]]:
+    """Single aggregation returning the page, the total and the requested facets."""
+    direction = -1 if query.sort_order == "desc" else 1
+    sort_key = "created_at" if query.sort_by == "created_at" else f"data.{query.sort_by}"
+    sort = {sort_key: direction, "created_at": direction, "id": direction}
+
+    if query.fields:
+        projection = {"_id": 0, "id": 1, "run_id": 1, "created_at": 1, **{f"data.{field}": 1 for field in query.fields}}
+    else:
+        projection = {"_id": 0, "search": 0}
+
+    facet_limit = min(max(query.facet_limit, 1), MAX_FACET_LIMIT)
+    facets = {
+        "items": [{"$skip": (query.page - 1) * query.limit}, {"$limit": query.limit}, {"$project": projection}],
+        "total": [{"$count": "count"}]
+    }
+    for facet in query.facets:
+        facets[f"facet_{facet}"] = _facet_pipeline(facet, facet_limit)
+
+    # Sorting before $facet lets the (run_id, data.<field>, created_at, id) indexes serve the order
+    return [{"$match": build_match(run_id, query)}, {"$sort": sort}, {"$facet": facets}]
+
+def _format_facet(facet: str, buckets: List[Dict[str, Any]]) -> Any:
+    if facet == "presence":
+        return buckets[0] if buckets else {flag: 0 for flag in PRESENCE_FIELDS}
+    return [{"value": bucket["_id"], "count": bucket["count"]} for bucket in buckets]
+
+async def query_dataset_items(db, run_id: str, query: DatasetQuery) -> Dict[str, Any]:
+    """Run a structured query. Raises ValueError for an invalid query."""
+    validate_query(query)
+    if query.search:
+        await ensure_search_terms(db, run_id)
+
+    results = await db.dataset_items.aggregate(build_pipeline(run_id, query), allowDiskUse=True).to_list(1)
+    result = results[0] if results else {}
+    total = result["total"][0]["count"] if result.get("total") else 0
+
+    return {
+        "items": result.get("items", []),
+        "total": total,
+        "page": query.page,
+        "limit": query.limit,
+        "total_pages": (total + query.limit - 1) // query.limit,
+        "facets": {facet: _format_facet(facet, result.get(f"facet_{facet}", [])) for facet in query.facets}
+    }
@@ -0,0 +1,154 @@
+"""
+Search over dataset items.
+
+Each item carries precomputed search terms in its `search` field, written
+alongside the item by DatasetWriter:
+
+- terms: edge n-gram prefixes of every word in the searchable fields, an
+  exact-word marker per word, and digit prefixes of the phone number taken
+  from each digit group onward (so "555 123" finds "+1 (555) 123-4567")
+- title: prefixes of the title words, used for ranking
+
+Queries become an $all match on search.terms, which is served by the
+(run_id, search.terms) multikey index instead of scanning every item with
+unanchored regexes. Matches are ranked by title hits and exact-word hits.
+Items written before terms existed are backfilled on their first search.
+"""
+
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, List, Set
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Fields whose words are searchable
+SEARCH_FIELDS = ["title", "category", "address", "city", "email"]
+
+MAX_PREFIX_LENGTH = 20
+MIN_PHONE_PREFIX = 3
+EXACT_MARKER = "$"
+
+# Weight of a query term found in the title relative to an exact-word hit
+TITLE_WEIGHT = 3
+
+BACKFILL_BATCH_SIZE = 500
+
+WORD_RE = re.compile(r"\w+")
+PHONE_QUERY_RE = re.compile(r"^[\d\s()+\-.]+$")
+
+# Runs whose items are known to carry search terms
+_indexed_runs: Set[str] = set()
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents so "Café" and "cafe" match."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def tokenize(text: Any) -> List[str]:
+    if not text:
+        return []
+    return WORD_RE.findall(normalize(str(text)))
+
+def _prefixes(word: str) -> List[str]:
+    return [word[:length] for length in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1)]
+
+def _phone_terms(phone: Any) -> Set[str]:
+    """Digit prefixes starting at each digit group, e.g. "+1 555-1234" -> 1555..., 555..., 1234."""
+    groups = re.findall(r"\d+", str(phone or ""))
+    terms = set()
+    for start in range(len(groups)):
+        digits = "".join(groups[start:])
+        terms.update(digits[:length] for length in range(MIN_PHONE_PREFIX, len(digits) + 1))
+    return terms
+
+def build_search_terms(data: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Search terms stored on a dataset item for its scraped data."""
+    terms: Set[str] = set()
+    for field in SEARCH_FIELDS:
+        for word in tokenize(data.get(field)):
+            terms.update(_prefixes(word))
+            terms.add(word[:MAX_PREFIX_LENGTH] + EXACT_MARKER)
+    terms.update(_phone_terms(data.get("phone")))
+
+    title: Set[str] = set()
+    for word in tokenize(data.get("title")):
+        title.update(_prefixes(word))
+
+    return {"terms": sorted(terms), "title": sorted(title)}
+
+def parse_query(search: str) -> List[str]:
+    """
+    Query terms for a search string, longest first.
+
+    A phone-like query ("(555) 123-45") is collapsed to its digits; anything
+    else is split into words, each matched as a prefix.
+    """
+    if PHONE_QUERY_RE.match(search) and sum(ch.isdigit() for ch in search) >= MIN_PHONE_PREFIX:
+        return ["".join(ch for ch in search if ch.isdigit())]
+    words = {word[:MAX_PREFIX_LENGTH] for word in tokenize(search)}
+    # The index serves the first $all term, so lead with the most selective one
+    return sorted(words, key=len, reverse=True)
+
+def search_filter(run_id: str, terms: List[str]) -> Dict[str, Any]:
+    return {"run_id": run_id, "search.terms": {"$all": terms}}
+
+async def ensure_search_terms(db, run_id: str) -> int:
+    """Backfill search terms for a run's items that were written without them."""
+    if run_id in _indexed_runs:
+        return 0
+
+    updated = 0
+    cursor = db.dataset_items.find(
+        {"run_id": run_id, "search": {"$exists": False}},
+        {"_id": 0, "id": 1, "data": 1}
+    ).batch_size(BACKFILL_BATCH_SIZE)
+    batch = []
+    async for item in cursor:
+        batch.append(UpdateOne({"id": item["id"]}, {"$set": {"search": build_search_terms(item.get("data") or {})}}))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            await db.dataset_items.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await db.dataset_items.bulk_write(batch, ordered=False)
+        updated += len(batch)
+
+    if updated:
+        logger.info(f"Run {run_id}: backfilled search terms for {updated} dataset items")
+    if len(_indexed_runs) > 10000:
+        _indexed_runs.clear()
+    _indexed_runs.add(run_id)
+    return updated
+
+async def search_dataset_items(
+    db,
+    run_id: str,
+    terms: List[str],
+    skip: int = 0,
+    limit: int = 20
+) -> List[Dict[str, Any]]:
+    """
+    One page of a ranked search over a run's dataset items.
+
+    Items matching more query terms in the title, then more whole words,
+    come first; ties keep dataset order. Each item carries its search_score.
+    """
+    if not terms:
+        return []
+
+    await ensure_search_terms(db, run_id)
+    exact_terms = [term + EXACT_MARKER for term in terms]
+    pipeline = [
+        {"$match": search_filter(run_id, terms)},
+        {"$addFields": {"search_score": {"$add": [
+            {"$multiply": [TITLE_WEIGHT, {"$size": {"$setIntersection": [{"$ifNull": ["$search.title", []]}, terms]}}]},
+            {"$size": {"$setIntersection": ["$search.terms", exact_terms]}}
+        ]}}},
+        {"$sort": {"search_score": -1, "created_at": 1, "id": 1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "search": 0}}
+    ]
+    return await db.dataset_items.aggregate(pipeline, allowDiskUse=True).to_list(limit)
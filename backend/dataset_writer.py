@@ -0,0 +1,122 @@
+"""
+Dataset Writer for streaming scraped items into MongoDB during a run.
+Items are buffered and flushed with insert_many on a size/time policy.
+With a RunCheckpoint attached, each flush also records the flushed places
+as completed so a resumed run can skip them. Each item is stored with its
+search terms (see dataset_search) so searches can use the index.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from pymongo.errors import BulkWriteError
+from models import DatasetItem
+from dataset_search import build_search_terms
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+class DatasetWriter:
+    """Buffers dataset items for one run and flushes them in batches."""
+
+    def __init__(self, db, run_id: str, dataset_id: str, batch_size: int = 50, flush_interval: float = 2.0, checkpoint=None):
+        self.db = db
+        self.run_id = run_id
+        self.dataset_id = dataset_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.checkpoint = checkpoint
+        self.count = 0
+        self.buffer: List[Dict[str, Any]] = []
+        self.last_flush = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the background task that flushes on the time policy."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def add(self, data: Dict[str, Any]):
+        """Queue one scraped result, flushing when the batch is full or stale."""
+        item = DatasetItem(run_id=self.run_id, data=data)
+        item_doc = item.model_dump()
+        item_doc['created_at'] = item_doc['created_at'].isoformat()
+        item_doc['search'] = build_search_terms(data)
+        self.buffer.append(item_doc)
+
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        """
+        Write buffered items and bump the dataset and run counters.
+
+        Items that could not be written go back to the front of the buffer
+        and the error is re-raised, so the next flush or close() retries them.
+        """
+        async with self._lock:
+            self.last_flush = time.monotonic()
+            error = None
+            if self.buffer:
+                docs, self.buffer = self.buffer, []
+                try:
+                    await self.db.dataset_items.insert_many(docs, ordered=False)
+                except BulkWriteError as e:
+                    # Unordered inserts write every item but the failed ones; duplicates were stored by an earlier attempt
+                    failed = {
+                        write_error['index'] for write_error in e.details.get('writeErrors', [])
+                        if write_error.get('code') != DUPLICATE_KEY_ERROR
+                    }
+                    self.buffer = [docs[index] for index in sorted(failed)] + self.buffer
+                    docs = [doc for index, doc in enumerate(docs) if index not in failed]
+                    if failed:
+                        error = e
+                except Exception:
+                    self.buffer = docs + self.buffer
+                    raise
+
+                if docs:
+                    self.count += len(docs)
+                    await self.db.datasets.update_one(
+                        {"id": self.dataset_id},
+                        {"$inc": {"item_count": len(docs)}}
+                    )
+                    await self.db.runs.update_one(
+                        {"id": self.run_id},
+                        {"$inc": {"results_count": len(docs)}}
+                    )
+                    logger.debug(f"Run {self.run_id}: flushed {len(docs)} items ({self.count} total)")
+
+                    if self.checkpoint:
+                        await self.checkpoint.record_completed(
+                            doc['data'].get('placeId') or doc['data'].get('url') for doc in docs
+                        )
+
+            # Discovered URLs are checkpointed on the same cadence, even when no items were ready
+            if self.checkpoint:
+                await self.checkpoint.flush()
+
+            if error:
+                raise error
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Run {self.run_id}: periodic dataset flush failed: {str(e)}")
+
+    async def close(self):
+        """Stop the periodic flush and write whatever is left."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
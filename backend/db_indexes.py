@@ -0,0 +1,202 @@
+"""
+Declarative MongoDB index registry.
+
+INDEXES lists every index the hot query paths rely on; apply_indexes()
+creates them idempotently at startup. QUERY_SHAPES lists the hot queries
+themselves so get_query_report() can explain each one and flag shapes
+that fall back to a collection scan, alongside slow unindexed operations
+captured by the database profiler when it is enabled.
+"""
+
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+ASC = 1
+DESC = -1
+
+# collection -> index specs: key list plus create_index options
+INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    "runs": [
+        {"keys": [("id", ASC)], "unique": True},
+        # Run listings filtered by status and keyset pagination on (created_at, id)
+        {"keys": [("user_id", ASC), ("status", ASC), ("created_at", DESC)]},
+        {"keys": [("user_id", ASC), ("created_at", DESC), ("id", DESC)]},
+        # Scheduler: claimable runs oldest first, expired leases
+        {"keys": [("status", ASC), ("created_at", ASC)]},
+        {"keys": [("status", ASC), ("lease_expires_at", ASC)]},
+        {"keys": [("actor_id", ASC)]}
+    ],
+    "datasets": [
+        {"keys": [("id", ASC)], "unique": True},
+        {"keys": [("run_id", ASC)]},
+        {"keys": [("user_id", ASC)]}
+    ],
+    "dataset_items": [
+        {"keys": [("id", ASC)], "unique": True},
+        # Item listings and exports by run, keyset pagination on (created_at, id)
+        {"keys": [("run_id", ASC), ("created_at", ASC), ("id", ASC)]},
+        # Dataset search: multikey over each item's precomputed search terms
+        {"keys": [("run_id", ASC), ("search.terms", ASC)]},
+        # Structured queries: range filters and sorts, then value filters
+        {"keys": [("run_id", ASC), ("data.rating", ASC), ("created_at", ASC), ("id", ASC)]},
+        {"keys": [("run_id", ASC), ("data.reviewsCount", ASC), ("created_at", ASC), ("id", ASC)]},
+        {"keys": [("run_id", ASC), ("data.totalScore", ASC), ("created_at", ASC), ("id", ASC)]},
+        {"keys": [("run_id", ASC), ("data.category", ASC)]},
+        {"keys": [("run_id", ASC), ("data.city", ASC)]},
+        {"keys": [("run_id", ASC), ("data.state", ASC)]},
+        {"keys": [("run_id", ASC), ("data.countryCode", ASC)]}
+    ],
+    "actors": [
+        {"keys": [("id", ASC)], "unique": True},
+        {"keys": [("user_id", ASC)]},
+        {"keys": [("is_public", ASC)]},
+        {"keys": [("name", ASC)]}
+    ],
+    "users": [
+        {"keys": [("id", ASC)], "unique": True},
+        {"keys": [("username", ASC)]},
+        {"keys": [("email", ASC)]}
+    ],
+    "proxies": [
+        {"keys": [("id", ASC)]},
+        {"keys": [("host", ASC), ("port", ASC)]},
+        {"keys": [("is_active", ASC)]}
+    ],
+    "lead_chats": [
+        {"keys": [("lead_id", ASC), ("user_id", ASC), ("created_at", ASC)]}
+    ],
+    "global_chat_history": [
+        {"keys": [("user_id", ASC), ("created_at", DESC)]}
+    ],
+    "run_checkpoints": [
+        {"keys": [("run_id", ASC)], "unique": True}
+    ],
+    "run_logs": [
+        {"keys": [("run_id", ASC), ("seq", ASC)], "unique": True},
+        {"keys": [("expires_at", ASC)], "expireAfterSeconds": 0}
+    ],
+    # Shared caches; their TTL indexes depend on settings and are created by the cache backend
+    "place_cache": [
+        {"keys": [("key", ASC)], "unique": True},
+        {"keys": [("accessed_at", ASC)]}
+    ],
+    "enrichment_cache": [
+        {"keys": [("key", ASC)], "unique": True},
+        {"keys": [("accessed_at", ASC)]}
+    ],
+    "search_cache": [
+        {"keys": [("key", ASC)], "unique": True},
+        {"keys": [("accessed_at", ASC)]}
+    ]
+}
+
+# Representative hot queries, explained by get_query_report()
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"name": "run by id", "collection": "runs", "filter": {"id": "x"}},
+    {"name": "runs list", "collection": "runs", "filter": {"user_id": "x"}, "sort": {"created_at": DESC, "id": DESC}},
+    {"name": "runs list by status", "collection": "runs", "filter": {"user_id": "x", "status": "running"}, "sort": {"created_at": DESC}},
+    {"name": "scheduler queue", "collection": "runs", "filter": {"status": "queued"}, "sort": {"created_at": ASC}},
+    {"name": "dataset by run", "collection": "datasets", "filter": {"run_id": "x"}},
+    {"name": "dataset items page", "collection": "dataset_items", "filter": {"run_id": "x"}, "sort": {"created_at": ASC, "id": ASC}},
+    {"name": "dataset item search", "collection": "dataset_items", "filter": {"run_id": "x", "search.terms": {"$all": ["x"]}}},
+    {"name": "dataset items by rating", "collection": "dataset_items", "filter": {"run_id": "x", "data.rating": {"$gte": 4}}, "sort": {"data.rating": DESC, "created_at": DESC, "id": DESC}},
+    {"name": "dataset items by city", "collection": "dataset_items", "filter": {"run_id": "x", "data.city": {"$in": ["x"]}}},
+    {"name": "dataset item by id", "collection": "dataset_items", "filter": {"id": "x"}},
+    {"name": "actor by id", "collection": "actors", "filter": {"id": "x"}},
+    {"name": "user by username", "collection": "users", "filter": {"username": "x"}},
+    {"name": "proxy by address", "collection": "proxies", "filter": {"host": "x", "port": 0}},
+    {"name": "lead chat history", "collection": "lead_chats", "filter": {"lead_id": "x", "user_id": "x"}, "sort": {"created_at": ASC}},
+    {"name": "global chat history", "collection": "global_chat_history", "filter": {"user_id": "x"}, "sort": {"created_at": DESC}},
+    {"name": "run checkpoint", "collection": "run_checkpoints", "filter": {"run_id": "x"}},
+    {"name": "run log lines", "collection": "run_logs", "filter": {"run_id": "x", "seq": {"$gt": 0}}, "sort": {"seq": ASC}}
+]
+
+async def apply_indexes(db) -> Dict[str, int]:
+    """Create every registered index. Existing indexes are left as they are."""
+    created = 0
+    failed = 0
+    for collection_name, specs in INDEXES.items():
+        for spec in specs:
+            options = {key: value for key, value in spec.items() if key != "keys"}
+            try:
+                await db[collection_name].create_index(spec["keys"], **options)
+                created += 1
+            except Exception as e:
+                # e.g. duplicates blocking a unique index; the rest still get created
+                failed += 1
+                logger.error(f"Could not create index {spec['keys']} on {collection_name}: {str(e)}")
+    logger.info(f"Ensured {created} indexes ({failed} failed)")
+    return {"ensured": created, "failed": failed}
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Flatten a query plan tree into its stage names."""
+    stages = [plan.get("stage", "")]
+    for child_key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(child_key), dict):
+            stages += _plan_stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+async def explain_shape(db, shape: Dict[str, Any]) -> Dict[str, Any]:
+    """Explain one query shape and report whether it scans the whole collection."""
+    command = {"find": shape["collection"], "filter": shape["filter"], "limit": 1}
+    if shape.get("sort"):
+        command["sort"] = shape["sort"]
+    explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stages = _plan_stages(winning_plan)
+    return {
+        "name": shape["name"],
+        "collection": shape["collection"],
+        "stages": stages,
+        "collection_scan": "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages
+    }
+
+async def get_slow_operations(db, min_millis: int = 100, limit: int = 50) -> List[Dict[str, Any]]:
+    """Slow unindexed operations recorded by the profiler, grouped by query shape."""
+    pipeline = [
+        {"$match": {"millis": {"$gte": min_millis}, "planSummary": {"$regex": "COLLSCAN"}}},
+        {"$project": {"ns": 1, "op": 1, "millis": 1, "shape": {"$objectToArray": {"$ifNull": ["$command.filter", {}]}}}},
+        {"$group": {
+            "_id": {"ns": "$ns", "op": "$op", "fields": "$shape.k"},
+            "count": {"$sum": 1},
+            "max_millis": {"$max": "$millis"},
+            "avg_millis": {"$avg": "$millis"}
+        }},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]
+    try:
+        shapes = await db["system.profile"].aggregate(pipeline).to_list(limit)
+    except Exception as e:
+        logger.debug(f"Profiler data unavailable: {str(e)}")
+        return []
+    return [
+        {
+            "namespace": shape["_id"]["ns"],
+            "op": shape["_id"]["op"],
+            "filter_fields": shape["_id"].get("fields") or [],
+            "count": shape["count"],
+            "max_millis": shape["max_millis"],
+            "avg_millis": round(shape["avg_millis"], 1)
+        }
+        for shape in shapes
+    ]
+
+async def get_query_report(db, min_millis: int = 100) -> Dict[str, Any]:
+    """Registered query shapes that miss an index, plus slow unindexed operations from the profiler."""
+    shapes = []
+    for shape in QUERY_SHAPES:
+        try:
+            shapes.append(await explain_shape(db, shape))
+        except Exception as e:
+            shapes.append({"name": shape["name"], "collection": shape["collection"], "error": str(e)})
+    return {
+        "unindexed_shapes": [shape for shape in shapes if shape.get("collection_scan")],
+        "shapes": shapes,
+        "slow_operations": await get_slow_operations(db, min_millis)
+    }
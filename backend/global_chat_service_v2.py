@@ -496,6 +496,7 @@ Then FUNCTION_CALL: {"name": "view_run_details", "arguments": {"run_id": "<first
                 "actor_id": actor["id"],
                 "actor_name": actor["name"],
                 "status": "queued",
+                "priority": 0,
                 "input_data": {
                     "search_terms": search_terms,
                     "location": location,
@@ -534,18 +535,11 @@ Then FUNCTION_CALL: {"name": "view_run_details", "arguments": {"run_id": "<first
     async def stop_run(self, run_id: str) -> Dict[str, Any]:
         """Stop a running scraping job."""
         try:
-            # First, try to cancel the task in task_manager
             from task_manager import get_task_manager
             task_manager = get_task_manager()
-            task_cancelled = await task_manager.cancel_task(run_id)
             
-            # Update database status for both running and queued runs
-            result = await self.db.runs.update_one(
-                {"id": run_id, "user_id": self.user_id, "status": {"$in": ["running", "queued"]}},
-                {"$set": {"status": "aborted", "finished_at": datetime.now(timezone.utc).isoformat()}}
-            )
-            
-            if result.modified_count > 0:
+            aborted, task_cancelled = await task_manager.abort_run(self.db, run_id, self.user_id)
+            if aborted:
                 status_msg = "Run stopped and task cancelled" if task_cancelled else "Run status updated to aborted"
                 return {"success": True, "message": f"{status_msg}: {run_id}"}
             else:
@@ -595,21 +589,8 @@ Then FUNCTION_CALL: {"name": "view_run_details", "arguments": {"run_id": "<first
                         results["not_found"].append(run_id)
                         continue
                     
-                    # Try to cancel the task
-                    task_cancelled = await task_manager.cancel_task(run_id)
-                    
-                    # Update database status
-                    update_result = await self.db.runs.update_one(
-                        {"id": run_id, "user_id": self.user_id},
-                        {
-                            "$set": {
-                                "status": "aborted",
-                                "finished_at": datetime.now(timezone.utc).isoformat()
-                            }
-                        }
-                    )
-                    
-                    if update_result.modified_count > 0:
+                    aborted, task_cancelled = await task_manager.abort_run(self.db, run_id, self.user_id)
+                    if aborted:
                         results["success"].append(run_id)
                         logger.info(f"Aborted run: {run_id}, task_cancelled: {task_cancelled}")
                     else:
@@ -795,6 +776,7 @@ Then FUNCTION_CALL: {"name": "view_run_details", "arguments": {"run_id": "<first
                 "actor_id": actor["id"],
                 "actor_name": actor["name"],
                 "status": "queued",
+                "priority": 0,
                 "input_data": {
                     "search_terms": search_terms,
                     "location": location,
@@ -1,14 +1,84 @@
 import asyncio
 import logging
 import re
-from typing import List, Dict, Any, Optional
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, List, Dict, Any, Optional
 from scraper_engine import ScraperEngine
+from page_pool import PagePool
+from checkpoint import RunCheckpoint
+from caches import EnrichmentCache, PlaceCache, SearchCache
+from concurrency import AdaptiveLimiter, CancellationToken, ThrottledError, get_search_semaphore
 from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 from bs4 import BeautifulSoup
-import aiohttp
+from http_client import fetch_html
 
 logger = logging.getLogger(__name__)
 
+# Declarative table of place fields: read textContent, or the given attribute when "attr" is set
+PLACE_FIELD_SELECTORS = {
+    "title": {"selector": 'h1.DUwDvf, h1'},
+    "category": {"selector": 'button[jsaction*="category"]'},
+    "rating": {"selector": 'div.F7nice span[aria-label*="stars"]', "attr": "aria-label"},
+    "reviewsCount": {"selector": 'div.F7nice span[aria-label*="reviews"]', "attr": "aria-label"},
+    "address": {"selector": 'button[data-item-id="address"]'},
+    "phone": {"selector": 'button[data-item-id*="phone"]', "attr": "aria-label"},
+    "website": {"selector": 'a[data-item-id="authority"]', "attr": "href"},
+    "openingHours": {"selector": 'button[data-item-id="oh"]', "attr": "aria-label"},
+    "priceLevel": {"selector": 'span[aria-label*="Price"]'},
+}
+
+# Runs in the page: fields missing from the DOM are left out of the result.
+# When there is a website, links on the page are matched against the social
+# platform patterns in place and only the first match per platform is returned.
+EXTRACT_FIELDS_JS = """
+    ({fields, socialPatterns}) => {
+        const out = {};
+        for (const [name, spec] of Object.entries(fields)) {
+            const el = document.querySelector(spec.selector);
+            if (!el) continue;
+            out[name] = spec.attr ? el.getAttribute(spec.attr) : el.textContent;
+        }
+        if (out.website) {
+            const patterns = Object.entries(socialPatterns).map(([platform, source]) => [platform, new RegExp(source, 'i')]);
+            const social = {};
+            for (const link of document.querySelectorAll('a[href]')) {
+                const href = link.getAttribute('href');
+                for (const [platform, pattern] of patterns) {
+                    if (social[platform]) continue;
+                    const match = href.match(pattern);
+                    if (match) social[platform] = match[0];
+                }
+            }
+            out.socialLinks = social;
+        }
+        return out;
+    }
+"""
+
+# How long cancelled pipeline tasks get to unwind before we stop waiting on them
+CANCEL_GRACE_SECONDS = 1.0
+
+# Search is ready once the results feed renders, or a single place page is shown
+SEARCH_READY_SELECTOR = 'div[role="feed"], a[href*="/maps/place/"], h1.DUwDvf'
+
+# Common country names and codes found at the end of addresses
+COUNTRY_CODES = {
+    'USA': 'US', 'United States': 'US', 'US': 'US',
+    'India': 'IN', 'IN': 'IN',
+    'United Kingdom': 'GB', 'UK': 'GB', 'GB': 'GB',
+    'Canada': 'CA', 'CA': 'CA',
+    'Australia': 'AU', 'AU': 'AU',
+    'Germany': 'DE', 'DE': 'DE',
+    'France': 'FR', 'FR': 'FR',
+    'Spain': 'ES', 'ES': 'ES',
+    'Italy': 'IT', 'IT': 'IT',
+    'Mexico': 'MX', 'MX': 'MX',
+    'Brazil': 'BR', 'BR': 'BR',
+    'Japan': 'JP', 'JP': 'JP',
+    'China': 'CN', 'CN': 'CN',
+}
+
 class GoogleMapsScraperV3:
     """
     Enhanced Google Maps scraper with Apify-like performance:
@@ -18,8 +88,18 @@ class GoogleMapsScraperV3:
     - Retry logic for incomplete results
     """
     
-    def __init__(self, scraper_engine: ScraperEngine):
+    def __init__(
+        self,
+        scraper_engine: ScraperEngine,
+        place_cache: Optional[PlaceCache] = None,
+        enrichment_cache: Optional[EnrichmentCache] = None,
+        search_cache: Optional[SearchCache] = None
+    ):
         self.engine = scraper_engine
+        self.place_cache = place_cache
+        self.enrichment_cache = enrichment_cache
+        self.search_cache = search_cache
+        self.stats: Dict[str, Any] = {}
         self.base_url = "https://www.google.com/maps"
         self.email_pattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
         self.phone_pattern = re.compile(r'[\+\(]?[1-9][0-9 .\-\(\)]{8,}[0-9]')
@@ -33,10 +113,20 @@ class GoogleMapsScraperV3:
             'youtube': re.compile(r'(?:https?://)?(?:www\.)?youtube\.com/(?:channel|c|user)/[\w\-]+', re.I),
             'tiktok': re.compile(r'(?:https?://)?(?:www\.)?tiktok\.com/@[\w\-\.]+', re.I)
         }
+        self._extract_fields_arg = {
+            "fields": PLACE_FIELD_SELECTORS,
+            "socialPatterns": {platform: pattern.pattern for platform, pattern in self.social_patterns.items()}
+        }
     
-    async def scrape(self, config: Dict[str, Any], progress_callback=None) -> List[Dict[str, Any]]:
+    async def scrape(self, config: Dict[str, Any], progress_callback=None, result_callback=None, cancel_token: Optional[CancellationToken] = None, checkpoint: Optional[RunCheckpoint] = None) -> List[Dict[str, Any]]:
         """
         Main scraping method with enhanced performance.
+        
+        When result_callback is given, each finished place is handed to it as
+        soon as it is ready and not retained, so the returned list is empty.
+        Cancelling cancel_token closes the run's contexts and stops all workers.
+        With a checkpoint, discovered URLs are saved as they are found and a
+        resumed run skips places that were already extracted.
         """
         search_terms = config.get('search_terms', [])
         location = config.get('location', '')
@@ -44,84 +134,368 @@ class GoogleMapsScraperV3:
         extract_reviews = config.get('extract_reviews', False)
         extract_images = config.get('extract_images', False)
         
+        concurrency = max(1, int(config.get('concurrency', 5)))
+        adaptive_concurrency = config.get('adaptive_concurrency', False)
+        max_parallel_searches = max(1, int(config.get('max_parallel_searches', 2)))
+        enrich_websites = config.get('enrich_websites', True)
+        enrichment_concurrency = max(1, int(config.get('enrichment_concurrency', 10)))
+        
+        # Oldest cached place details this run accepts; None means the cache TTL
+        max_staleness_hours = config.get('cache_max_staleness_hours')
+        self._cache_max_staleness_s = None if max_staleness_hours is None else float(max_staleness_hours) * 3600
+        self._use_search_cache = config.get('use_search_cache', True)
+        
+        cancel_token = cancel_token or CancellationToken()
         all_results = []
-        context = await self.engine.create_context(use_proxy=True)
+        delivered = 0
+        self._started_at = time.monotonic()
+        self.stats['timings'] = {
+            "details_s": 0.0,
+            "details_count": 0,
+            "enrichment_s": 0.0,
+            "enrichment_count": 0
+        }
+        self.stats['place_cache'] = {"hits": 0, "misses": 0}
+        self.stats['enrichment'] = {"fetched": 0, "cached": 0}
+        self.stats['search_cache'] = {"hits": 0, "misses": 0}
+        limiter = AdaptiveLimiter(concurrency, adaptive=adaptive_concurrency)
+        run_semaphore = asyncio.Semaphore(max_parallel_searches)
+        global_semaphore = get_search_semaphore()
+        seen_place_ids = set()  # Shared across terms so overlapping searches are extracted once
+        pool_stats = []
+        enrich_queue: asyncio.Queue = asyncio.Queue()
         
-        try:
-            for term in search_terms:
-                if progress_callback:
-                    await progress_callback(f"🔍 Searching: {term} in {location}")
+        if checkpoint and await checkpoint.load():
+            seen_place_ids.update(checkpoint.completed_place_ids)
+            self.stats['resumed_place_count'] = len(checkpoint.completed_place_ids)
+            if progress_callback:
+                await progress_callback(f"♻️ Resuming run: {len(checkpoint.completed_place_ids)} places already extracted")
+        
+        async def deliver(place_data: Dict[str, Any]):
+            nonlocal delivered
+            delivered += 1
+            if result_callback:
+                await result_callback(place_data)
+            else:
+                all_results.append(place_data)
+        
+        async def emit(place_data: Dict[str, Any]):
+            # Websites are crawled in the enrichment stage after the Maps page is released
+            if enrich_websites and place_data.get('website'):
+                await enrich_queue.put(place_data)
+            else:
+                await deliver(place_data)
+        
+        async def enrich_worker():
+            while True:
+                place_data = await enrich_queue.get()
+                if place_data is None:
+                    return
+                cancel_token.raise_if_cancelled()
+                try:
+                    await self._enrich_place(place_data)
+                except Exception as e:
+                    logger.error(f"Enrichment failed for {place_data.get('website')}: {str(e)}")
+                await deliver(place_data)
+        
+        async def run_term(term: str) -> int:
+            # Each concurrent search gets its own isolated context and page pool
+            async with run_semaphore, global_semaphore:
+                cancel_token.raise_if_cancelled()
+                context = await self.engine.create_context(use_proxy=True)
+                page_pool = PagePool(self.engine, context, max_pages=concurrency)
                 
-                search_query = f"{term} {location}" if location else term
+                # Closing the context on cancel makes in-flight page calls fail right away
+                close_context = context.close
+                cancel_token.on_cancel(close_context)
+                try:
+                    return await self._scrape_term(
+                        context,
+                        page_pool,
+                        limiter,
+                        seen_place_ids,
+                        emit,
+                        term,
+                        location,
+                        max_results,
+                        extract_reviews,
+                        extract_images,
+                        cancel_token,
+                        progress_callback,
+                        checkpoint
+                    )
+                finally:
+                    cancel_token.remove_callback(close_context)
+                    pool_stats.append(page_pool.get_stats())
+                    await page_pool.close()
+                    await context.close()
+        
+        enrich_tasks = [asyncio.create_task(enrich_worker()) for _ in range(enrichment_concurrency if enrich_websites else 0)]
+        tasks = [asyncio.create_task(run_term(term)) for term in search_terms]
+        try:
+            await asyncio.gather(*tasks)
+            
+            # Drain the enrichment stage once every Maps page is done
+            for _ in enrich_tasks:
+                enrich_queue.put_nowait(None)
+            await asyncio.gather(*enrich_tasks)
+        
+        finally:
+            await self._cancel_and_wait(tasks + enrich_tasks)
+            self.stats['page_pool'] = self._merge_pool_stats(pool_stats)
+            self.stats['concurrency'] = limiter.get_stats()
+            self.stats['timings']['total_s'] = round(time.monotonic() - self._started_at, 2)
+        
+        timings = self.stats['timings']
+        logger.info(f"Page pool stats: {self.stats['page_pool']}")
+        logger.info(f"Stage timings: {timings}")
+        
+        if progress_callback and timings['enrichment_count']:
+            await progress_callback(
+                f"🌐 Enriched {timings['enrichment_count']} websites "
+                f"({self.stats['enrichment']['fetched']} fetched, {self.stats['enrichment']['cached']} from cache, "
+                f"avg {timings['enrichment_s'] / timings['enrichment_count']:.1f}s each)"
+            )
+        
+        if progress_callback and self.stats['place_cache']['hits']:
+            await progress_callback(f"⚡ Reused cached details for {self.stats['place_cache']['hits']} places")
+        
+        if progress_callback:
+            await progress_callback(f"🎉 Complete! Extracted {delivered} places with verified contacts")
+        
+        return all_results
+    
+    async def _scrape_term(
+        self,
+        context,
+        page_pool: PagePool,
+        limiter: AdaptiveLimiter,
+        seen_place_ids: set,
+        emit,
+        term: str,
+        location: str,
+        max_results: int,
+        extract_reviews: bool,
+        extract_images: bool,
+        cancel_token: CancellationToken,
+        progress_callback=None,
+        checkpoint: Optional[RunCheckpoint] = None
+    ) -> int:
+        """
+        Search one term and extract its places as a producer/consumer pipeline.
+        
+        Place URLs are queued as soon as they appear in the results feed, so
+        detail workers start while the search page is still scrolling. Each
+        extracted place is handed to emit; returns the number extracted.
+        """
+        if progress_callback:
+            await progress_callback(f"🔍 Searching: {term} in {location}")
+        
+        search_query = f"{term} {location}" if location else term
+        queue: asyncio.Queue = asyncio.Queue()
+        worker_count = limiter.max_limit
+        places = set()
+        extracted = 0
+        completed = 0
+        
+        async def add_place(place_url: str, record: bool = True):
+            places.add(place_url)
+            if checkpoint and record:
+                checkpoint.add_url(term, place_url)
+            await queue.put(place_url)
+        
+        async def produce():
+            # Retry logic for incomplete results
+            attempt = 0
+            max_attempts = 3
+            searched = False
+            cached_requested = 0
+            # Only a search whose feed ran out or filled max_results may be cached or checkpointed as done
+            complete = False
+            
+            try:
+                if checkpoint:
+                    # Re-queue what an interrupted run already discovered; consumers skip finished places
+                    for place_url in checkpoint.get_urls(term)[:max_results]:
+                        if place_url not in places:
+                            await add_place(place_url, record=False)
+                    attempt = checkpoint.get_attempts(term)
+                    if checkpoint.is_search_complete(term):
+                        attempt = max_attempts
+                        complete = True
                 
-                # Retry logic for incomplete results
-                attempt = 0
-                max_attempts = 3
-                places = []
+                if self.search_cache and self._use_search_cache and attempt < max_attempts:
+                    cached = await self.search_cache.get(search_query)
+                    if cached:
+                        for place_url in cached['urls']:
+                            if len(places) >= max_results:
+                                break
+                            if place_url not in places:
+                                await add_place(place_url)
+                        cached_requested = cached.get('requested', 0)
+                        self.stats['search_cache']['hits'] += 1
+                        
+                        # A search that already asked for as many results found all there are
+                        if cached_requested >= max_results:
+                            attempt = max_attempts
+                            complete = True
+                        if progress_callback:
+                            await progress_callback(f"⚡ Reused {len(places)} cached search results for '{term}'")
+                    else:
+                        self.stats['search_cache']['misses'] += 1
                 
                 while attempt < max_attempts and len(places) < max_results:
+                    cancel_token.raise_if_cancelled()
                     if attempt > 0:
                         if progress_callback:
                             await progress_callback(f"🔄 Retry {attempt}/{max_attempts-1} - Found {len(places)}/{max_results}")
                     
-                    new_places = await self._search_places(context, search_query, max_results)
-                    
-                    # Merge and deduplicate
-                    for place_url in new_places:
-                        if place_url not in places:
-                            places.append(place_url)
+                    searched = True
+                    outcome = {"ended": False}
+                    async with aclosing(self._search_places(context, search_query, max_results, cancel_token, outcome)) as discovered:
+                        async for place_url in discovered:
+                            # Merge and deduplicate across attempts (and with cached results, so only the delta is added)
+                            if place_url in places:
+                                continue
+                            await add_place(place_url)
+                            if len(places) >= max_results:
+                                break
                     
+                    if outcome["ended"]:
+                        complete = True
                     if len(places) >= max_results:
+                        complete = True
                         break
                     
                     attempt += 1
-                    if attempt < max_attempts:
-                        await asyncio.sleep(2)
+                    if checkpoint:
+                        await checkpoint.record_attempt(term, attempt)
+                
+                cancel_token.raise_if_cancelled()
+                if searched and complete and self.search_cache and places:
+                    await self.search_cache.set(search_query, list(places), max(max_results, cached_requested))
+                
+                if checkpoint and complete:
+                    await checkpoint.mark_search_complete(term)
                 
                 if progress_callback:
                     await progress_callback(f"✅ Found {len(places)} places for '{term}'")
+            
+            finally:
+                # One sentinel per worker marks the end of discovery
+                for _ in range(worker_count):
+                    queue.put_nowait(None)
+        
+        async def consume():
+            nonlocal completed, extracted
+            while True:
+                place_url = await queue.get()
+                if place_url is None:
+                    return
+                cancel_token.raise_if_cancelled()
                 
-                # Extract details in parallel batches
-                batch_size = 5  # Process 5 places at once
-                places_to_process = places[:max_results]
+                # Skip places already claimed by another term in this run
+                place_key = self._extract_place_id(place_url) or place_url
+                if place_key in seen_place_ids:
+                    completed += 1
+                    continue
+                seen_place_ids.add(place_key)
                 
-                for i in range(0, len(places_to_process), batch_size):
-                    batch = places_to_process[i:i+batch_size]
+                # Fresh cached details skip the browser entirely
+                result = await self._get_cached_place(place_url, extract_reviews, extract_images)
+                if result is None:
+                    detail_started = time.monotonic()
+                    try:
+                        async with limiter:
+                            result = await self._extract_place_details(
+                                page_pool,
+                                place_url,
+                                extract_reviews,
+                                extract_images,
+                                limiter,
+                                cancel_token
+                            )
+                    except Exception as e:
+                        logger.error(f"Worker failed on {place_url}: {str(e)}")
+                        result = None
                     
-                    if progress_callback:
-                        progress = min(i + batch_size, len(places_to_process))
-                        await progress_callback(f"📊 Extracting details: {progress}/{len(places_to_process)}")
+                    self.stats['timings']['details_s'] += time.monotonic() - detail_started
+                    self.stats['timings']['details_count'] += 1
                     
-                    # Parallel extraction
-                    tasks = [
-                        self._extract_place_details(
-                            context,
-                            place_url,
-                            extract_reviews,
-                            extract_images
+                    if isinstance(result, dict) and self.place_cache and result.get('placeId'):
+                        await self.place_cache.set(
+                            result['placeId'],
+                            result,
+                            has_reviews=extract_reviews,
+                            has_images=extract_images
                         )
-                        for place_url in batch
-                    ]
-                    
-                    batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-                    
-                    for result in batch_results:
-                        if isinstance(result, dict):
-                            all_results.append(result)
-                    
-                    # Small delay between batches
-                    await asyncio.sleep(0.5)
+                
+                if isinstance(result, dict):
+                    extracted += 1
+                    await emit(result)
+                    self.stats.setdefault('time_to_first_result_s', round(time.monotonic() - self._started_at, 2))
+                
+                completed += 1
+                if progress_callback and completed % worker_count == 0:
+                    await progress_callback(f"📊 Extracting details: {completed}/{len(places)}")
         
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(consume()) for _ in range(worker_count)]
+        try:
+            await asyncio.gather(*tasks)
         finally:
-            await context.close()
+            await self._cancel_and_wait(tasks)
         
         if progress_callback:
-            await progress_callback(f"🎉 Complete! Extracted {len(all_results)} places with verified contacts")
+            await progress_callback(f"📊 Extracted details for {extracted}/{len(places)} places for '{term}'")
         
-        return all_results
+        return extracted
+    
+    async def _get_cached_place(self, place_url: str, extract_reviews: bool, extract_images: bool) -> Optional[Dict[str, Any]]:
+        """Look up place details from earlier runs, honouring the run's max staleness."""
+        place_id = self._extract_place_id(place_url)
+        if not self.place_cache or not place_id:
+            return None
+        
+        cached = await self.place_cache.get(
+            place_id,
+            max_staleness_seconds=self._cache_max_staleness_s,
+            need_reviews=extract_reviews,
+            need_images=extract_images
+        )
+        if cached is None:
+            self.stats['place_cache']['misses'] += 1
+            return None
+        
+        self.stats['place_cache']['hits'] += 1
+        cached['url'] = place_url
+        return cached
+    
+    async def _cancel_and_wait(self, tasks: List[asyncio.Task]):
+        """Cancel unfinished pipeline tasks and give them a bounded time to unwind."""
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending, timeout=CANCEL_GRACE_SECONDS)
+    
+    def _merge_pool_stats(self, pool_stats: List[Dict[str, int]]) -> Dict[str, int]:
+        """Sum page pool counters across the contexts used by a run."""
+        merged = {"pools": len(pool_stats)}
+        for stats in pool_stats:
+            for key, value in stats.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
     
-    async def _search_places(self, context, query: str, max_results: int) -> List[str]:
-        """Enhanced search with better scrolling and pagination."""
+    async def _search_places(self, context, query: str, max_results: int, cancel_token: Optional[CancellationToken] = None, outcome: Optional[Dict[str, bool]] = None) -> AsyncIterator[str]:
+        """
+        Enhanced search with better scrolling, streaming each new place URL as it appears.
+        
+        outcome["ended"] is set when the results feed was exhausted or max_results
+        was reached; it stays False when navigation or scrolling failed part way.
+        """
+        outcome = outcome if outcome is not None else {}
+        outcome["ended"] = False
         page = await context.new_page()
         place_urls = set()  # Use set for automatic deduplication
         
@@ -129,66 +503,46 @@ class GoogleMapsScraperV3:
             search_url = f"{self.base_url}/search/{query.replace(' ', '+')}"
             await page.goto(search_url, wait_until="domcontentloaded", timeout=30000)
             
-            # Wait for results
-            await asyncio.sleep(3)
+            # Wait for the results feed (or a single place page) instead of a fixed delay
+            await self.engine.wait_for_selector_safe(page, SEARCH_READY_SELECTOR)
             
             # Enhanced scrolling with more attempts
             for scroll_attempt in range(20):  # Increased from 10 to 20
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+                
                 # Get all place links
                 links = await page.query_selector_all('a[href*="/maps/place/"]')
                 
                 for link in links:
                     try:
                         href = await link.get_attribute('href')
-                        if href and '/maps/place/' in href:
+                        if href and '/maps/place/' in href and href not in place_urls:
                             place_urls.add(href)
+                            if len(place_urls) >= max_results:
+                                outcome["ended"] = True
+                            yield href
                             
                             if len(place_urls) >= max_results:
                                 break
-                    except:
+                    except Exception:
                         continue
                 
                 if len(place_urls) >= max_results:
                     break
                 
-                # Better scrolling logic
+                # Scroll the feed and wait until new results load, up to a deadline
                 try:
-                    # Get current scroll position
-                    prev_height = await page.evaluate("""
-                        () => {
-                            const panel = document.querySelector('div[role="feed"]');
-                            return panel ? panel.scrollHeight : 0;
-                        }
-                    """)
-                    
-                    # Scroll down
-                    await page.evaluate("""
-                        () => {
-                            const panel = document.querySelector('div[role="feed"]');
-                            if (panel) {
-                                panel.scrollTop = panel.scrollHeight;
-                            }
-                        }
-                    """)
-                    
-                    # Wait for new content
-                    await asyncio.sleep(2)
-                    
-                    # Check if new content loaded
-                    new_height = await page.evaluate("""
-                        () => {
-                            const panel = document.querySelector('div[role="feed"]');
-                            return panel ? panel.scrollHeight : 0;
-                        }
-                    """)
+                    grew = await self.engine.scroll_and_wait_for_growth(page, 'div[role="feed"]', timeout=5000)
                     
                     # If no new content, we've reached the end
-                    if new_height == prev_height:
+                    if not grew:
                         logger.info(f"Reached end of results at {len(place_urls)} places")
+                        outcome["ended"] = True
                         break
                         
                 except Exception as e:
-                    logger.debug(f"Scrolling error: {str(e)}")
+                    logger.warning(f"Scrolling error, results may be incomplete: {str(e)}")
                     break
             
             logger.info(f"Found {len(place_urls)} unique place URLs for query: {query}")
@@ -198,140 +552,34 @@ class GoogleMapsScraperV3:
         
         finally:
             await page.close()
-        
-        return list(place_urls)
     
-    async def _extract_place_details(self, context, url: str, extract_reviews: bool = False, extract_images: bool = False) -> Optional[Dict[str, Any]]:
+    async def _extract_place_details(self, page_pool: PagePool, url: str, extract_reviews: bool = False, extract_images: bool = False, limiter: Optional[AdaptiveLimiter] = None, cancel_token: Optional[CancellationToken] = None) -> Optional[Dict[str, Any]]:
         """Extract detailed information with email and verified phone."""
-        page = await context.new_page()
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        page = await page_pool.checkout()
         
         try:
-            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
-            await asyncio.sleep(2)
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            if response and response.status == 429:
+                raise ThrottledError(f"Rate limited (429) on {url}")
+            await self.engine.wait_for_selector_safe(page, PLACE_FIELD_SELECTORS['title']['selector'])
             
             place_data = {
                 'url': url,
                 'placeId': self._extract_place_id(url)
             }
             
-            # Extract title/name
-            title_selector = 'h1.DUwDvf, h1'
-            title_elem = await page.query_selector(title_selector)
-            if title_elem:
-                place_data['title'] = await title_elem.text_content()
+            # All fields come back from one in-page evaluation instead of a round-trip per selector
+            raw_fields = await page.evaluate(EXTRACT_FIELDS_JS, self._extract_fields_arg)
+            self._parse_place_fields(raw_fields, place_data)
             
-            # Extract category
-            category_selector = 'button[jsaction*="category"]'
-            category_elem = await page.query_selector(category_selector)
-            if category_elem:
-                place_data['category'] = await category_elem.text_content()
-            
-            # Extract rating
-            rating_selector = 'div.F7nice span[aria-label*="stars"]'
-            rating_elem = await page.query_selector(rating_selector)
-            if rating_elem:
-                rating_text = await rating_elem.get_attribute('aria-label')
-                if rating_text:
-                    match = re.search(r'([0-9.]+)', rating_text)
-                    if match:
-                        place_data['rating'] = float(match.group(1))
-            
-            # Extract reviews count
-            reviews_selector = 'div.F7nice span[aria-label*="reviews"]'
-            reviews_elem = await page.query_selector(reviews_selector)
-            if reviews_elem:
-                reviews_text = await reviews_elem.get_attribute('aria-label')
-                if reviews_text:
-                    match = re.search(r'([0-9,]+)', reviews_text)
-                    if match:
-                        place_data['reviewsCount'] = int(match.group(1).replace(',', ''))
-            
-            # Extract address
-            address_selector = 'button[data-item-id="address"]'
-            address_elem = await page.query_selector(address_selector)
-            if address_elem:
-                address_text = await address_elem.text_content()
-                place_data['address'] = address_text.strip() if address_text else None
-                
-                # Parse city, state, and country from address
-                if place_data['address']:
-                    address_parts = place_data['address'].split(',')
-                    if len(address_parts) >= 3:
-                        place_data['city'] = address_parts[-2].strip()
-                        state_zip = address_parts[-1].strip().split()
-                        place_data['state'] = state_zip[0] if state_zip else None
-                    
-                    # Extract country code from address (last part usually contains country)
-                    # Common patterns: "USA", "United States", "India", etc.
-                    country_map = {
-                        'USA': 'US', 'United States': 'US', 'US': 'US',
-                        'India': 'IN', 'IN': 'IN',
-                        'United Kingdom': 'GB', 'UK': 'GB', 'GB': 'GB',
-                        'Canada': 'CA', 'CA': 'CA',
-                        'Australia': 'AU', 'AU': 'AU',
-                        'Germany': 'DE', 'DE': 'DE',
-                        'France': 'FR', 'FR': 'FR',
-                        'Spain': 'ES', 'ES': 'ES',
-                        'Italy': 'IT', 'IT': 'IT',
-                        'Mexico': 'MX', 'MX': 'MX',
-                        'Brazil': 'BR', 'BR': 'BR',
-                        'Japan': 'JP', 'JP': 'JP',
-                        'China': 'CN', 'CN': 'CN',
-                    }
-                    
-                    # Try to find country in last address part
-                    if len(address_parts) >= 2:
-                        last_part = address_parts[-1].strip()
-                        for country_name, country_code in country_map.items():
-                            if country_name in last_part:
-                                place_data['countryCode'] = country_code
-                                break
-                    
-                    # Default to US if not found and state exists (common for US addresses)
-                    if 'countryCode' not in place_data and place_data.get('state'):
-                        place_data['countryCode'] = 'US'
-            
-            # Extract phone with verification
-            phone_selector = 'button[data-item-id*="phone"]'
-            phone_elem = await page.query_selector(phone_selector)
-            if phone_elem:
-                phone_text = await phone_elem.get_attribute('aria-label')
-                if phone_text:
-                    phone = phone_text.replace('Phone: ', '').replace('Call phone number', '').strip()
-                    place_data['phone'] = phone
-                    place_data['phoneVerified'] = True  # Phone on Google Maps is verified
-            
-            # Extract website and email
-            website_selector = 'a[data-item-id="authority"]'
-            website_elem = await page.query_selector(website_selector)
-            if website_elem:
-                website_url = await website_elem.get_attribute('href')
-                place_data['website'] = website_url
-                
-                # Try to extract email and social media from website
-                if website_url:
-                    email = await self._extract_email_from_website(website_url)
-                    if email:
-                        place_data['email'] = email
-                        place_data['emailVerified'] = True  # Email from business website
-                    
-                    # Extract social media links
-                    social_links = await self._extract_social_media(page, website_url)
-                    if social_links:
-                        place_data['socialMedia'] = social_links
-            
-            # Extract opening hours
-            hours_button = await page.query_selector('button[data-item-id="oh"]')
-            if hours_button:
-                hours_text = await hours_button.get_attribute('aria-label')
-                place_data['openingHours'] = hours_text if hours_text else None
-            
-            # Extract price level
-            price_selector = 'span[aria-label*="Price"]'
-            price_elem = await page.query_selector(price_selector)
-            if price_elem:
-                price_text = await price_elem.text_content()
-                place_data['priceLevel'] = price_text.strip() if price_text else None
+            # Social media links shown on the Maps page; the website itself is crawled in enrichment
+            if place_data.get('website') and raw_fields.get('socialLinks'):
+                social_links = {}
+                self._find_social_links('\n'.join(raw_fields['socialLinks'].values()), social_links)
+                if social_links:
+                    place_data['socialMedia'] = social_links
             
             # Extract images if requested
             if extract_images:
@@ -348,43 +596,113 @@ class GoogleMapsScraperV3:
                 place_data['totalScore'] = round(place_data['rating'] * math.log(place_data['reviewsCount'] + 1, 10), 2)
             
             logger.info(f"✅ Extracted: {place_data.get('title', 'Unknown')} - Phone: {'✓' if place_data.get('phone') else '✗'}, Email: {'✓' if place_data.get('email') else '✗'}")
+            if limiter:
+                await limiter.record_success()
             return place_data
         
+        except (PlaywrightTimeoutError, ThrottledError) as e:
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            logger.warning(f"Backing off after {type(e).__name__} on {url}: {str(e)}")
+            if limiter:
+                await limiter.record_backoff()
+            return None
+        
         except Exception as e:
+            # Errors from a context closed by cancellation are cancellation, not a failed place
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
             logger.error(f"Error extracting place details from {url}: {str(e)}")
             return None
         
         finally:
-            await page.close()
+            await page_pool.checkin(page)
+    
+    def _parse_place_fields(self, raw: Dict[str, Optional[str]], place_data: Dict[str, Any]):
+        """Turn the raw strings returned by EXTRACT_FIELDS_JS into typed place fields."""
+        if 'title' in raw:
+            place_data['title'] = raw['title']
+        
+        if 'category' in raw:
+            place_data['category'] = raw['category']
+        
+        # Rating from aria-label, e.g. "4.5 stars"
+        if raw.get('rating'):
+            match = re.search(r'([0-9.]+)', raw['rating'])
+            if match:
+                place_data['rating'] = float(match.group(1))
+        
+        # Reviews count from aria-label, e.g. "1,234 reviews"
+        if raw.get('reviewsCount'):
+            match = re.search(r'([0-9,]+)', raw['reviewsCount'])
+            if match:
+                place_data['reviewsCount'] = int(match.group(1).replace(',', ''))
+        
+        if 'address' in raw:
+            address_text = raw['address']
+            place_data['address'] = address_text.strip() if address_text else None
+            
+            # Parse city, state, and country from address
+            if place_data['address']:
+                address_parts = place_data['address'].split(',')
+                if len(address_parts) >= 3:
+                    place_data['city'] = address_parts[-2].strip()
+                    state_zip = address_parts[-1].strip().split()
+                    place_data['state'] = state_zip[0] if state_zip else None
+                
+                # Try to find country in last address part (last part usually contains country)
+                if len(address_parts) >= 2:
+                    last_part = address_parts[-1].strip()
+                    for country_name, country_code in COUNTRY_CODES.items():
+                        if country_name in last_part:
+                            place_data['countryCode'] = country_code
+                            break
+                
+                # Default to US if not found and state exists (common for US addresses)
+                if 'countryCode' not in place_data and place_data.get('state'):
+                    place_data['countryCode'] = 'US'
+        
+        # Phone with verification
+        if raw.get('phone'):
+            phone = raw['phone'].replace('Phone: ', '').replace('Call phone number', '').strip()
+            place_data['phone'] = phone
+            place_data['phoneVerified'] = True  # Phone on Google Maps is verified
+        
+        # Website (email is found later by the enrichment stage)
+        if 'website' in raw:
+            place_data['website'] = raw['website']
+        
+        if 'openingHours' in raw:
+            place_data['openingHours'] = raw['openingHours'] if raw['openingHours'] else None
+        
+        if 'priceLevel' in raw:
+            price_text = raw['priceLevel']
+            place_data['priceLevel'] = price_text.strip() if price_text else None
     
-    async def _extract_email_from_website(self, website_url: str) -> Optional[str]:
-        """Extract email from business website."""
+    def _extract_email_from_html(self, html: str) -> Optional[str]:
+        """Extract email from business website HTML."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(website_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        # Look for email in common locations
-                        # 1. mailto: links
-                        mailto_links = soup.find_all('a', href=re.compile(r'^mailto:', re.I))
-                        if mailto_links:
-                            email = mailto_links[0]['href'].replace('mailto:', '').split('?')[0]
-                            if self._is_valid_email(email):
-                                return email.lower()
-                        
-                        # 2. Search in text content
-                        text_content = soup.get_text()
-                        emails = self.email_pattern.findall(text_content)
-                        
-                        # Filter out common non-business emails
-                        for email in emails:
-                            if self._is_business_email(email):
-                                return email.lower()
+            soup = BeautifulSoup(html, 'html.parser')
+            
+            # Look for email in common locations
+            # 1. mailto: links
+            mailto_links = soup.find_all('a', href=re.compile(r'^mailto:', re.I))
+            if mailto_links:
+                email = mailto_links[0]['href'].replace('mailto:', '').split('?')[0]
+                if self._is_valid_email(email):
+                    return email.lower()
+            
+            # 2. Search in text content
+            text_content = soup.get_text()
+            emails = self.email_pattern.findall(text_content)
+            
+            # Filter out common non-business emails
+            for email in emails:
+                if self._is_business_email(email):
+                    return email.lower()
         
         except Exception as e:
-            logger.debug(f"Email extraction error from {website_url}: {str(e)}")
+            logger.debug(f"Email extraction error: {str(e)}")
         
         return None
     
@@ -422,7 +740,7 @@ class GoogleMapsScraperV3:
             photos_button = await page.query_selector('button[aria-label*="Photo"]')
             if photos_button:
                 await photos_button.click()
-                await asyncio.sleep(2)
+                await self.engine.wait_for_selector_safe(page, 'img[src*="googleusercontent"]', timeout=5000)
                 
                 img_elements = await page.query_selector_all('img[src*="googleusercontent"]')
                 for img in img_elements[:10]:
@@ -443,18 +761,11 @@ class GoogleMapsScraperV3:
             reviews_button = await page.query_selector('button[aria-label*="Reviews"]')
             if reviews_button:
                 await reviews_button.click()
-                await asyncio.sleep(2)
+                await self.engine.wait_for_selector_safe(page, 'div[data-review-id]', timeout=5000)
                 
                 for _ in range(3):
-                    await page.evaluate("""
-                        () => {
-                            const panel = document.querySelector('div[role="main"]');
-                            if (panel) {
-                                panel.scrollTop = panel.scrollHeight;
-                            }
-                        }
-                    """)
-                    await asyncio.sleep(1)
+                    if not await self.engine.scroll_and_wait_for_growth(page, 'div[role="main"]', timeout=2000):
+                        break
                 
                 review_elements = await page.query_selector_all('div[data-review-id]')
                 for elem in review_elements[:max_reviews]:
@@ -483,53 +794,73 @@ class GoogleMapsScraperV3:
                         
                         if review_data:
                             reviews.append(review_data)
-                    except:
+                    except Exception:
                         continue
         except Exception as e:
             logger.debug(f"Error extracting reviews: {str(e)}")
         
         return reviews
     
-    async def _extract_social_media(self, page: Page, website_url: str) -> Dict[str, str]:
-        """Extract social media links from Google Maps page and business website."""
-        social_links = {}
-        
-        try:
-            # 1. Check Google Maps page for social media links
-            page_content = await page.content()
-            
-            for platform, pattern in self.social_patterns.items():
-                matches = pattern.findall(page_content)
+    def _find_social_links(self, content: str, social_links: Dict[str, str]):
+        """Add social media links found in content for platforms not already present."""
+        for platform, pattern in self.social_patterns.items():
+            if platform not in social_links:  # Don't override existing
+                matches = pattern.findall(content)
                 if matches:
                     # Clean and normalize URL
                     url = matches[0]
                     if not url.startswith('http'):
                         url = 'https://' + url
                     social_links[platform] = url
+    
+    async def _enrich_place(self, place_data: Dict[str, Any]):
+        """Enrichment stage: crawl the business website once for email and social links."""
+        enrich_started = time.monotonic()
+        fetched = False
+        
+        async def crawl(url: str) -> Dict[str, Any]:
+            nonlocal fetched
+            fetched = True
+            return await self._crawl_website(url)
+        
+        try:
+            if self.enrichment_cache:
+                # Branches of a chain share one website, so results are reused per domain
+                result = await self.enrichment_cache.get_or_fetch(place_data['website'], crawl)
+            else:
+                result = await crawl(place_data['website'])
             
-            # 2. If website exists, check there too
-            if website_url and len(social_links) < 3:  # Only if we don't have many links yet
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(website_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                            if response.status == 200:
-                                html = await response.text()
-                                
-                                for platform, pattern in self.social_patterns.items():
-                                    if platform not in social_links:  # Don't override existing
-                                        matches = pattern.findall(html)
-                                        if matches:
-                                            url = matches[0]
-                                            if not url.startswith('http'):
-                                                url = 'https://' + url
-                                            social_links[platform] = url
-                except Exception as e:
-                    logger.debug(f"Error extracting social media from website: {str(e)}")
+            self.stats['enrichment']['fetched' if fetched else 'cached'] += 1
+            if not result or result.get('failed'):
+                return
+            
+            if result.get('email'):
+                place_data['email'] = result['email']
+                place_data['emailVerified'] = True  # Email from business website
+            
+            social_links = place_data.get('socialMedia', {})
+            if len(social_links) < 3:  # Only if we don't have many links yet
+                for platform, url in result.get('socialMedia', {}).items():
+                    social_links.setdefault(platform, url)  # Don't override existing
+            if social_links:
+                place_data['socialMedia'] = social_links
         
-        except Exception as e:
-            logger.debug(f"Error extracting social media: {str(e)}")
+        finally:
+            self.stats['timings']['enrichment_s'] += time.monotonic() - enrich_started
+            self.stats['timings']['enrichment_count'] += 1
+    
+    async def _crawl_website(self, url: str) -> Dict[str, Any]:
+        """Fetch a business website and extract its email and social links."""
+        website_html = await fetch_html(url)
+        if not website_html:
+            return {'failed': True}
         
-        return social_links
+        social_links = {}
+        self._find_social_links(website_html, social_links)
+        return {
+            'email': self._extract_email_from_html(website_html),
+            'socialMedia': social_links
+        }
     
     def _extract_place_id(self, url: str) -> Optional[str]:
         """Extract place ID from Google Maps URL."""
@@ -0,0 +1,67 @@
+"""
+Shared HTTP client for website enrichment.
+One pooled aiohttp session per process keeps connections and DNS lookups
+warm instead of opening a new session for every request.
+"""
+
+import logging
+import os
+from typing import Optional
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9"
+}
+
+# Largest page body read for enrichment; contact details live well within this
+MAX_HTML_BYTES = 2 * 1024 * 1024
+
+_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the process-wide pooled HTTP session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=int(os.environ.get('HTTP_POOL_LIMIT', '100')),
+            limit_per_host=int(os.environ.get('HTTP_POOL_LIMIT_PER_HOST', '4')),
+            ttl_dns_cache=300,
+            keepalive_timeout=30
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers=DEFAULT_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+    return _session
+
+async def fetch_html(url: str, timeout: float = 10) -> Optional[str]:
+    """Fetch a page's HTML through the shared session. Returns None on non-200 or error."""
+    try:
+        session = get_http_session()
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 200:
+                return None
+            chunks = []
+            size = 0
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_HTML_BYTES:
+                    break
+            body = b''.join(chunks)[:MAX_HTML_BYTES]
+            return body.decode(response.charset or 'utf-8', errors='replace')
+    except Exception as e:
+        logger.debug(f"Fetch error from {url}: {str(e)}")
+        return None
+
+async def close_http_session():
+    """Close the shared session (called on shutdown)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -1,8 +1,11 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone
 import uuid
 
+# Run priorities only order a user's own queued runs
+MAX_RUN_PRIORITY = 10
+
 # User Models
 class UserCreate(BaseModel):
     username: str
@@ -119,6 +122,7 @@ class Run(BaseModel):
     actor_id: str
     actor_name: str
     status: str = "queued"  # queued, running, succeeded, failed, aborted
+    priority: int = 0  # Higher runs first among the same user's queued runs (0..MAX_RUN_PRIORITY)
     input_data: Dict[str, Any] = Field(default_factory=dict)
     started_at: Optional[datetime] = None
     finished_at: Optional[datetime] = None
@@ -127,6 +131,7 @@ class Run(BaseModel):
     dataset_id: Optional[str] = None
     error_message: Optional[str] = None
     logs: List[str] = Field(default_factory=list)
+    stats: Dict[str, Any] = Field(default_factory=dict)  # Scraper tuning stats (page pool, timings)
     cost: float = 0.0
     build_number: Optional[str] = None
     origin: str = "Web"
@@ -135,6 +140,12 @@ class Run(BaseModel):
 class RunCreate(BaseModel):
     actor_id: str
     input_data: Dict[str, Any]
+    priority: int = 0
+    
+    @field_validator("priority")
+    @classmethod
+    def clamp_priority(cls, value: int) -> int:
+        return max(0, min(value, MAX_RUN_PRIORITY))
 
 # Dataset Models
 class DatasetItem(BaseModel):
@@ -154,6 +165,34 @@ class Dataset(BaseModel):
     item_count: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class RangeFilter(BaseModel):
+    min: Optional[float] = None  # Inclusive bounds; either may be omitted
+    max: Optional[float] = None
+
+class DatasetQuery(BaseModel):
+    # Filters, combined with AND; list filters match any of their values
+    search: Optional[str] = None
+    rating: Optional[RangeFilter] = None
+    reviewsCount: Optional[RangeFilter] = None
+    totalScore: Optional[RangeFilter] = None
+    category: Optional[List[str]] = None
+    city: Optional[List[str]] = None
+    state: Optional[List[str]] = None
+    countryCode: Optional[List[str]] = None
+    has_email: Optional[bool] = None
+    has_phone: Optional[bool] = None
+    has_website: Optional[bool] = None
+    # Sorting and paging
+    sort_by: str = "created_at"  # created_at, rating, reviewsCount, totalScore, title
+    sort_order: str = "asc"
+    page: int = 1
+    limit: int = 20
+    # Facet counts to compute over the filtered items (category, city, state, countryCode, rating, presence)
+    facets: List[str] = Field(default_factory=list)
+    facet_limit: int = 20
+    # Data fields to return per item; all fields when omitted
+    fields: Optional[List[str]] = None
+
 # Proxy Models
 class Proxy(BaseModel):
     model_config = ConfigDict(extra="ignore")
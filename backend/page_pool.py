@@ -0,0 +1,108 @@
+"""
+Page Pool for reusing Playwright pages within a single browser context.
+Pages are checked out, navigated, reset and returned instead of being
+created and destroyed for every URL.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List
+from playwright.async_api import BrowserContext, Page
+
+logger = logging.getLogger(__name__)
+
+class PagePool:
+    """Bounded pool of reusable pages for one browser context."""
+
+    def __init__(self, engine, context: BrowserContext, max_pages: int = 5):
+        self.engine = engine
+        self.context = context
+        self.max_pages = max_pages
+        self.idle_pages: List[Page] = []
+        self.created = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self._condition = asyncio.Condition()
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """Number of live pages owned by the pool (idle and checked out)."""
+        return self.created - self.discarded
+
+    async def checkout(self) -> Page:
+        """Get an idle page, creating one if the pool is below its size limit."""
+        async with self._condition:
+            while True:
+                while self.idle_pages:
+                    page = self.idle_pages.pop()
+                    if not page.is_closed():
+                        self.hits += 1
+                        return page
+                    self.discarded += 1
+
+                if self.size < self.max_pages:
+                    self.created += 1
+                    self.misses += 1
+                    break
+
+                await self._condition.wait()
+
+        try:
+            return await self.engine.new_page(self.context)
+        except Exception:
+            async with self._condition:
+                self.discarded += 1
+                self._condition.notify()
+            raise
+
+    async def checkin(self, page: Page):
+        """Reset a page and return it to the pool, discarding it if it is unusable."""
+        reusable = not self._closed and not page.is_closed()
+
+        if reusable:
+            try:
+                # Drop the previous document so listeners, timers and memory are released
+                await page.goto("about:blank", timeout=5000)
+            except Exception as e:
+                logger.debug(f"Failed to reset pooled page: {str(e)}")
+                reusable = False
+
+        if not reusable and not page.is_closed():
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+        async with self._condition:
+            if reusable:
+                self.idle_pages.append(page)
+            else:
+                self.discarded += 1
+            self._condition.notify()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get pool size and reuse counters for tuning."""
+        return {
+            "max_pages": self.max_pages,
+            "size": self.size,
+            "idle": len(self.idle_pages),
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded
+        }
+
+    async def close(self):
+        """Close all idle pages. Checked-out pages are closed when returned."""
+        self._closed = True
+        async with self._condition:
+            pages, self.idle_pages = self.idle_pages, []
+            self.discarded += len(pages)
+            self._condition.notify_all()
+
+        for page in pages:
+            try:
+                await page.close()
+            except Exception:
+                pass
@@ -0,0 +1,101 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are addressed by an opaque cursor encoding the sort value and id of
+the last document returned, so fetching a deep page costs the same as the
+first one instead of skipping over every earlier document. Totals are
+served from a short-lived count cache unless an exact count is requested.
+"""
+
+import base64
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+COUNT_CACHE_TTL = float(os.environ.get('COUNT_CACHE_TTL_SECONDS', '15'))
+
+_count_cache: Dict[str, Tuple[float, int]] = {}
+
+def encode_cursor(doc: Dict[str, Any], sort_field: str) -> str:
+    """Opaque cursor pointing just past doc."""
+    payload = json.dumps({"v": doc.get(sort_field), "id": doc.get("id")}, default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Return (sort value, id) from a cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return payload["v"], payload["id"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def keyset_filter(sort_field: str, direction: int, cursor: str) -> Dict[str, Any]:
+    """
+    Filter selecting documents after the cursor in (sort_field, id) order.
+
+    MongoDB sorts null and missing values before every other value, and
+    $lt/$gt never compare them with non-null ones, so they get their own
+    branches: in an ascending walk nulls come first, in a descending walk
+    they come last.
+    """
+    value, last_id = decode_cursor(cursor)
+    op = "$lt" if direction < 0 else "$gt"
+    same_value_after = {sort_field: value, "id": {op: last_id}}
+
+    if value is None:
+        if direction < 0:
+            return same_value_after
+        return {"$or": [same_value_after, {sort_field: {"$ne": None}}]}
+
+    branches = [{sort_field: {op: value}}, same_value_after]
+    if direction < 0:
+        branches.append({sort_field: None})
+    return {"$or": branches}
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    direction: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    projection: Optional[Dict[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page sorted by (sort_field, id) and the cursor for the next one.
+
+    With a cursor the page starts right after it; otherwise skip is applied
+    (kept for clients still paging by number). next_cursor is None on the
+    last page.
+    """
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort_field, direction, cursor)]}
+        skip = 0
+
+    find = collection.find(query, projection or {"_id": 0}).sort([(sort_field, direction), ("id", direction)])
+    if skip:
+        find = find.skip(skip)
+    docs = await find.limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return docs, next_cursor
+
+async def cached_count(collection, query: Dict[str, Any], ttl: float = COUNT_CACHE_TTL) -> int:
+    """count_documents, reused for ttl seconds per collection and query."""
+    key = f"{collection.name}:{json.dumps(query, sort_keys=True, default=str)}"
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and now - cached[0] < ttl:
+        return cached[1]
+
+    count = await collection.count_documents(query)
+    if len(_count_cache) > 10000:
+        _count_cache.clear()
+    _count_cache[key] = (now, count)
+    return count
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime, timezone
 from models import (
     UserCreate, UserLogin, UserResponse, Actor, ActorCreate, ActorUpdate, ActorPublish,
-    Run, RunCreate, Dataset, DatasetItem, Proxy, ProxyCreate,
+    Run, RunCreate, Dataset, DatasetQuery, Proxy, ProxyCreate,
     LeadChatMessage, LeadChatRequest
 )
-from auth import create_access_token, get_current_user, hash_password, verify_password
+from auth import (
+    create_access_token, create_stream_token, get_current_user, get_current_user_for_stream,
+    hash_password, verify_password, STREAM_TOKEN_EXPIRE_SECONDS
+)
 from proxy_manager import get_proxy_manager
 from scraper_engine import ScraperEngine
 from google_maps_scraper_v3 import GoogleMapsScraperV3
@@ -14,9 +18,25 @@ from chat_service import LeadChatService
 from global_chat_service import GlobalChatService
 from global_chat_service_v2 import EnhancedGlobalChatService
 from task_manager import get_task_manager
+from dataset_writer import DatasetWriter
+from browser_pool import get_browser_pool
+from concurrency import CancellationToken
+from checkpoint import RunCheckpoint
+from caches import get_enrichment_cache, get_place_cache, get_search_cache
+from pagination import cached_count, fetch_page
+from db_indexes import get_query_report
+from run_logs import RunLogWriter, get_run_logs
+from run_events import run_event_stream
+from dataset_search import parse_query, search_dataset_items, search_filter
+from dataset_query import query_dataset_items
+from dataset_export import (
+    COLUMNAR_FORMATS, EXPORT_MEDIA_TYPES, XLSX_MAX_ROWS, get_csv_header,
+    stream_columnar, stream_csv, stream_json, stream_jsonl
+)
 # Removed scraper_templates import - marketplace feature removed
 import logging
 import asyncio
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +50,13 @@ def set_db(database):
     db = database
     proxy_manager = get_proxy_manager(db)
     task_manager = get_task_manager()
+    task_manager.configure(db, lambda run, cancel_token: execute_scraping_job(
+        run['id'],
+        run['actor_id'],
+        run['user_id'],
+        run.get('input_data') or {},
+        cancel_token
+    ))
 
 router = APIRouter()
 
@@ -287,57 +314,82 @@ async def get_actors_used(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 # ============= Run Routes =============
-async def execute_scraping_job(run_id: str, actor_id: str, user_id: str, input_data: dict):
+async def execute_scraping_job(run_id: str, actor_id: str, user_id: str, input_data: dict, cancel_token: Optional[CancellationToken] = None):
     """Background task to execute scraping."""
     try:
-        # Update run status to running
-        await db.runs.update_one(
-            {"id": run_id},
-            {
-                "$set": {
-                    "status": "running",
-                    "started_at": datetime.now(timezone.utc).isoformat()
+        # Update run status to running, unless it was aborted or taken over since it was claimed.
+        # A reclaimed run keeps its original started_at so its duration stays right.
+        start_result = await db.runs.update_one(
+            {"id": run_id, "worker_id": task_manager.worker_id, "status": {"$in": ["queued", "running"]}},
+            [
+                {
+                    "$set": {
+                        "status": "running",
+                        "started_at": {"$ifNull": ["$started_at", datetime.now(timezone.utc).isoformat()]}
+                    }
                 }
-            }
+            ]
         )
+        if start_result.matched_count == 0:
+            logger.info(f"Run {run_id} was aborted or reassigned before it started, skipping")
+            return
         
-        # Initialize scraper engine
-        engine = ScraperEngine(proxy_manager)
+        # A run reclaimed after a restart keeps its dataset and resumes from its checkpoint
+        dataset_doc = await db.datasets.find_one({"run_id": run_id}, {"_id": 0})
+        if dataset_doc:
+            logger.info(f"Resuming run {run_id} with {dataset_doc.get('item_count', 0)} existing items")
+        else:
+            # Create the dataset up front so items can be written as they are scraped
+            dataset = Dataset(run_id=run_id, user_id=user_id, item_count=0)
+            dataset_doc = dataset.model_dump()
+            dataset_doc['created_at'] = dataset_doc['created_at'].isoformat()
+            await db.datasets.insert_one(dataset_doc)
+        await db.runs.update_one({"id": run_id}, {"$set": {"dataset_id": dataset_doc['id']}})
+        
+        # Initialize scraper engine on the shared warm browser pool
+        engine = ScraperEngine(proxy_manager, browser_pool=get_browser_pool())
         await engine.initialize()
         
+        checkpoint = RunCheckpoint(db, run_id)
+        writer = DatasetWriter(db, run_id, dataset_doc['id'], checkpoint=checkpoint)
+        writer.count = dataset_doc.get('item_count', 0)
+        await writer.start()
+        
+        # Progress messages go to the run_logs collection in batches
+        log_writer = RunLogWriter(db, run_id, user_id)
+        await log_writer.start()
+        
         try:
             # Get actor details
             actor = await db.actors.find_one({"id": actor_id})
             
-            results = []
+            scraper_stats = {}
             
             # Execute based on actor type
             if actor and actor.get('name') == 'Google Maps Scraper V2':
                 # Use V3 scraper
-                scraper = GoogleMapsScraperV3(engine)
+                scraper = GoogleMapsScraperV3(
+                    engine,
+                    place_cache=get_place_cache(db),
+                    enrichment_cache=get_enrichment_cache(db),
+                    search_cache=get_search_cache(db)
+                )
                 
                 async def progress_callback(message: str):
-                    await db.runs.update_one(
-                        {"id": run_id},
-                        {"$push": {"logs": f"{datetime.now(timezone.utc).isoformat()}: {message}"}}
-                    )
+                    await log_writer.add(message)
                     logger.info(f"Run {run_id}: {message}")
                 
-                results = await scraper.scrape(input_data, progress_callback)
-            
-            # Create dataset and store results
-            from models import Dataset
-            dataset = Dataset(run_id=run_id, user_id=user_id, item_count=len(results))
-            dataset_doc = dataset.model_dump()
-            dataset_doc['created_at'] = dataset_doc['created_at'].isoformat()
-            await db.datasets.insert_one(dataset_doc)
+                # Results stream into the dataset in batches while the run is in progress
+                await scraper.scrape(
+                    input_data,
+                    progress_callback,
+                    result_callback=writer.add,
+                    cancel_token=cancel_token,
+                    checkpoint=checkpoint
+                )
+                scraper_stats = scraper.stats
             
-            # Store dataset items
-            for result in results:
-                item = DatasetItem(run_id=run_id, data=result)
-                item_doc = item.model_dump()
-                item_doc['created_at'] = item_doc['created_at'].isoformat()
-                await db.dataset_items.insert_one(item_doc)
+            await writer.flush()
             
             # Calculate duration
             run_doc = await db.runs.find_one({"id": run_id})
@@ -345,16 +397,16 @@ async def execute_scraping_job(run_id: str, actor_id: str, user_id: str, input_d
             finished_at = datetime.now(timezone.utc)
             duration = int((finished_at - started_at).total_seconds())
             
-            # Update run as succeeded
+            # Update run as succeeded, unless it was aborted in the meantime
             await db.runs.update_one(
-                {"id": run_id},
+                {"id": run_id, "status": "running"},
                 {
                     "$set": {
                         "status": "succeeded",
                         "finished_at": finished_at.isoformat(),
                         "duration_seconds": duration,
-                        "results_count": len(results),
-                        "dataset_id": dataset.id
+                        "results_count": writer.count,
+                        "stats": scraper_stats
                     }
                 }
             )
@@ -362,15 +414,26 @@ async def execute_scraping_job(run_id: str, actor_id: str, user_id: str, input_d
             # Update actor runs count
             await db.actors.update_one({"id": actor_id}, {"$inc": {"runs_count": 1}})
             
-            logger.info(f"Run {run_id} completed successfully with {len(results)} results")
+            await checkpoint.delete()
+            logger.info(f"Run {run_id} completed successfully with {writer.count} results")
         
         finally:
+            # Keep whatever was scraped even if the run failed or was aborted
+            await writer.close()
+            await log_writer.close()
             await engine.cleanup()
     
+    except asyncio.CancelledError:
+        # Aborted runs are final; runs interrupted by a shutdown keep their checkpoint for the next worker
+        run_doc = await db.runs.find_one({"id": run_id}, {"_id": 0, "status": 1})
+        if run_doc and run_doc.get('status') == 'aborted':
+            await db.run_checkpoints.delete_one({"run_id": run_id})
+        raise
+    
     except Exception as e:
         logger.error(f"Run {run_id} failed: {str(e)}")
         await db.runs.update_one(
-            {"id": run_id},
+            {"id": run_id, "status": "running"},
             {
                 "$set": {
                     "status": "failed",
@@ -379,13 +442,14 @@ async def execute_scraping_job(run_id: str, actor_id: str, user_id: str, input_d
                 }
             }
         )
+        await db.run_checkpoints.delete_one({"run_id": run_id})
 
 @router.post("/runs", response_model=Run)
 async def create_run(
     run_data: RunCreate,
     current_user: dict = Depends(get_current_user)
 ):
-    """Create and start a new scraping run with parallel execution."""
+    """Create a new scraping run and queue it for the scheduler."""
     # Get actor
     actor = await db.actors.find_one({"id": run_data.actor_id})
     if not actor:
@@ -397,28 +461,24 @@ async def create_run(
         actor_id=run_data.actor_id,
         actor_name=actor['name'],
         input_data=run_data.input_data,
-        status="queued"
+        status="queued",
+        priority=run_data.priority
     )
     
     doc = run.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.runs.insert_one(doc)
     
-    # Start scraping in parallel using task manager
-    await task_manager.start_task(
-        run.id,
-        execute_scraping_job(
-            run.id,
-            run_data.actor_id,
-            current_user['id'],
-            run_data.input_data
-        )
-    )
+    # The scheduler starts it once global and per-user limits allow
+    task_manager.enqueue(run.id)
     
     logger.info(f"Run {run.id} queued. Currently running: {task_manager.get_running_count()} tasks")
     
     return run
 
+# Fields the runs list may be sorted and paged by
+RUN_SORT_FIELDS = {"created_at", "started_at", "finished_at", "status", "origin", "actor_name", "results_count"}
+
 @router.get("/runs")
 async def get_runs(
     current_user: dict = Depends(get_current_user), 
@@ -427,9 +487,17 @@ async def get_runs(
     search: Optional[str] = None,
     status: Optional[str] = None,
     sort_by: str = "created_at",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    cursor: Optional[str] = None,
+    total: str = "cached"
 ):
-    """Get all runs for current user with pagination."""
+    """
+    Get all runs for current user with pagination.
+    
+    Pass the returned next_cursor as cursor to fetch the following page in
+    constant time; page numbers still work but skip over earlier runs.
+    total is "exact", "cached" (recounted at most every few seconds) or "none".
+    """
     # Build query
     query = {"user_id": current_user['id']}
     
@@ -442,19 +510,26 @@ async def get_runs(
         query["status"] = status
     
     # Get total count
-    total_count = await db.runs.count_documents(query)
+    total_count = await _count_for_page(db.runs, query, total)
     
-    # Calculate skip
-    skip = (page - 1) * limit
+    if sort_by not in RUN_SORT_FIELDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort_by. Must be one of: {sorted(RUN_SORT_FIELDS)}"
+        )
     
     # Set sort direction
     sort_direction = -1 if sort_order == "desc" else 1
     
-    # Get runs with pagination
-    runs = await db.runs.find(
-        query,
-        {"_id": 0}
-    ).sort(sort_by, sort_direction).skip(skip).limit(limit).to_list(limit)
+    # Get runs with pagination, keyed on (sort_by, id)
+    try:
+        runs, next_cursor = await fetch_page(
+            db.runs, query, sort_by, sort_direction, limit,
+            cursor=cursor, skip=(page - 1) * limit,
+            projection={"_id": 0, "logs": 0}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Convert datetime strings
     for run in runs:
@@ -470,13 +545,59 @@ async def get_runs(
         "total": total_count,
         "page": page,
         "limit": limit,
-        "total_pages": (total_count + limit - 1) // limit
+        "total_pages": (total_count + limit - 1) // limit if total_count is not None else None,
+        "next_cursor": next_cursor
     }
 
+async def _count_for_page(collection, query: dict, total: str) -> Optional[int]:
+    """Total for a paginated listing: exact, cached for a few seconds, or skipped."""
+    if total == "none":
+        return None
+    if total == "exact":
+        return await collection.count_documents(query)
+    return await cached_count(collection, query)
+
+@router.post("/runs/events/token")
+async def create_run_events_token(current_user: dict = Depends(get_current_user)):
+    """Issue a short-lived token for opening /runs/events from an EventSource."""
+    return {"token": create_stream_token(current_user), "expires_in": STREAM_TOKEN_EXPIRE_SECONDS}
+
+@router.get("/runs/events")
+async def stream_run_events(
+    request: Request,
+    run_id: Optional[str] = None,
+    after_seq: int = 0,
+    current_user: dict = Depends(get_current_user_for_stream)
+):
+    """
+    Server-Sent Events feed of run progress, replacing polling of /runs.
+    
+    With run_id, streams that run's status, result count and log lines after
+    after_seq, and ends when the run finishes. Without it, streams status
+    changes of all the user's runs. EventSource clients pass a stream token
+    from POST /runs/events/token as ?token=; it is only checked on connect.
+    """
+    if run_id:
+        run = await db.runs.find_one({"id": run_id, "user_id": current_user['id']}, {"_id": 0, "id": 1})
+        if not run:
+            raise HTTPException(status_code=404, detail="Run not found")
+    
+    return StreamingResponse(
+        run_event_stream(
+            db,
+            current_user['id'],
+            run_id=run_id,
+            after_seq=after_seq,
+            is_disconnected=request.is_disconnected
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/runs/{run_id}", response_model=Run)
 async def get_run(run_id: str, current_user: dict = Depends(get_current_user)):
-    """Get specific run."""
-    run = await db.runs.find_one({"id": run_id, "user_id": current_user['id']}, {"_id": 0})
+    """Get specific run. Logs are served separately by /runs/{run_id}/logs."""
+    run = await db.runs.find_one({"id": run_id, "user_id": current_user['id']}, {"_id": 0, "logs": 0})
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
@@ -490,6 +611,43 @@ async def get_run(run_id: str, current_user: dict = Depends(get_current_user)):
     
     return run
 
+@router.get("/runs/{run_id}/logs")
+async def get_run_log_lines(
+    run_id: str,
+    after_seq: int = 0,
+    limit: int = 100,
+    tail: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get a run's log lines in order.
+    
+    To follow a running run, poll with after_seq set to the returned next_seq.
+    tail returns only the last N lines.
+    """
+    run = await db.runs.find_one(
+        {"id": run_id, "user_id": current_user['id']},
+        {"_id": 0, "status": 1, "logs": 1}
+    )
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    
+    limit = max(1, min(limit, 1000))
+    if tail is not None:
+        tail = max(1, min(tail, 1000))
+    logs = await get_run_logs(db, run_id, after_seq=after_seq, limit=limit, tail=tail)
+    
+    # Runs from before the log store kept their lines on the run document
+    if not logs and run.get('logs'):
+        legacy = [{"seq": seq, "message": line} for seq, line in enumerate(run['logs'], start=1)]
+        logs = legacy[-tail:] if tail else [line for line in legacy if line['seq'] > after_seq][:limit]
+    
+    return {
+        "logs": logs,
+        "next_seq": logs[-1]['seq'] if logs else after_seq,
+        "status": run.get('status')
+    }
+
 @router.delete("/runs/{run_id}/abort")
 async def abort_run(run_id: str, current_user: dict = Depends(get_current_user)):
     """Abort a running or queued scraping job."""
@@ -507,21 +665,8 @@ async def abort_run(run_id: str, current_user: dict = Depends(get_current_user))
                 detail="Run not found or not in running/queued state"
             )
         
-        # Try to cancel the task in task_manager
-        task_cancelled = await task_manager.cancel_task(run_id)
-        
-        # Update database status to aborted
-        result = await db.runs.update_one(
-            {"id": run_id, "user_id": current_user['id']},
-            {
-                "$set": {
-                    "status": "aborted",
-                    "finished_at": datetime.now(timezone.utc).isoformat()
-                }
-            }
-        )
-        
-        if result.modified_count > 0:
+        aborted, task_cancelled = await task_manager.abort_run(db, run_id, current_user['id'])
+        if aborted:
             status_msg = "Run aborted and task cancelled" if task_cancelled else "Run status updated to aborted"
             logger.info(f"{status_msg}: {run_id}")
             return {
@@ -531,7 +676,11 @@ async def abort_run(run_id: str, current_user: dict = Depends(get_current_user))
                 "task_cancelled": task_cancelled
             }
         else:
-            raise HTTPException(status_code=500, detail="Failed to abort run")
+            # The run succeeded or failed after the check above
+            raise HTTPException(
+                status_code=404,
+                detail="Run not found or not in running/queued state"
+            )
             
     except HTTPException:
         raise
@@ -565,28 +714,16 @@ async def abort_multiple_runs(
                     results["not_found"].append(run_id)
                     continue
                 
-                # Try to cancel the task
-                task_cancelled = await task_manager.cancel_task(run_id)
-                
-                # Update database status
-                update_result = await db.runs.update_one(
-                    {"id": run_id, "user_id": current_user['id']},
-                    {
-                        "$set": {
-                            "status": "aborted",
-                            "finished_at": datetime.now(timezone.utc).isoformat()
-                        }
-                    }
-                )
-                
-                if update_result.modified_count > 0:
+                aborted, task_cancelled = await task_manager.abort_run(db, run_id, current_user['id'])
+                if aborted:
                     results["success"].append({
                         "run_id": run_id,
                         "task_cancelled": task_cancelled
                     })
                     logger.info(f"Aborted run: {run_id}, task_cancelled: {task_cancelled}")
                 else:
-                    results["failed"].append(run_id)
+                    # The run succeeded or failed after the check above
+                    results["not_found"].append(run_id)
                     
             except Exception as e:
                 logger.error(f"Error aborting run {run_id}: {str(e)}")
@@ -646,21 +783,8 @@ async def abort_all_runs(
         
         for run_id in run_ids:
             try:
-                # Try to cancel the task
-                task_cancelled = await task_manager.cancel_task(run_id)
-                
-                # Update database status
-                update_result = await db.runs.update_one(
-                    {"id": run_id, "user_id": current_user['id']},
-                    {
-                        "$set": {
-                            "status": "aborted",
-                            "finished_at": datetime.now(timezone.utc).isoformat()
-                        }
-                    }
-                )
-                
-                if update_result.modified_count > 0:
+                aborted, task_cancelled = await task_manager.abort_run(db, run_id, current_user['id'])
+                if aborted:
                     results["success"].append({
                         "run_id": run_id,
                         "task_cancelled": task_cancelled
@@ -693,40 +817,52 @@ async def get_dataset_items(
     current_user: dict = Depends(get_current_user),
     page: int = 1,
     limit: int = 20,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    total: str = "cached"
 ):
-    """Get dataset items for a run with pagination."""
+    """
+    Get dataset items for a run with pagination.
+    
+    Items are ordered by (created_at, id); pass next_cursor as cursor for
+    constant-time deep paging. Without a search the total comes from the
+    dataset's item counter instead of a count query.
+    
+    With search, items are ranked by relevance (word prefixes across title,
+    category, address, city and email, or phone digits) and paged by number.
+    """
     # Verify run belongs to user
     run = await db.runs.find_one({"id": run_id, "user_id": current_user['id']})
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
-    # Build query
-    query = {"run_id": run_id}
-    
-    # Add search filter (search across all data fields)
+    # Ranked search over the items' precomputed search terms
     if search:
-        # Search in nested data field
-        query["$or"] = [
-            {"data.title": {"$regex": search, "$options": "i"}},
-            {"data.address": {"$regex": search, "$options": "i"}},
-            {"data.city": {"$regex": search, "$options": "i"}},
-            {"data.category": {"$regex": search, "$options": "i"}},
-            {"data.phone": {"$regex": search, "$options": "i"}},
-            {"data.email": {"$regex": search, "$options": "i"}}
-        ]
-    
-    # Get total count
-    total_count = await db.dataset_items.count_documents(query)
-    
-    # Calculate skip
-    skip = (page - 1) * limit
-    
-    # Get items with pagination
-    items = await db.dataset_items.find(
-        query,
-        {"_id": 0}
-    ).skip(skip).limit(limit).to_list(limit)
+        terms = parse_query(search)
+        items = await search_dataset_items(db, run_id, terms, skip=(page - 1) * limit, limit=limit)
+        total_count = await _count_for_page(db.dataset_items, search_filter(run_id, terms), total) if terms else 0
+        next_cursor = None
+    else:
+        query = {"run_id": run_id}
+        
+        # Get total count; the dataset keeps a running item counter
+        total_count = None
+        if total != "exact" and run.get('dataset_id'):
+            dataset = await db.datasets.find_one({"id": run['dataset_id']}, {"_id": 0, "item_count": 1})
+            if dataset:
+                total_count = dataset.get('item_count', 0)
+        if total_count is None:
+            total_count = await _count_for_page(db.dataset_items, query, total)
+        
+        # Get items with pagination, keyed on (created_at, id)
+        try:
+            items, next_cursor = await fetch_page(
+                db.dataset_items, query, "created_at", 1, limit,
+                cursor=cursor, skip=(page - 1) * limit,
+                projection={"_id": 0, "search": 0}
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
     # Convert datetime strings
     for item in items:
@@ -738,56 +874,75 @@ async def get_dataset_items(
         "total": total_count,
         "page": page,
         "limit": limit,
-        "total_pages": (total_count + limit - 1) // limit
+        "total_pages": (total_count + limit - 1) // limit if total_count is not None else None,
+        "next_cursor": next_cursor
     }
 
-@router.get("/datasets/{run_id}/export")
-async def export_dataset(run_id: str, format: str = "json", current_user: dict = Depends(get_current_user)):
-    """Export dataset in various formats."""
-    from fastapi.responses import StreamingResponse
-    import io
-    import json
-    import csv
+@router.post("/datasets/{run_id}/query")
+async def query_dataset(run_id: str, query: DatasetQuery, current_user: dict = Depends(get_current_user)):
+    """
+    Filter, sort and facet a run's dataset items on the server.
     
+    Returns one page of items (optionally only the requested data fields),
+    the filtered total and the requested facet counts from one aggregation.
+    """
     # Verify run belongs to user
     run = await db.runs.find_one({"id": run_id, "user_id": current_user['id']})
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
-    items = await db.dataset_items.find({"run_id": run_id}, {"_id": 0}).to_list(10000)
+    try:
+        result = await query_dataset_items(db, run_id, query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Convert datetime strings
+    for item in result["items"]:
+        if isinstance(item.get('created_at'), str):
+            item['created_at'] = datetime.fromisoformat(item['created_at'])
+    
+    return result
+
+@router.get("/datasets/{run_id}/export")
+async def export_dataset(run_id: str, format: str = "json", current_user: dict = Depends(get_current_user)):
+    """Export dataset in various formats, streamed from the database in batches."""
+    # Verify run belongs to user
+    run = await db.runs.find_one({"id": run_id, "user_id": current_user['id']})
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
     
     if format == "json":
-        content = json.dumps([item['data'] for item in items], indent=2)
-        return StreamingResponse(
-            io.BytesIO(content.encode()),
-            media_type="application/json",
-            headers={"Content-Disposition": f"attachment; filename=dataset_{run_id}.json"}
-        )
+        body = stream_json(db, run_id)
+    
+    elif format == "jsonl":
+        body = stream_jsonl(db, run_id)
     
     elif format == "csv":
-        if not items:
+        header = await get_csv_header(db, run_id)
+        if not header:
             raise HTTPException(status_code=404, detail="No data to export")
-        
-        output = io.StringIO()
-        # Get all unique keys from all items
-        all_keys = set()
-        for item in items:
-            all_keys.update(item['data'].keys())
-        
-        writer = csv.DictWriter(output, fieldnames=sorted(all_keys))
-        writer.writeheader()
-        for item in items:
-            writer.writerow(item['data'])
-        
-        content = output.getvalue()
-        return StreamingResponse(
-            io.BytesIO(content.encode()),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=dataset_{run_id}.csv"}
-        )
+        body = stream_csv(db, run_id, header)
+    
+    elif format in COLUMNAR_FORMATS:
+        # Refuse up front rather than failing partway through the download
+        if format == "xlsx" and await db.dataset_items.count_documents({"run_id": run_id}) > XLSX_MAX_ROWS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Dataset exceeds the Excel limit of {XLSX_MAX_ROWS} rows. Use 'csv' or 'parquet' instead"
+            )
+        body = stream_columnar(db, run_id, format)
     
     else:
-        raise HTTPException(status_code=400, detail="Unsupported format. Use 'json' or 'csv'")
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported format. Use 'json', 'jsonl', 'csv', 'parquet', 'arrow' or 'xlsx'"
+        )
+    
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=dataset_{run_id}.{format}"}
+    )
 
 # ============= Proxy Routes =============
 @router.get("/proxies", response_model=List[Proxy])
@@ -844,6 +999,24 @@ async def delete_proxy(proxy_id: str, current_user: dict = Depends(get_current_u
         raise HTTPException(status_code=404, detail="Proxy not found")
     return {"message": "Proxy deleted successfully"}
 
+# ============= Diagnostics Routes =============
+# Usernames allowed to run diagnostics; the endpoints are disabled when unset
+DIAGNOSTICS_ADMINS = {name.strip() for name in os.environ.get('DIAGNOSTICS_ADMINS', '').split(',') if name.strip()}
+
+@router.get("/diagnostics/query-report")
+async def get_query_shape_report(min_millis: int = 100, current_user: dict = Depends(get_current_user)):
+    """Report hot query shapes that miss an index and slow unindexed operations (admins only)."""
+    if not DIAGNOSTICS_ADMINS:
+        raise HTTPException(status_code=404, detail="Diagnostics are disabled")
+    if current_user.get('username') not in DIAGNOSTICS_ADMINS:
+        raise HTTPException(status_code=403, detail="Diagnostics are restricted to administrators")
+    
+    try:
+        return await get_query_report(db, min_millis)
+    except Exception as e:
+        logger.error(f"Error building query report: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ============= Lead Chat Routes (AI Engagement Advice) =============
 @router.post("/leads/{lead_id}/chat")
 async def chat_with_lead(
@@ -988,68 +1161,16 @@ async def global_chat(
         chat_service = EnhancedGlobalChatService(db, current_user['id'])
         result = await chat_service.chat(message)
         
-        # Handle MULTIPLE runs if created (supports multiple commands in one request)
-        if result.get("run_ids") and len(result["run_ids"]) > 0:
-            logger.info(f"🔄 Processing {len(result['run_ids'])} runs from chat command")
-            
-            # Start ALL runs in parallel
-            for idx, run_id in enumerate(result["run_ids"]):
-                logger.info(f"📋 Processing run {idx+1}/{len(result['run_ids'])}: {run_id}")
-                
-                actor_id = result.get("actor_id") if not result.get("run_ids") else (
-                    result.get("actor_id") if idx == 0 else None
-                )
-                input_data = result.get("input_data") if not result.get("run_ids") else (
-                    result.get("input_data") if idx == 0 else None
-                )
-                
-                # Fetch run details if not provided
-                if not actor_id or not input_data:
-                    logger.info(f"🔍 Fetching run details from database for {run_id}")
-                    run = await db.runs.find_one({"id": run_id}, {"_id": 0})
-                    if run:
-                        actor_id = run.get("actor_id")
-                        input_data = run.get("input_data")
-                        logger.info(f"✓ Found actor: {run.get('actor_name')}, input: {input_data}")
-                    else:
-                        logger.error(f"❌ Run {run_id} not found in database!")
-                        continue
-                
-                if actor_id and input_data:
-                    logger.info(f"🤖 AI Agent starting run {run_id} ({idx+1}/{len(result['run_ids'])}) from chat...")
-                    
-                    # Use task manager for parallel execution
-                    await task_manager.start_task(
-                        run_id,
-                        execute_scraping_job(
-                            run_id,
-                            actor_id,
-                            current_user['id'],
-                            input_data
-                        )
-                    )
-                    logger.info(f"✓ Run {run_id} started by AI Agent. Active tasks: {task_manager.get_running_count()}")
-                else:
-                    logger.error(f"❌ Missing actor_id or input_data for run {run_id}")
-        # Backwards compatibility: handle single run_id
-        elif result.get("run_id") and result.get("actor_id"):
-            run_id = result["run_id"]
-            actor_id = result["actor_id"]
-            input_data = result["input_data"]
+        # Queue MULTIPLE runs if created (supports multiple commands in one request)
+        run_ids = result.get("run_ids") or ([result["run_id"]] if result.get("run_id") else [])
+        if run_ids:
+            logger.info(f"🔄 Queueing {len(run_ids)} runs from chat command")
             
-            logger.info(f"🤖 AI Agent starting run {run_id} from chat...")
+            # The chat service stores runs as queued; the scheduler starts them within limits
+            for run_id in run_ids:
+                task_manager.enqueue(run_id)
             
-            # Use task manager for parallel execution
-            await task_manager.start_task(
-                run_id,
-                execute_scraping_job(
-                    run_id,
-                    actor_id,
-                    current_user['id'],
-                    input_data
-                )
-            )
-            logger.info(f"✓ Run {run_id} started by AI Agent. Active tasks: {task_manager.get_running_count()}")
+            logger.info(f"✓ {len(run_ids)} runs queued by AI Agent. Active tasks: {task_manager.get_running_count()}")
         
         # Return response with action metadata for UI automation
         response_data = {
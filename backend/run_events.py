@@ -0,0 +1,296 @@
+"""
+Live run events for Server-Sent Events subscribers.
+
+Each process watches one MongoDB change stream over the runs and run_logs
+collections and fans the changes out to its local subscribers, so status
+transitions, result counts and log lines written by any worker reach every
+connected client without the clients polling. Change streams need a
+replica set; on a standalone server the bus instead polls the runs and
+run_logs collections once per interval for all of its subscribers.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+from run_logs import get_run_logs
+
+logger = logging.getLogger(__name__)
+
+# Run fields forwarded to subscribers on every change
+RUN_EVENT_FIELDS = ["id", "user_id", "status", "results_count", "started_at", "finished_at", "error_message"]
+
+TERMINAL_STATUSES = {"succeeded", "failed", "aborted"}
+
+# Most log lines read by one fallback poll, across all watched runs
+POLL_LOG_LIMIT = 5000
+
+# Log lines read per query while a new subscriber catches up
+CATCH_UP_PAGE_SIZE = 1000
+
+class Subscription:
+    """Events for one client: a run, or every run of a user."""
+
+    def __init__(self, user_id: str, run_id: Optional[str] = None, after_seq: int = 0, max_queued: int = 1000):
+        self.user_id = user_id
+        self.run_id = run_id
+        self.after_seq = after_seq
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if event.get("user_id") != self.user_id:
+            return False
+        if self.run_id is None:
+            # Subscribers to all runs get status changes only, not every log line
+            return event.get("type") == "run"
+        return event.get("run_id") == self.run_id
+
+    def put(self, event: Dict[str, Any]):
+        # A slow client loses its oldest events rather than blocking the bus
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+class RunEventBus:
+    """In-process fan-out of run changes read from a single change stream, or a single poller."""
+
+    def __init__(self, poll_interval: float = 2.0):
+        self.db = None
+        self.poll_interval = poll_interval
+        self.available = False
+        self.subscriptions: Set[Subscription] = set()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    def start(self, db):
+        self.db = db
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+        self.available = False
+
+    def subscribe(self, user_id: str, run_id: Optional[str] = None, after_seq: int = 0) -> Subscription:
+        subscription = Subscription(user_id, run_id, after_seq)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def publish(self, event: Dict[str, Any]):
+        for subscription in list(self.subscriptions):
+            if subscription.matches(event):
+                subscription.put(event)
+
+    async def _watch(self):
+        pipeline = [
+            {"$match": {
+                "ns.coll": {"$in": ["runs", "run_logs"]},
+                "operationType": {"$in": ["insert", "update", "replace"]}
+            }},
+            {"$project": {
+                "ns": 1,
+                "operationType": 1,
+                "updateDescription.updatedFields.status": 1,
+                "updateDescription.updatedFields.results_count": 1,
+                **{f"fullDocument.{field}": 1 for field in RUN_EVENT_FIELDS + ["run_id", "seq", "message", "created_at"]}
+            }}
+        ]
+        resume_token = None
+        delay = 1
+        while True:
+            try:
+                async with self.db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                    self.available = True
+                    delay = 1
+                    logger.info("Run event change stream started")
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        event = self._to_event(change)
+                        if event:
+                            self.publish(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.available = False
+                # Standalone servers do not support change streams at all
+                if "replica set" in str(e).lower() or getattr(e, "code", None) == 40573:
+                    logger.warning("Change streams unavailable (MongoDB is not a replica set); run events fall back to polling")
+                    await self._poll()
+                    return
+                logger.error(f"Run event change stream failed, retrying in {delay}s: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def _poll(self):
+        """
+        Fallback for standalone servers: one poll per interval serves every subscriber.
+
+        Only changed run states and new log lines are published, so
+        subscribers see the same events as from the change stream.
+        """
+        last_seen: Dict[str, tuple] = {}
+        log_seqs: Dict[str, int] = {}
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self.subscriptions:
+                last_seen.clear()
+                log_seqs.clear()
+                continue
+            try:
+                last_seen = await self._poll_runs(last_seen)
+                await self._poll_logs(log_seqs)
+            except Exception as e:
+                logger.error(f"Run event poll failed: {str(e)}")
+
+    async def _poll_runs(self, last_seen: Dict[str, tuple]) -> Dict[str, tuple]:
+        subscriptions = list(self.subscriptions)
+        watched_runs = {subscription.run_id for subscription in subscriptions if subscription.run_id}
+        query = {
+            "user_id": {"$in": list({subscription.user_id for subscription in subscriptions})},
+            "$or": [{"status": {"$in": ["queued", "running"]}}, {"id": {"$in": list(set(last_seen) | watched_runs)}}]
+        }
+        projection = {"_id": 0, **{field: 1 for field in RUN_EVENT_FIELDS}}
+
+        seen = {}
+        for run in await self.db.runs.find(query, projection).to_list(None):
+            state = (run.get("status"), run.get("results_count"))
+            if last_seen.get(run["id"]) != state:
+                self.publish(run_event(run))
+            # Finished runs are only remembered while a subscriber still follows them
+            if state[0] not in TERMINAL_STATUSES or run["id"] in watched_runs:
+                seen[run["id"]] = state
+        return seen
+
+    async def _poll_logs(self, log_seqs: Dict[str, int]):
+        after_seqs: Dict[str, int] = {}
+        for subscription in list(self.subscriptions):
+            if subscription.run_id:
+                after_seqs[subscription.run_id] = min(after_seqs.get(subscription.run_id, subscription.after_seq), subscription.after_seq)
+        for run_id in list(log_seqs):
+            if run_id not in after_seqs:
+                del log_seqs[run_id]
+        for run_id, after_seq in after_seqs.items():
+            log_seqs.setdefault(run_id, after_seq)
+        if not log_seqs:
+            return
+
+        # Sorted by seq, each run's lines are a prefix of its new lines even when the limit cuts them off
+        lines = await self.db.run_logs.find(
+            {"$or": [{"run_id": run_id, "seq": {"$gt": seq}} for run_id, seq in log_seqs.items()]},
+            {"_id": 0, "run_id": 1, "user_id": 1, "seq": 1, "message": 1, "created_at": 1}
+        ).sort("seq", 1).limit(POLL_LOG_LIMIT).to_list(POLL_LOG_LIMIT)
+        for line in lines:
+            log_seqs[line["run_id"]] = max(log_seqs[line["run_id"]], line["seq"])
+            self.publish({"type": "log", **line})
+
+    def _to_event(self, change: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        doc = change.get("fullDocument") or {}
+        collection = change["ns"]["coll"]
+        if collection == "run_logs":
+            return {
+                "type": "log",
+                "run_id": doc.get("run_id"),
+                "user_id": doc.get("user_id"),
+                "seq": doc.get("seq"),
+                "message": doc.get("message"),
+                "created_at": doc.get("created_at")
+            }
+
+        # Only status and count changes are pushed; other run updates (leases, stats) are noise
+        updated = (change.get("updateDescription") or {}).get("updatedFields")
+        if change["operationType"] == "update" and not updated:
+            return None
+        return run_event(doc)
+
+def run_event(run: Dict[str, Any]) -> Dict[str, Any]:
+    """Event payload for a run document."""
+    event = {"type": "run", "run_id": run.get("id")}
+    event.update({field: run.get(field) for field in RUN_EVENT_FIELDS if field != "id"})
+    return event
+
+# Global event bus instance
+run_event_bus = RunEventBus()
+
+def get_run_event_bus() -> RunEventBus:
+    """Get the global run event bus."""
+    return run_event_bus
+
+def format_sse(event: Dict[str, Any]) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n".encode()
+
+async def run_event_stream(
+    db,
+    user_id: str,
+    run_id: Optional[str] = None,
+    after_seq: int = 0,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    keepalive: float = 15.0
+) -> AsyncIterator[bytes]:
+    """
+    SSE stream for one run (status and log lines) or all of a user's runs (status only).
+
+    Starts with a snapshot of the current state and, for a single run, the log
+    lines after after_seq; ends once a single run reaches a final status.
+    """
+    projection = {"_id": 0, **{field: 1 for field in RUN_EVENT_FIELDS}}
+    active_query = {"user_id": user_id, "status": {"$in": ["queued", "running"]}}
+    bus = get_run_event_bus()
+
+    # Subscribe before the snapshot so nothing that happens in between is missed
+    subscription = bus.subscribe(user_id, run_id, after_seq)
+    try:
+        runs = await db.runs.find({"id": run_id, "user_id": user_id} if run_id else active_query, projection).to_list(500)
+        last_seen = {run["id"]: (run.get("status"), run.get("results_count")) for run in runs}
+        for run in runs:
+            yield format_sse(run_event(run))
+
+        last_seq = after_seq
+        if run_id:
+            # Page through the backlog; live events only resume after the last line read
+            while True:
+                lines = await get_run_logs(db, run_id, after_seq=last_seq, limit=CATCH_UP_PAGE_SIZE)
+                for line in lines:
+                    last_seq = line["seq"]
+                    yield format_sse({"type": "log", "run_id": run_id, **line})
+                if len(lines) < CATCH_UP_PAGE_SIZE:
+                    break
+            if runs and runs[0].get("status") in TERMINAL_STATUSES:
+                yield format_sse({"type": "end", "run_id": run_id})
+                return
+
+        while True:
+            if is_disconnected and await is_disconnected():
+                return
+
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+
+            if event["type"] == "log":
+                # Lines already sent by the catch-up read arrive again from the bus
+                if event["seq"] is None or event["seq"] <= last_seq:
+                    continue
+                last_seq = event["seq"]
+            else:
+                # The poller's first pass repeats run states already sent in the snapshot
+                state = (event.get("status"), event.get("results_count"))
+                if last_seen.get(event["run_id"]) == state:
+                    continue
+                last_seen[event["run_id"]] = state
+            yield format_sse(event)
+            if run_id and event["type"] == "run" and event.get("status") in TERMINAL_STATUSES:
+                yield format_sse({"type": "end", "run_id": run_id})
+                return
+
+    finally:
+        bus.unsubscribe(subscription)
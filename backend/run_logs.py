@@ -0,0 +1,107 @@
+"""
+Run log store.
+
+Progress messages are kept in the run_logs collection, one document per
+line keyed by (run_id, seq), instead of being pushed onto the run document.
+Lines are buffered and written with insert_many, and expire through a TTL
+index on expires_at after RUN_LOG_RETENTION_DAYS.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RUN_LOG_RETENTION_DAYS = float(os.environ.get('RUN_LOG_RETENTION_DAYS', '30'))
+
+class RunLogWriter:
+    """Buffers log lines for one run and flushes them in batches."""
+
+    def __init__(self, db, run_id: str, user_id: Optional[str] = None, batch_size: int = 20, flush_interval: float = 1.0):
+        self.db = db
+        self.run_id = run_id
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.seq = 0
+        self.buffer: List[Dict[str, Any]] = []
+        self.last_flush = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Continue numbering after existing lines (resumed runs) and start the periodic flush."""
+        last = await self.db.run_logs.find_one({"run_id": self.run_id}, {"_id": 0, "seq": 1}, sort=[("seq", -1)])
+        self.seq = last["seq"] if last else 0
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def add(self, message: str):
+        """Queue one log line, flushing when the batch is full or stale."""
+        now = datetime.now(timezone.utc)
+        self.seq += 1
+        self.buffer.append({
+            "run_id": self.run_id,
+            "user_id": self.user_id,
+            "seq": self.seq,
+            "message": message,
+            "created_at": now.isoformat(),
+            "expires_at": now + timedelta(days=RUN_LOG_RETENTION_DAYS)
+        })
+
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            self.last_flush = time.monotonic()
+            if not self.buffer:
+                return
+            docs, self.buffer = self.buffer, []
+            await self.db.run_logs.insert_many(docs, ordered=False)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Run {self.run_id}: periodic log flush failed: {str(e)}")
+
+    async def close(self):
+        """Stop the periodic flush and write whatever is left."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+async def get_run_logs(
+    db,
+    run_id: str,
+    after_seq: int = 0,
+    limit: int = 100,
+    tail: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Read a run's log lines in seq order.
+
+    Lines after after_seq are returned, so a client following a run polls
+    with the last seq it has seen. With tail, the last tail lines are
+    returned instead.
+    """
+    projection = {"_id": 0, "seq": 1, "message": 1, "created_at": 1}
+    if tail:
+        logs = await db.run_logs.find({"run_id": run_id}, projection).sort("seq", -1).limit(tail).to_list(tail)
+        return list(reversed(logs))
+    return await db.run_logs.find(
+        {"run_id": run_id, "seq": {"$gt": after_seq}},
+        projection
+    ).sort("seq", 1).limit(limit).to_list(limit)
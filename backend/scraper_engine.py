@@ -1,41 +1,41 @@
 import asyncio
-from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, TimeoutError as PlaywrightTimeoutError
 from typing import Optional, Dict, Any, List
 import logging
 import random
+from browser_pool import BROWSER_LAUNCH_ARGS
 
 logger = logging.getLogger(__name__)
 
 class ScraperEngine:
     """Core scraping engine using Playwright with anti-detection."""
     
-    def __init__(self, proxy_manager=None):
+    def __init__(self, proxy_manager=None, browser_pool=None):
         self.proxy_manager = proxy_manager
+        self.browser_pool = browser_pool
         self.playwright = None
         self.browser: Optional[Browser] = None
         self.contexts: List[BrowserContext] = []
         
     async def initialize(self):
-        """Initialize Playwright browser."""
+        """Initialize Playwright browser (or the shared pool when one is configured)."""
+        if self.browser_pool:
+            await self.browser_pool.start()
+            logger.info("Scraper engine initialized with shared browser pool")
+            return
+        
         self.playwright = await async_playwright().start()
         
         # Launch browser with anti-detection settings
         self.browser = await self.playwright.chromium.launch(
             headless=True,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-web-security',
-                '--disable-features=IsolateOrigins,site-per-process'
-            ]
+            args=BROWSER_LAUNCH_ARGS
         )
         logger.info("Scraper engine initialized")
     
     async def create_context(self, use_proxy: bool = True, ultra_fast: bool = False) -> BrowserContext:
         """Create a new browser context with optional proxy and resource blocking for ultra-fast mode."""
-        if not self.browser:
+        if not self.browser and not self.browser_pool:
             await self.initialize()
         
         context_options = {
@@ -65,7 +65,10 @@ class ScraperEngine:
                 
                 logger.info(f"Using proxy: {parsed.hostname}:{parsed.port}")
         
-        context = await self.browser.new_context(**context_options)
+        if self.browser_pool:
+            context = await self.browser_pool.acquire_context(**context_options)
+        else:
+            context = await self.browser.new_context(**context_options)
         
         # Add resource blocking for ultra-fast mode (3-5x faster page loads)
         if ultra_fast:
@@ -148,14 +151,14 @@ class ScraperEngine:
         
         return page
     
-    async def navigate_with_retry(self, page: Page, url: str, max_retries: int = 3) -> bool:
-        """Navigate to URL with retry logic."""
+    async def navigate_with_retry(self, page: Page, url: str, max_retries: int = 3, ready_selector: Optional[str] = None) -> bool:
+        """Navigate to URL with retry logic, optionally waiting until ready_selector appears."""
         for attempt in range(max_retries):
             try:
                 response = await page.goto(url, wait_until="domcontentloaded", timeout=30000)
                 if response and response.status < 400:
-                    # Random delay to appear human-like
-                    await asyncio.sleep(random.uniform(1, 3))
+                    if ready_selector:
+                        await self.wait_for_selector_safe(page, ready_selector)
                     return True
                 logger.warning(f"Navigation returned status {response.status if response else 'None'}")
             except Exception as e:
@@ -174,6 +177,36 @@ class ScraperEngine:
             logger.debug(f"Selector '{selector}' not found: {str(e)}")
             return False
     
+    async def scroll_and_wait_for_growth(self, page: Page, container_selector: str, timeout: int = 5000) -> bool:
+        """
+        Scroll a container to its bottom and wait until its scrollHeight grows.
+        
+        Returns False if the container is missing or nothing new loaded before the deadline.
+        """
+        prev_height = await page.evaluate("""
+            (selector) => {
+                const panel = document.querySelector(selector);
+                if (!panel) return -1;
+                const height = panel.scrollHeight;
+                panel.scrollTop = height;
+                return height;
+            }
+        """, container_selector)
+        
+        if prev_height < 0:
+            return False
+        
+        try:
+            await page.wait_for_function("""
+                ([selector, prevHeight]) => {
+                    const panel = document.querySelector(selector);
+                    return panel && panel.scrollHeight > prevHeight;
+                }
+            """, arg=[container_selector, prev_height], timeout=timeout, polling=100)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+    
     async def scroll_page(self, page: Page, max_scrolls: int = 10):
         """Scroll page to load dynamic content."""
         for i in range(max_scrolls):
@@ -212,9 +245,16 @@ class ScraperEngine:
         return random.choice(user_agents)
     
     async def cleanup(self):
-        """Clean up browser resources."""
+        """Clean up browser resources (pooled browsers stay warm for the next run)."""
         for context in self.contexts:
-            await context.close()
+            try:
+                if self.browser_pool:
+                    await self.browser_pool.release_context(context)
+                else:
+                    await context.close()
+            except Exception as e:
+                logger.debug(f"Error closing context: {str(e)}")
+        self.contexts = []
         
         if self.browser:
             await self.browser.close()
@@ -66,7 +66,14 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize default actors on startup."""
+    """Ensure indexes and initialize default actors on startup."""
+    from db_indexes import apply_indexes
+    await apply_indexes(db)
+    
+    # One change stream (or one poller on a standalone server) per process feeds live run events to SSE subscribers
+    from run_events import get_run_event_bus
+    get_run_event_bus().start(db)
+    
     # Check if Google Maps Scraper V2 exists
     existing_v2 = await db.actors.find_one({"name": "Google Maps Scraper V2"})
     if not existing_v2:
@@ -111,7 +118,14 @@ All results include: business name, address, phone (verified), email, rating, re
                 "location": {"type": "string", "description": "Location to search in"},
                 "max_results": {"type": "integer", "default": 100},
                 "extract_reviews": {"type": "boolean", "default": False},
-                "extract_images": {"type": "boolean", "default": False}
+                "extract_images": {"type": "boolean", "default": False},
+                "concurrency": {"type": "integer", "default": 5, "description": "Place detail pages kept in flight"},
+                "adaptive_concurrency": {"type": "boolean", "default": False, "description": "Back off concurrency on timeouts or 429s"},
+                "max_parallel_searches": {"type": "integer", "default": 2, "description": "Search terms scraped at the same time"},
+                "enrich_websites": {"type": "boolean", "default": True, "description": "Crawl business websites for email and social links"},
+                "enrichment_concurrency": {"type": "integer", "default": 10, "description": "Websites crawled at the same time"},
+                "cache_max_staleness_hours": {"type": "number", "description": "Oldest cached place details to reuse (0 always re-scrapes)"},
+                "use_search_cache": {"type": "boolean", "default": True, "description": "Reuse place lists from recent identical searches"}
             }
         )
         doc = actor.model_dump()
@@ -119,7 +133,22 @@ All results include: business name, address, phone (verified), email, rating, re
         doc['updated_at'] = doc['updated_at'].isoformat()
         await db.actors.insert_one(doc)
         logger.info("Created default Google Maps Scraper V2 actor")
+    
+    # Start scheduling queued runs (including ones queued before a restart).
+    # With RUN_EXECUTION_MODE=external the API only enqueues and worker.py processes execute runs.
+    if os.environ.get('RUN_EXECUTION_MODE', 'inline') != 'external':
+        from task_manager import get_task_manager
+        get_task_manager().start_scheduler()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    from browser_pool import get_browser_pool
+    from http_client import close_http_session
+    from task_manager import get_task_manager
+    from run_events import get_run_event_bus
+    # Cancel in-flight runs before their browsers and database go away; they resume after restart
+    await get_task_manager().shutdown()
+    await get_run_event_bus().stop()
+    await get_browser_pool().close()
+    await close_http_session()
     client.close()
\ No newline at end of file
@@ -1,21 +1,274 @@
 """
 Task Manager for handling parallel scraping jobs.
-Allows multiple scraping runs to execute concurrently.
+Allows multiple scraping runs to execute concurrently, scheduling queued
+runs from the runs collection under global and per-user limits.
+
+Runs are claimed with a lease that the owning process renews with
+heartbeats, so several API or worker processes can share one queue and
+runs whose owner died are reclaimed once their lease expires.
+
+Every run gets a CancellationToken; aborting a run sets it so the scraper
+closes its browser contexts right away and the slot frees within a second.
 """
 
 import asyncio
 import logging
-from typing import Dict, Set
-from datetime import datetime, timezone
+import os
+import socket
+import uuid
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timezone, timedelta
+from pymongo import ReturnDocument
+from concurrency import CancellationToken
 
 logger = logging.getLogger(__name__)
 
 class TaskManager:
     """Manages concurrent scraping tasks."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_concurrent_runs: int = 3,
+        max_runs_per_user: int = 2,
+        poll_interval: float = 5.0,
+        lease_seconds: int = 60,
+        cancel_check_interval: float = 1.0,
+        cancel_timeout: float = 5.0
+    ):
         self.running_tasks: Dict[str, asyncio.Task] = {}
+        self.cancel_tokens: Dict[str, CancellationToken] = {}
         self.task_locks: Set[str] = set()
+        self.max_concurrent_runs = max_concurrent_runs
+        self.max_runs_per_user = max_runs_per_user
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.cancel_check_interval = cancel_check_interval
+        self.cancel_timeout = cancel_timeout
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.db = None
+        self.job_factory: Optional[Callable] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler_task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+    
+    def configure(self, db, job_factory: Callable):
+        """
+        Set up queue scheduling.
+        
+        Args:
+            db: Database holding the runs collection used as the queue
+            job_factory: Called with a claimed run document and its CancellationToken,
+                returns the coroutine to execute
+        """
+        self.db = db
+        self.job_factory = job_factory
+    
+    def start_scheduler(self):
+        """Start the scheduler loop. Runs still queued from before a restart are picked up."""
+        if self._scheduler_task is None or self._scheduler_task.done():
+            self._wakeup = asyncio.Event()
+            self._scheduler_task = asyncio.create_task(self._scheduler_loop())
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+            logger.info(
+                f"Run scheduler {self.worker_id} started "
+                f"(max {self.max_concurrent_runs} runs, {self.max_runs_per_user} per user)"
+            )
+    
+    async def stop_scheduler(self):
+        """Stop the scheduler and heartbeat loops."""
+        for task in (self._scheduler_task, self._heartbeat_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._scheduler_task = None
+        self._heartbeat_task = None
+    
+    async def shutdown(self):
+        """
+        Stop claiming runs, cancel the runs this process is executing, then stop the loops.
+        
+        Interrupted runs stay running with their checkpoints, and their leases
+        are released so the next scheduler to start reclaims and resumes them
+        right away.
+        """
+        if self._scheduler_task:
+            self._scheduler_task.cancel()
+            try:
+                await self._scheduler_task
+            except asyncio.CancelledError:
+                pass
+            self._scheduler_task = None
+        
+        run_ids = list(self.running_tasks.keys())
+        for run_id in run_ids:
+            await self.cancel_task(run_id)
+        
+        await self.stop_scheduler()
+        
+        if run_ids and self.db is not None:
+            try:
+                await self.db.runs.update_many(
+                    {"id": {"$in": run_ids}, "worker_id": self.worker_id, "status": "running"},
+                    {"$set": {"lease_expires_at": None}}
+                )
+            except Exception as e:
+                logger.error(f"Could not release leases on shutdown: {str(e)}")
+    
+    def enqueue(self, run_id: Optional[str] = None):
+        """Signal that a queued run is waiting. The run itself lives in the runs collection."""
+        if run_id:
+            logger.info(f"Run {run_id} enqueued")
+        if self._wakeup:
+            self._wakeup.set()
+    
+    def _lease_expiry(self) -> str:
+        return (datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)).isoformat()
+    
+    async def _heartbeat_loop(self):
+        """
+        Renew leases on our runs and stop local work for runs that were aborted
+        or reclaimed by another worker.
+        
+        Ownership is checked every cancel_check_interval so an abort made through
+        the API (possibly in another process) reaches the run quickly; leases
+        are only renewed every lease_seconds / 3.
+        """
+        renew_interval = max(1, self.lease_seconds // 3)
+        last_renewal = asyncio.get_running_loop().time()
+        while True:
+            await asyncio.sleep(self.cancel_check_interval)
+            run_ids = list(self.running_tasks.keys())
+            if not run_ids:
+                continue
+            
+            try:
+                runs = await self.db.runs.find(
+                    {"id": {"$in": run_ids}},
+                    {"_id": 0, "id": 1, "status": 1, "worker_id": 1}
+                ).to_list(None)
+            except Exception as e:
+                logger.error(f"Heartbeat ownership check failed: {str(e)}")
+                continue
+            runs_by_id = {run['id']: run for run in runs}
+            owned_ids = {
+                run['id'] for run in runs
+                if run.get('worker_id') == self.worker_id and run.get('status') == "running"
+            }
+            
+            for run_id in run_ids:
+                token = self.cancel_tokens.get(run_id)
+                if token and token.cancelled:
+                    continue  # Already being cancelled
+                run = runs_by_id.get(run_id)
+                # Runs that just succeeded or failed are finishing their own cleanup and are left alone
+                if run is None or run.get('status') == "aborted":
+                    logger.warning(f"Run {run_id} was aborted, cancelling local task")
+                elif run.get('worker_id') != self.worker_id:
+                    logger.warning(f"Lost lease on run {run_id} to {run.get('worker_id')}, cancelling local task")
+                else:
+                    continue
+                asyncio.create_task(self.cancel_task(run_id))
+            
+            now = asyncio.get_running_loop().time()
+            if now - last_renewal < renew_interval:
+                continue
+            last_renewal = now
+            try:
+                await self.db.runs.update_many(
+                    {"id": {"$in": list(owned_ids)}, "worker_id": self.worker_id, "status": "running"},
+                    {"$set": {"lease_expires_at": self._lease_expiry()}}
+                )
+            except Exception as e:
+                logger.error(f"Lease renewal failed: {str(e)}")
+    
+    async def _scheduler_loop(self):
+        while True:
+            try:
+                await self._schedule_pending()
+            except Exception as e:
+                logger.error(f"Scheduler error: {str(e)}")
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+    
+    async def _schedule_pending(self):
+        """Claim and start queued runs until the global cap is reached."""
+        while self.get_running_count() < self.max_concurrent_runs:
+            run = await self._claim_next_run()
+            if run is None:
+                return
+            token = CancellationToken()
+            self.cancel_tokens[run['id']] = token
+            await self.start_task(run['id'], self.job_factory(run, token))
+    
+    async def _running_counts_by_user(self) -> Dict[str, int]:
+        # Only live leases count; runs of dead workers are about to be reclaimed
+        now = datetime.now(timezone.utc).isoformat()
+        pipeline = [
+            {"$match": {"status": "running", "lease_expires_at": {"$gte": now}}},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+        ]
+        counts = await self.db.runs.aggregate(pipeline).to_list(None)
+        return {c["_id"]: c["count"] for c in counts}
+    
+    async def _claim_next_run(self) -> Optional[Dict]:
+        """
+        Atomically lease the best claimable run to this process.
+        
+        Claimable runs are queued ones and running ones whose lease expired
+        or was released on shutdown. Released leases keep their worker_id, so
+        runs left "running" by versions without leases are never reclaimed.
+        Users take turns, the one with the fewest running runs (then the
+        longest wait) first; priority only orders a user's own runs.
+        """
+        running_by_user = await self._running_counts_by_user()
+        saturated_users = [user_id for user_id, count in running_by_user.items() if count >= self.max_runs_per_user]
+        
+        now = datetime.now(timezone.utc).isoformat()
+        claimable = {
+            "$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires_at": {"$lt": now}},
+                {"status": "running", "lease_expires_at": None, "worker_id": {"$ne": None}}
+            ]
+        }
+        
+        # Oldest first, so no user's runs fall outside the window
+        candidates = await self.db.runs.find(
+            {**claimable, "user_id": {"$nin": saturated_users}},
+            {"_id": 0, "id": 1, "user_id": 1, "priority": 1, "created_at": 1}
+        ).sort([("created_at", 1)]).limit(200).to_list(200)
+        candidates = fair_share_order(candidates, running_by_user)
+        
+        for candidate in candidates:
+            if candidate['id'] in self.task_locks:
+                continue
+            run = await self.db.runs.find_one_and_update(
+                {**claimable, "id": candidate['id']},
+                [
+                    {
+                        "$set": {
+                            "status": "running",
+                            # Reclaimed runs keep their original start time
+                            "started_at": {"$ifNull": ["$started_at", datetime.now(timezone.utc).isoformat()]},
+                            "worker_id": self.worker_id,
+                            "lease_expires_at": self._lease_expiry()
+                        }
+                    }
+                ],
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER
+            )
+            if run:
+                return run
+        
+        return None
     
     def is_running(self, run_id: str) -> bool:
         """Check if a task is currently running."""
@@ -33,6 +286,7 @@ class TaskManager:
         for run_id in completed:
             del self.running_tasks[run_id]
             self.task_locks.discard(run_id)
+            self.cancel_tokens.pop(run_id, None)
     
     async def start_task(self, run_id: str, coroutine):
         """
@@ -61,8 +315,11 @@ class TaskManager:
     def _task_completed(self, run_id: str, task: asyncio.Task):
         """Callback when a task completes."""
         self.task_locks.discard(run_id)
+        self.cancel_tokens.pop(run_id, None)
         
-        if task.exception():
+        if task.cancelled():
+            logger.info(f"Task {run_id} was cancelled")
+        elif task.exception():
             logger.error(f"Task {run_id} failed with exception: {task.exception()}")
         else:
             logger.info(f"Task {run_id} completed successfully")
@@ -70,11 +327,19 @@ class TaskManager:
         # Clean up
         if run_id in self.running_tasks:
             del self.running_tasks[run_id]
+        
+        # A slot freed up, let the scheduler start the next queued run
+        if self._wakeup:
+            self._wakeup.set()
     
     async def cancel_task(self, run_id: str) -> bool:
         """
         Cancel a running task.
         
+        Sets the run's cancellation token first so browser work is torn down
+        cooperatively, then cancels the task and waits at most cancel_timeout
+        for it to finish.
+        
         Args:
             run_id: Task identifier
             
@@ -88,24 +353,83 @@ class TaskManager:
         if task.done():
             return False
         
+        token = self.cancel_tokens.get(run_id)
+        if token:
+            token.cancel()
         task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
+        
+        done, _ = await asyncio.wait({task}, timeout=self.cancel_timeout)
+        if done:
             logger.info(f"Task {run_id} cancelled")
+        else:
+            logger.warning(f"Task {run_id} still unwinding after {self.cancel_timeout}s")
         
         return True
     
+    async def abort_run(self, db, run_id: str, user_id: str) -> Tuple[bool, bool]:
+        """
+        Mark a user's running or queued run aborted and cancel its local task.
+        
+        The status is written first, guarded on the run still being active, so
+        neither a run that just finished nor the cancelled job's own success or
+        failure write is overwritten.
+        
+        Returns:
+            (aborted, task_cancelled). The task is only cancelled when the run was aborted.
+        """
+        result = await db.runs.update_one(
+            {"id": run_id, "user_id": user_id, "status": {"$in": ["running", "queued"]}},
+            {"$set": {"status": "aborted", "finished_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        if result.modified_count == 0:
+            return False, False
+        # The cancellation token tears down the run's browser work
+        return True, await self.cancel_task(run_id)
+    
     def get_status(self) -> Dict:
         """Get current status of task manager."""
         self._cleanup_completed()
         return {
             "running_tasks": len(self.running_tasks),
-            "task_ids": list(self.running_tasks.keys())
+            "task_ids": list(self.running_tasks.keys()),
+            "max_concurrent_runs": self.max_concurrent_runs,
+            "max_runs_per_user": self.max_runs_per_user,
+            "worker_id": self.worker_id,
+            "scheduler_running": self._scheduler_task is not None and not self._scheduler_task.done()
         }
 
+def fair_share_order(candidates: List[Dict], running_by_user: Dict[str, int]) -> List[Dict]:
+    """
+    Order claimable runs so users take turns.
+    
+    Users with fewer running runs come first, then the user waiting longest.
+    Each user's runs are ordered by their own priority, then age, and the
+    users' runs are interleaved round-robin.
+    """
+    by_user: Dict[str, List[Dict]] = {}
+    for run in candidates:
+        by_user.setdefault(run['user_id'], []).append(run)
+    
+    for runs in by_user.values():
+        runs.sort(key=lambda run: (-(run.get('priority') or 0), run.get('created_at') or ''))
+    users = sorted(by_user, key=lambda user_id: (
+        running_by_user.get(user_id, 0),
+        min(run.get('created_at') or '' for run in by_user[user_id])
+    ))
+    
+    ordered = []
+    for rank in range(max((len(runs) for runs in by_user.values()), default=0)):
+        for user_id in users:
+            if rank < len(by_user[user_id]):
+                ordered.append(by_user[user_id][rank])
+    return ordered
+
 # Global task manager instance
-task_manager = TaskManager()
+task_manager = TaskManager(
+    max_concurrent_runs=int(os.environ.get('MAX_CONCURRENT_RUNS', '3')),
+    max_runs_per_user=int(os.environ.get('MAX_RUNS_PER_USER', '2')),
+    lease_seconds=int(os.environ.get('RUN_LEASE_SECONDS', '60'))
+)
 
 def get_task_manager() -> TaskManager:
     """Get the global task manager instance."""
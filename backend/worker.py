@@ -0,0 +1,65 @@
+"""
+Standalone worker process for scraping runs.
+
+Claims queued runs from MongoDB with a lease, executes them and renews the
+lease with heartbeats. Start one or more per machine alongside an API
+started with RUN_EXECUTION_MODE=external, which then only enqueues runs:
+
+    python worker.py
+"""
+
+import asyncio
+import logging
+import os
+import signal
+from pathlib import Path
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Set Playwright browsers path for containerized environment
+os.environ.setdefault('PLAYWRIGHT_BROWSERS_PATH', '/pw-browsers')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+async def main():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    # routes.set_db wires the task manager to execute_scraping_job
+    from routes import set_db
+    from task_manager import get_task_manager
+    from browser_pool import get_browser_pool
+    from http_client import close_http_session
+
+    from db_indexes import apply_indexes
+    await apply_indexes(db)
+
+    set_db(db)
+    task_manager = get_task_manager()
+    task_manager.start_scheduler()
+    logger.info(f"Worker {task_manager.worker_id} waiting for runs")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+    logger.info(f"Worker {task_manager.worker_id} shutting down")
+
+    # Stop claiming, then stop in-flight runs; their leases are released so another worker resumes them
+    await task_manager.shutdown()
+
+    await get_browser_pool().close()
+    await close_http_session()
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { Button } from '../components/ui/button';
@@ -41,10 +41,85 @@ const RunsV3 = () => {
   const [alertModal, setAlertModal] = useState({ show: false, type: 'info', title: '', message: '', details: [] });
   const [confirmModal, setConfirmModal] = useState({ show: false, type: 'warning', title: '', message: '', onConfirm: null, details: [] });
 
+  // Latest runs for the event handler, which is registered once per listing
+  const runsRef = useRef(runs);
+  useEffect(() => {
+    runsRef.current = runs;
+  }, [runs]);
+
+  // Whether the SSE feed is connected; polling speeds up again while it is not
+  const [liveUpdates, setLiveUpdates] = useState(false);
+
   useEffect(() => {
     fetchRuns();
-    const interval = setInterval(fetchRuns, 5000); // Refresh every 5 seconds
+    // Live updates are pushed over SSE; the slow refresh only catches anything missed
+    const interval = setInterval(fetchRuns, liveUpdates ? 30000 : 5000);
     return () => clearInterval(interval);
+  }, [page, limit, sortBy, sortOrder, searchQuery, liveUpdates]);
+
+  useEffect(() => {
+    let events = null;
+    let reconnectTimer = null;
+    let closed = false;
+
+    const connect = async () => {
+      try {
+        // EventSource cannot send headers, so it gets a short-lived stream token in the URL
+        const token = localStorage.getItem('token');
+        const response = await axios.post(`${API}/runs/events/token`, null, {
+          headers: { Authorization: `Bearer ${token}` }
+        });
+        if (closed) return;
+        events = new EventSource(`${API}/runs/events?token=${encodeURIComponent(response.data.token)}`);
+      } catch (error) {
+        console.error('Error opening run events:', error);
+        scheduleReconnect();
+        return;
+      }
+
+      events.onopen = () => setLiveUpdates(true);
+      events.onerror = () => {
+        // Fall back to fast polling and reconnect with a fresh token
+        setLiveUpdates(false);
+        events.close();
+        scheduleReconnect();
+      };
+
+      events.addEventListener('run', (message) => {
+        const event = JSON.parse(message.data);
+        const known = runsRef.current.some(run => run.id === event.run_id);
+        setRuns(prev => prev.map(run => {
+          if (run.id !== event.run_id) return run;
+          return {
+            ...run,
+            status: event.status,
+            results_count: event.results_count,
+            started_at: event.started_at || run.started_at,
+            finished_at: event.finished_at || run.finished_at,
+            error_message: event.error_message
+          };
+        }));
+        // A run we are not showing yet (e.g. just created) changes the list itself
+        if (!known && event.status === 'queued') {
+          fetchRuns();
+        }
+      });
+    };
+
+    const scheduleReconnect = () => {
+      if (!closed) {
+        reconnectTimer = setTimeout(connect, 15000);
+      }
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      if (events) events.close();
+      setLiveUpdates(false);
+    };
   }, [page, limit, sortBy, sortOrder, searchQuery]);
 
   const fetchRuns = async () => {
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from browser_pool import BrowserPool
+
+
+class FakeContext:
+    def on(self, event, handler):
+        pass
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.handlers = {}
+
+    def is_connected(self):
+        return self.connected
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def new_context(self, **options):
+        return FakeContext()
+
+    async def close(self):
+        self.connected = False
+
+    def crash(self):
+        self.connected = False
+        self.handlers["disconnected"](self)
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = self
+        self.browsers = []
+
+    async def launch(self, **options):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+def make_pool(**kwargs):
+    pool = BrowserPool(memory_threshold_mb=0, **kwargs)
+    pool.playwright = FakePlaywright()
+    return pool
+
+
+def test_crashed_browser_is_dropped_from_the_pool():
+    async def scenario():
+        pool = make_pool(max_browsers=1)
+        await pool.acquire_context()
+        pool.playwright.browsers[0].crash()
+        await asyncio.sleep(0)
+        return pool.get_status()["browsers"], len(pool.slots)
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+def test_dead_browser_is_replaced_on_next_lease():
+    async def scenario():
+        pool = make_pool(max_browsers=1)
+        await pool.acquire_context()
+        # Disconnected without the event reaching the pool yet
+        pool.playwright.browsers[0].connected = False
+        await pool.acquire_context()
+        return len(pool.playwright.browsers), [slot.browser for slot in pool.slots]
+
+    launched, browsers = asyncio.run(scenario())
+    assert launched == 2
+    assert len(browsers) == 1 and browsers[0].is_connected()
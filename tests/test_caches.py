@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from caches import DiskCacheBackend, EnrichmentCache, PlaceCache
+
+
+class MemoryBackend:
+    """In-memory stand-in for a cache backend."""
+
+    def __init__(self):
+        self.entries = {}
+
+    async def get(self, key):
+        return self.entries.get(key)
+
+    async def set(self, key, value, **meta):
+        self.entries[key] = {"key": key, "value": value, "stored_at": datetime.now(timezone.utc), **meta}
+
+    async def delete(self, key):
+        self.entries.pop(key, None)
+
+
+def test_disk_backend_evicts_least_recently_used(tmp_path):
+    async def scenario():
+        backend = DiskCacheBackend(tmp_path / "cache.sqlite3", "test_cache", ttl_seconds=3600, max_entries=2, evict_every=1)
+        await backend.set("a", 1)
+        await asyncio.sleep(0.01)
+        await backend.set("b", 2)
+        await asyncio.sleep(0.01)
+        # Reading "a" makes "b" the least recently used entry
+        await backend.get("a")
+        await asyncio.sleep(0.01)
+        await backend.set("c", 3)
+        return [await backend.get(key) is not None for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+
+
+def test_disk_backend_expires_entries_after_ttl(tmp_path):
+    async def scenario():
+        backend = DiskCacheBackend(tmp_path / "cache.sqlite3", "test_cache", ttl_seconds=0, max_entries=10)
+        await backend.set("a", {"x": 1}, failed=False)
+        await asyncio.sleep(0.01)
+        return await backend.get("a")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_place_cache_requires_reviews_when_asked():
+    async def scenario():
+        cache = PlaceCache(MemoryBackend(), ttl_seconds=3600)
+        await cache.set("p1", {"title": "Cafe"}, has_reviews=False)
+        return await cache.get("p1"), await cache.get("p1", need_reviews=True)
+
+    assert asyncio.run(scenario()) == ({"title": "Cafe"}, None)
+
+
+def test_place_cache_honours_max_staleness():
+    async def scenario():
+        backend = MemoryBackend()
+        cache = PlaceCache(backend, ttl_seconds=3600)
+        await cache.set("p1", {"title": "Cafe"})
+        backend.entries["p1"]["stored_at"] -= timedelta(minutes=10)
+        return await cache.get("p1", max_staleness_seconds=60), await cache.get("p1")
+
+    assert asyncio.run(scenario()) == (None, {"title": "Cafe"})
+
+
+def test_enrichment_cache_key_groups_by_domain():
+    assert EnrichmentCache.cache_key("https://www.Example.com/locations/austin") == "example.com"
+    assert EnrichmentCache.cache_key("example.com") == "example.com"
+    assert EnrichmentCache.cache_key("https://facebook.com/CafeRoma/") == "facebook.com/caferoma"
+
+
+def test_enrichment_cache_key_keeps_redirect_targets_apart():
+    first = EnrichmentCache.cache_key("https://www.google.com/url?q=https://cafe-roma.com/")
+    second = EnrichmentCache.cache_key("https://www.google.com/url?q=https://deli-downtown.com/")
+    assert first == "google.com/url?q=https://cafe-roma.com/"
+    assert first != second
+
+
+def test_enrichment_cache_fetches_a_domain_once_for_concurrent_callers():
+    async def scenario():
+        cache = EnrichmentCache(MemoryBackend(), ttl_seconds=3600, negative_ttl_seconds=60)
+        calls = []
+
+        async def fetch(url):
+            calls.append(url)
+            await asyncio.sleep(0.01)
+            return {"email": "info@example.com", "socialMedia": {}}
+
+        results = await asyncio.gather(*(
+            cache.get_or_fetch(f"https://example.com/branch-{i}", fetch) for i in range(5)
+        ))
+        # Later lookups are served from the cache without fetching
+        again = await cache.get_or_fetch("https://example.com/", fetch)
+        return len(calls), results, again
+
+    calls, results, again = asyncio.run(scenario())
+    assert calls == 1
+    assert all(result == {"email": "info@example.com", "socialMedia": {}} for result in results)
+    assert again == results[0]
+
+
+def test_enrichment_cache_expires_failures_on_negative_ttl():
+    async def scenario():
+        backend = MemoryBackend()
+        cache = EnrichmentCache(backend, ttl_seconds=3600, negative_ttl_seconds=60)
+        await cache.set("example.com", {"failed": True})
+        fresh = await cache.get("example.com")
+        backend.entries["example.com"]["stored_at"] -= timedelta(minutes=5)
+        return fresh, await cache.get("example.com")
+
+    assert asyncio.run(scenario()) == ({"failed": True}, None)
@@ -0,0 +1,66 @@
+import asyncio
+
+from concurrency import AdaptiveLimiter
+
+
+def test_limiter_caps_in_flight_operations():
+    async def scenario():
+        limiter = AdaptiveLimiter(2)
+        peak = 0
+
+        async def work():
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(work() for _ in range(6)))
+        return peak, limiter.in_flight
+
+    assert asyncio.run(scenario()) == (2, 0)
+
+
+def test_backoff_halves_limit_down_to_minimum():
+    async def scenario():
+        limiter = AdaptiveLimiter(8, adaptive=True, min_limit=2)
+        limits = []
+        for _ in range(3):
+            await limiter.record_backoff()
+            limits.append(limiter.limit)
+        return limits, limiter.backoffs
+
+    assert asyncio.run(scenario()) == ([4, 2, 2], 3)
+
+
+def test_success_streak_grows_limit_back_to_max():
+    async def scenario():
+        limiter = AdaptiveLimiter(4, adaptive=True, increase_after=2)
+        await limiter.record_backoff()
+        after_backoff = limiter.limit
+        for _ in range(10):
+            await limiter.record_success()
+        return after_backoff, limiter.limit
+
+    assert asyncio.run(scenario()) == (2, 4)
+
+
+def test_backoff_resets_success_streak():
+    async def scenario():
+        limiter = AdaptiveLimiter(4, adaptive=True, increase_after=2)
+        await limiter.record_backoff()
+        await limiter.record_success()
+        await limiter.record_backoff()
+        await limiter.record_success()
+        return limiter.limit
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_non_adaptive_limiter_ignores_feedback():
+    async def scenario():
+        limiter = AdaptiveLimiter(3)
+        await limiter.record_backoff()
+        await limiter.record_success()
+        return limiter.get_stats()
+
+    assert asyncio.run(scenario()) == {"max_limit": 3, "limit": 3, "adaptive": False, "backoffs": 0}
@@ -0,0 +1,146 @@
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+
+import dataset_export
+from dataset_export import _flat_header, _flat_row, _place_row, stream_columnar, stream_csv, stream_json, stream_jsonl
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeDb:
+    """dataset_items.find returning the given item data."""
+
+    def __init__(self, items):
+        self.dataset_items = self
+        self.items = items
+
+    def find(self, query, projection):
+        return FakeCursor([{"data": data} for data in self.items])
+
+
+def collect(stream):
+    async def scenario():
+        return b"".join([chunk async for chunk in stream])
+
+    return asyncio.run(scenario()).decode()
+
+
+ITEMS = [
+    {"title": "Cafe Roma", "rating": 4.5, "socialMedia": {"facebook": "https://facebook.com/caferoma"}},
+    {"title": "Deli, \"Downtown\"", "phone": "+1 512 555 0100"}
+]
+
+
+def test_stream_json_is_a_valid_array():
+    assert json.loads(collect(stream_json(FakeDb(ITEMS), "run-1"))) == ITEMS
+
+
+def test_stream_json_of_empty_dataset():
+    assert json.loads(collect(stream_json(FakeDb([]), "run-1"))) == []
+
+
+def test_stream_json_spans_batches(monkeypatch):
+    monkeypatch.setattr(dataset_export.iter_dataset_items, "__defaults__", (1,))
+    items = [{"n": n} for n in range(5)]
+    assert json.loads(collect(stream_json(FakeDb(items), "run-1"))) == items
+
+
+def test_stream_jsonl_writes_one_item_per_line():
+    lines = collect(stream_jsonl(FakeDb(ITEMS), "run-1")).splitlines()
+    assert [json.loads(line) for line in lines] == ITEMS
+
+
+def test_stream_csv_quotes_values_and_encodes_nested_ones_as_json():
+    header = ["phone", "rating", "socialMedia", "title"]
+    rows = list(csv.DictReader(io.StringIO(collect(stream_csv(FakeDb(ITEMS), "run-1", header)))))
+    assert [row["title"] for row in rows] == ["Cafe Roma", "Deli, \"Downtown\""]
+    assert json.loads(rows[0]["socialMedia"]) == ITEMS[0]["socialMedia"]
+    assert rows[0]["phone"] == ""
+    assert rows[1]["rating"] == ""
+
+
+def test_stream_csv_of_empty_dataset_is_just_the_header():
+    assert collect(stream_csv(FakeDb([]), "run-1", ["title", "url"])).splitlines() == ["title,url"]
+
+
+PLACE = {
+    "title": "Cafe Roma",
+    "rating": "4.5",
+    "reviewsCount": 120,
+    "socialMedia": {"instagram": "https://instagram.com/caferoma"},
+    "images": ["https://img.example/1.jpg"],
+    "reviews": [{"reviewerName": "Ana", "rating": 5, "text": "Great", "date": "2 weeks ago"}],
+    "scrapedBy": "v3"
+}
+
+
+def test_place_row_keeps_every_review_field():
+    row = _place_row(PLACE)
+    assert row["reviews"] == [{"reviewerName": "Ana", "rating": 5, "text": "Great", "date": "2 weeks ago"}]
+    assert row["rating"] == 4.5
+    assert row["socialMedia"]["instagram"] == "https://instagram.com/caferoma"
+    assert row["socialMedia"]["facebook"] is None
+    assert json.loads(row["extra"]) == {"scrapedBy": "v3"}
+
+
+def test_flat_row_lines_up_with_header():
+    row = dict(zip(_flat_header(), _flat_row(PLACE)))
+    assert row["title"] == "Cafe Roma"
+    assert row["socialMedia_instagram"] == "https://instagram.com/caferoma"
+    assert row["reviewsExported"] == 1
+    assert json.loads(row["reviews"])[0]["date"] == "2 weeks ago"
+    assert row["phone"] is None
+
+
+def read_columnar(format, items):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    async def scenario():
+        return b"".join([chunk async for chunk in stream_columnar(FakeDb(items), "run-1", format)])
+
+    data = pa.BufferReader(asyncio.run(scenario()))
+    if format == "parquet":
+        return pq.read_table(data)
+    return pa.ipc.open_file(data).read_all()
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_stream_columnar_round_trips(format):
+    items = [{**PLACE, "phoneVerified": True, "emailVerified": False}, {"title": "Deli"}]
+    rows = read_columnar(format, items).to_pylist()
+    assert [row["title"] for row in rows] == ["Cafe Roma", "Deli"]
+    assert rows[0]["phoneVerified"] is True and rows[0]["emailVerified"] is False
+    assert rows[0]["rating"] == 4.5 and rows[0]["reviewsCount"] == 120
+    assert rows[0]["reviews"][0]["date"] == "2 weeks ago"
+    assert rows[0]["socialMedia"]["instagram"] == "https://instagram.com/caferoma"
+    assert rows[1]["reviews"] == [] and rows[1]["socialMedia"] is None
+
+
+def test_stream_columnar_xlsx_has_header_and_rows():
+    openpyxl = pytest.importorskip("openpyxl")
+
+    async def scenario():
+        return b"".join([chunk async for chunk in stream_columnar(FakeDb([PLACE]), "run-1", "xlsx")])
+
+    sheet = openpyxl.load_workbook(io.BytesIO(asyncio.run(scenario())))["dataset"]
+    header, row = [[cell.value for cell in row] for row in sheet.iter_rows()]
+    assert header == _flat_header()
+    assert dict(zip(header, row))["title"] == "Cafe Roma"
@@ -0,0 +1,103 @@
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("pymongo")
+
+from dataset_query import build_match, build_pipeline, validate_query, _format_facet
+from models import DatasetQuery
+
+
+def test_empty_query_matches_the_whole_run():
+    assert build_match("run-1", DatasetQuery()) == {"run_id": "run-1"}
+
+
+def test_typed_filters():
+    query = DatasetQuery(
+        rating={"min": 4},
+        reviewsCount={"min": 10, "max": 500},
+        city=["Austin", "Dallas"],
+        countryCode=["US"],
+        has_email=True,
+        has_phone=False
+    )
+    assert build_match("run-1", query) == {
+        "run_id": "run-1",
+        "data.rating": {"$gte": 4},
+        "data.reviewsCount": {"$gte": 10, "$lte": 500},
+        "data.city": {"$in": ["Austin", "Dallas"]},
+        "data.countryCode": {"$in": ["US"]},
+        "data.email": {"$nin": [None, ""]},
+        "data.phone": {"$in": [None, ""]}
+    }
+
+
+def test_open_range_and_empty_lists_are_ignored():
+    query = DatasetQuery(totalScore={}, category=[])
+    assert build_match("run-1", query) == {"run_id": "run-1"}
+
+
+def test_search_uses_indexed_terms():
+    match = build_match("run-1", DatasetQuery(search="Café rom"))
+    assert match["search.terms"] == {"$all": ["cafe", "rom"]}
+
+
+def test_pipeline_sorts_before_facet_with_matching_tie_breakers():
+    pipeline = build_pipeline("run-1", DatasetQuery(sort_by="rating", sort_order="desc", page=3, limit=10))
+    assert [list(stage) for stage in pipeline] == [["$match"], ["$sort"], ["$facet"]]
+    assert pipeline[1]["$sort"] == {"data.rating": -1, "created_at": -1, "id": -1}
+    assert pipeline[2]["$facet"]["items"][:2] == [{"$skip": 20}, {"$limit": 10}]
+    assert pipeline[2]["$facet"]["total"] == [{"$count": "count"}]
+
+
+def test_pipeline_projects_requested_fields_only():
+    pipeline = build_pipeline("run-1", DatasetQuery(fields=["title", "phone"]))
+    assert pipeline[2]["$facet"]["items"][-1] == {"$project": {
+        "_id": 0, "id": 1, "run_id": 1, "created_at": 1, "data.title": 1, "data.phone": 1
+    }}
+
+
+def test_pipeline_hides_search_terms_by_default():
+    pipeline = build_pipeline("run-1", DatasetQuery())
+    assert pipeline[2]["$facet"]["items"][-1] == {"$project": {"_id": 0, "search": 0}}
+
+
+def test_value_facet_groups_and_limits():
+    facets = build_pipeline("run-1", DatasetQuery(facets=["city"], facet_limit=5))[2]["$facet"]
+    assert facets["facet_city"] == [
+        {"$group": {"_id": "$data.city", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": 5}
+    ]
+
+
+def test_rating_facet_buckets_unrated_items_separately():
+    facets = build_pipeline("run-1", DatasetQuery(facets=["rating"]))[2]["$facet"]
+    bucket = facets["facet_rating"][0]["$bucket"]
+    assert bucket["groupBy"] == "$data.rating"
+    assert bucket["default"] == "unrated"
+    assert bucket["boundaries"] == sorted(bucket["boundaries"])
+
+
+def test_presence_facet_counts_each_flag():
+    facets = build_pipeline("run-1", DatasetQuery(facets=["presence"]))[2]["$facet"]
+    group = facets["facet_presence"][0]["$group"]
+    assert set(group) == {"_id", "has_email", "has_phone", "has_website"}
+
+
+def test_format_facets():
+    assert _format_facet("city", [{"_id": "Austin", "count": 3}]) == [{"value": "Austin", "count": 3}]
+    assert _format_facet("presence", []) == {"has_email": 0, "has_phone": 0, "has_website": 0}
+    assert _format_facet("presence", [{"has_email": 2, "has_phone": 1, "has_website": 0}])["has_email"] == 2
+
+
+@pytest.mark.parametrize("query", [
+    {"sort_by": "address"},
+    {"sort_order": "sideways"},
+    {"facets": ["website"]},
+    {"fields": ["title", "data.$where"]},
+    {"page": 0},
+    {"limit": 5000}
+])
+def test_invalid_queries_are_rejected(query):
+    with pytest.raises(ValueError):
+        validate_query(DatasetQuery(**query))
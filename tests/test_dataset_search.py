@@ -0,0 +1,76 @@
+import pytest
+
+pytest.importorskip("pymongo")
+
+from dataset_search import EXACT_MARKER, build_search_terms, parse_query, search_filter
+
+
+PLACE = {
+    "title": "Café Roma",
+    "category": "Coffee shop",
+    "address": "221 Main St, Austin, TX",
+    "city": "Austin",
+    "email": "info@roma.com",
+    "phone": "+1 (555) 123-4567"
+}
+
+
+def test_terms_include_accent_folded_word_prefixes():
+    terms = set(build_search_terms(PLACE)["terms"])
+    assert {"c", "ca", "caf", "cafe", "r", "rom", "roma", "cof", "austin"} <= terms
+
+
+def test_terms_mark_whole_words():
+    terms = set(build_search_terms(PLACE)["terms"])
+    assert "cafe" + EXACT_MARKER in terms
+    assert "caf" + EXACT_MARKER not in terms
+
+
+def test_phone_terms_start_at_every_digit_group():
+    terms = set(build_search_terms(PLACE)["terms"])
+    assert {"155", "15551234567", "555", "5551234567", "123", "1234567", "4567"} <= terms
+    # Digit prefixes start at group boundaries only
+    assert "5512" not in terms
+
+
+def test_title_terms_are_title_prefixes_only():
+    assert build_search_terms(PLACE)["title"] == ["c", "ca", "caf", "cafe", "r", "ro", "rom", "roma"]
+
+
+def test_missing_fields_produce_no_terms():
+    assert build_search_terms({}) == {"terms": [], "title": []}
+
+
+def test_query_words_are_folded_and_longest_first():
+    assert parse_query("Rom CAFÉ") == ["cafe", "rom"]
+
+
+def test_query_words_are_deduplicated():
+    assert parse_query("roma roma") == ["roma"]
+
+
+@pytest.mark.parametrize("query,expected", [
+    ("(555) 123-45", ["55512345"]),
+    ("+1 555 123 4567", ["15551234567"]),
+    ("4567", ["4567"])
+])
+def test_phone_like_queries_collapse_to_digits(query, expected):
+    assert parse_query(query) == expected
+
+
+def test_short_numbers_stay_words():
+    assert parse_query("22") == ["22"]
+
+
+def test_every_query_term_matches_the_place():
+    terms = set(build_search_terms(PLACE)["terms"])
+    for query in ["caf rom", "coffee austin", "555 123", "(555) 123-4567", "info@roma.com", "221 main"]:
+        assert set(parse_query(query)) <= terms, query
+
+
+def test_punctuation_only_query_has_no_terms():
+    assert parse_query("!!!") == []
+
+
+def test_search_filter_matches_all_terms_in_run():
+    assert search_filter("run-1", ["cafe", "rom"]) == {"run_id": "run-1", "search.terms": {"$all": ["cafe", "rom"]}}
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("pymongo")
+
+from pymongo.errors import BulkWriteError
+
+from dataset_writer import DatasetWriter
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = []
+        self.updates = []
+        self.failures = []
+
+    async def insert_many(self, docs, ordered=True):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.inserted.append(list(docs))
+
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+
+
+class FakeDb:
+    def __init__(self):
+        self.dataset_items = FakeCollection()
+        self.datasets = FakeCollection()
+        self.runs = FakeCollection()
+
+
+def place(place_id):
+    return {"placeId": place_id, "title": f"Place {place_id}"}
+
+
+def test_items_are_written_in_batches():
+    async def scenario():
+        db = FakeDb()
+        writer = DatasetWriter(db, "run-1", "ds-1", batch_size=2, flush_interval=3600)
+        for place_id in ("a", "b", "c"):
+            await writer.add(place(place_id))
+        batches_before_close = len(db.dataset_items.inserted)
+        await writer.close()
+        return db, writer, batches_before_close
+
+    db, writer, batches_before_close = asyncio.run(scenario())
+    assert batches_before_close == 1
+    assert [len(batch) for batch in db.dataset_items.inserted] == [2, 1]
+    assert writer.count == 3
+    assert db.runs.updates == [
+        ({"id": "run-1"}, {"$inc": {"results_count": 2}}),
+        ({"id": "run-1"}, {"$inc": {"results_count": 1}})
+    ]
+    assert db.datasets.updates[0] == ({"id": "ds-1"}, {"$inc": {"item_count": 2}})
+
+
+def test_stored_items_carry_run_id_and_search_terms():
+    async def scenario():
+        db = FakeDb()
+        writer = DatasetWriter(db, "run-1", "ds-1", batch_size=1)
+        await writer.add(place("a"))
+        return db.dataset_items.inserted[0][0]
+
+    doc = asyncio.run(scenario())
+    assert doc["run_id"] == "run-1"
+    assert doc["data"] == place("a")
+    assert isinstance(doc["created_at"], str)
+    assert "search" in doc
+
+
+def test_empty_flush_writes_nothing():
+    async def scenario():
+        db = FakeDb()
+        await DatasetWriter(db, "run-1", "ds-1").flush()
+        return db
+
+    db = asyncio.run(scenario())
+    assert db.dataset_items.inserted == []
+    assert db.runs.updates == []
+
+
+def test_failed_flush_keeps_items_for_the_next_one():
+    async def scenario():
+        db = FakeDb()
+        db.dataset_items.failures.append(ConnectionError("primary stepped down"))
+        writer = DatasetWriter(db, "run-1", "ds-1", batch_size=2, flush_interval=3600)
+        await writer.add(place("a"))
+        with pytest.raises(ConnectionError):
+            await writer.add(place("b"))
+        await writer.add(place("c"))
+        await writer.close()
+        return db, writer
+
+    db, writer = asyncio.run(scenario())
+    assert [[doc["data"]["placeId"] for doc in batch] for batch in db.dataset_items.inserted] == [["a", "b", "c"]]
+    assert writer.count == 3
+
+
+def test_partial_bulk_failure_requeues_only_unwritten_items():
+    async def scenario():
+        db = FakeDb()
+        db.dataset_items.failures.append(BulkWriteError({"writeErrors": [
+            {"index": 0, "code": 11000},  # Already stored by an earlier attempt
+            {"index": 2, "code": 91}
+        ]}))
+        writer = DatasetWriter(db, "run-1", "ds-1", batch_size=3, flush_interval=3600)
+        await writer.add(place("a"))
+        await writer.add(place("b"))
+        with pytest.raises(BulkWriteError):
+            await writer.add(place("c"))
+        buffered = [doc["data"]["placeId"] for doc in writer.buffer]
+        await writer.close()
+        return db, writer, buffered
+
+    db, writer, buffered = asyncio.run(scenario())
+    assert buffered == ["c"]
+    assert [[doc["data"]["placeId"] for doc in batch] for batch in db.dataset_items.inserted] == [["c"]]
+    assert writer.count == 3
+
+
+class FakeCheckpoint:
+    def __init__(self):
+        self.completed = []
+        self.flushes = 0
+
+    async def record_completed(self, place_ids):
+        self.completed.append(list(place_ids))
+
+    async def flush(self):
+        self.flushes += 1
+
+
+def test_flush_records_written_places_in_the_checkpoint():
+    async def scenario():
+        checkpoint = FakeCheckpoint()
+        writer = DatasetWriter(FakeDb(), "run-1", "ds-1", batch_size=2, checkpoint=checkpoint)
+        await writer.add(place("a"))
+        await writer.add({"url": "https://maps.example/b"})
+        return checkpoint
+
+    checkpoint = asyncio.run(scenario())
+    assert checkpoint.completed == [["a", "https://maps.example/b"]]
+    assert checkpoint.flushes == 1
+
+
+def test_checkpoint_is_flushed_even_without_new_items():
+    async def scenario():
+        checkpoint = FakeCheckpoint()
+        await DatasetWriter(FakeDb(), "run-1", "ds-1", checkpoint=checkpoint).flush()
+        return checkpoint
+
+    checkpoint = asyncio.run(scenario())
+    assert checkpoint.completed == []
+    assert checkpoint.flushes == 1
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from page_pool import PagePool
+
+
+class FakePage:
+    def __init__(self, fail_reset=False):
+        self.closed = False
+        self.fail_reset = fail_reset
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url, timeout=None):
+        if self.fail_reset:
+            raise RuntimeError("navigation failed")
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeEngine:
+    def __init__(self, fail=False):
+        self.pages = []
+        self.fail = fail
+
+    async def new_page(self, context):
+        if self.fail:
+            raise RuntimeError("context closed")
+        page = FakePage()
+        self.pages.append(page)
+        return page
+
+
+def test_checked_in_pages_are_reused():
+    async def scenario():
+        engine = FakeEngine()
+        pool = PagePool(engine, context=None, max_pages=2)
+        first = await pool.checkout()
+        await pool.checkin(first)
+        second = await pool.checkout()
+        return engine, pool, first, second
+
+    engine, pool, first, second = asyncio.run(scenario())
+    assert second is first
+    assert len(engine.pages) == 1
+    assert pool.get_stats() == {"max_pages": 2, "size": 1, "idle": 0, "hits": 1, "misses": 1, "discarded": 0}
+
+
+def test_checkout_waits_when_pool_is_full():
+    async def scenario():
+        pool = PagePool(FakeEngine(), context=None, max_pages=1)
+        page = await pool.checkout()
+        waiter = asyncio.create_task(pool.checkout())
+        await asyncio.sleep(0.01)
+        blocked = not waiter.done()
+        await pool.checkin(page)
+        return blocked, await waiter is page, pool.size
+
+    assert asyncio.run(scenario()) == (True, True, 1)
+
+
+def test_unusable_pages_are_discarded_and_replaced():
+    async def scenario():
+        engine = FakeEngine()
+        pool = PagePool(engine, context=None, max_pages=1)
+        page = await pool.checkout()
+        page.fail_reset = True
+        await pool.checkin(page)
+        replacement = await pool.checkout()
+        return page, replacement, pool.get_stats()
+
+    page, replacement, stats = asyncio.run(scenario())
+    assert page.closed and replacement is not page
+    assert stats["size"] == 1
+    assert stats["discarded"] == 1
+    assert stats["misses"] == 2
+
+
+def test_failed_page_creation_frees_its_slot():
+    async def scenario():
+        engine = FakeEngine(fail=True)
+        pool = PagePool(engine, context=None, max_pages=1)
+        with pytest.raises(RuntimeError):
+            await pool.checkout()
+        engine.fail = False
+        await pool.checkout()
+        return pool.size
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_pages_returned_after_close_are_closed():
+    async def scenario():
+        pool = PagePool(FakeEngine(), context=None, max_pages=2)
+        idle, busy = await pool.checkout(), await pool.checkout()
+        await pool.checkin(idle)
+        await pool.close()
+        await pool.checkin(busy)
+        return idle, busy, pool.get_stats()
+
+    idle, busy, stats = asyncio.run(scenario())
+    assert idle.closed and busy.closed
+    assert stats["size"] == 0
+    assert stats["idle"] == 0
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor, fetch_page, keyset_filter
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"id": "run-2", "created_at": "2024-05-01T10:00:00+00:00"}, "created_at")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2024-05-01T10:00:00+00:00", "run-2")
+
+
+def test_cursor_keeps_non_string_sort_values():
+    cursor = encode_cursor({"id": "a", "results_count": 42}, "results_count")
+    assert decode_cursor(cursor) == (42, "a")
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "e30"])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_filter_follows_sort_direction():
+    cursor = encode_cursor({"id": "b", "created_at": "t"}, "created_at")
+    assert keyset_filter("created_at", -1, cursor) == {
+        "$or": [{"created_at": {"$lt": "t"}}, {"created_at": "t", "id": {"$lt": "b"}}, {"created_at": None}]
+    }
+    assert keyset_filter("created_at", 1, cursor)["$or"][0] == {"created_at": {"$gt": "t"}}
+
+
+def matches(doc, query):
+    """Evaluate the subset of MongoDB query operators keyset filters use."""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            for op, operand in condition.items():
+                if op == "$ne":
+                    if value == operand:
+                        return False
+                # Like MongoDB, $lt/$gt never match across null and non-null values
+                elif value is None or operand is None:
+                    return False
+                elif op == "$lt" and not value < operand:
+                    return False
+                elif op == "$gt" and not value > operand:
+                    return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class FakeFind:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            # Nulls sort before every other value, as in MongoDB
+            self.docs.sort(key=lambda doc: (doc.get(field) is not None, doc.get(field) or ""), reverse=direction < 0)
+        return self
+
+    def skip(self, count):
+        self.docs = self.docs[count:]
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeRuns:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeFind([dict(doc) for doc in self.docs if matches(doc, query)])
+
+
+def walk(collection, sort_field, direction, limit):
+    async def scenario():
+        seen, cursor = [], None
+        while True:
+            docs, cursor = await fetch_page(collection, {}, sort_field, direction, limit, cursor=cursor)
+            seen.extend(doc["id"] for doc in docs)
+            if cursor is None:
+                return seen
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("direction", [-1, 1])
+def test_pages_cross_the_null_boundary(direction):
+    # Queued runs have no started_at yet
+    runs = FakeRuns([
+        {"id": "r1", "started_at": "2024-05-01"},
+        {"id": "r2", "started_at": "2024-05-03"},
+        {"id": "r3", "started_at": None},
+        {"id": "r4"},
+        {"id": "r5", "started_at": "2024-05-02"},
+        {"id": "r6", "started_at": None}
+    ])
+    expected = [doc["id"] for doc in FakeFind(list(runs.docs)).sort([("started_at", direction), ("id", direction)]).docs]
+    assert walk(runs, "started_at", direction, limit=2) == expected
+    assert sorted(expected) == ["r1", "r2", "r3", "r4", "r5", "r6"]
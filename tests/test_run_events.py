@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+import run_events
+from run_events import RunEventBus, run_event_stream
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeRuns:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = 0
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        users = query["user_id"]["$in"]
+        ids = query["$or"][1]["id"]["$in"]
+        return FakeCursor([
+            dict(doc) for doc in self.docs
+            if doc["user_id"] in users and (doc["status"] in ("queued", "running") or doc["id"] in ids)
+        ])
+
+
+class FakeRunLogs:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = 0
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        return FakeCursor([
+            dict(doc) for doc in self.docs
+            if any(doc["run_id"] == branch["run_id"] and doc["seq"] > branch["seq"]["$gt"] for branch in query["$or"])
+        ])
+
+
+class FakeDb:
+    def __init__(self, runs, logs=()):
+        self.runs = FakeRuns(runs)
+        self.run_logs = FakeRunLogs(list(logs))
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_one_poll_serves_every_subscriber():
+    bus = RunEventBus()
+    bus.db = FakeDb(
+        [{"id": "r1", "user_id": "alice", "status": "running", "results_count": 3}],
+        [{"run_id": "r1", "user_id": "alice", "seq": seq, "message": f"line {seq}"} for seq in (1, 2, 3)]
+    )
+    subscriptions = [bus.subscribe("alice", "r1", after_seq=1) for _ in range(3)] + [bus.subscribe("alice")]
+
+    async def scenario():
+        last_seen = await bus._poll_runs({})
+        await bus._poll_logs({})
+        return last_seen
+
+    last_seen = asyncio.run(scenario())
+    assert last_seen == {"r1": ("running", 3)}
+    assert bus.db.runs.queries == 1
+    assert bus.db.run_logs.queries == 1
+    for subscription in subscriptions[:3]:
+        assert [(event["type"], event.get("seq")) for event in drain(subscription)] == [("run", None), ("log", 2), ("log", 3)]
+    assert [event["type"] for event in drain(subscriptions[3])] == ["run"]
+
+
+def test_only_changes_are_published():
+    bus = RunEventBus()
+    runs = [{"id": "r1", "user_id": "alice", "status": "running", "results_count": 3}]
+    bus.db = FakeDb(runs)
+    subscription = bus.subscribe("alice")
+
+    async def scenario():
+        last_seen = await bus._poll_runs({})
+        drain(subscription)
+        last_seen = await bus._poll_runs(last_seen)
+        unchanged = drain(subscription)
+        runs[0].update(status="succeeded", results_count=5)
+        last_seen = await bus._poll_runs(last_seen)
+        return unchanged, drain(subscription), last_seen
+
+    unchanged, changed, last_seen = asyncio.run(scenario())
+    assert unchanged == []
+    assert [(event["status"], event["results_count"]) for event in changed] == [("succeeded", 5)]
+    # Nobody follows the finished run, so it is no longer polled
+    assert last_seen == {}
+
+
+def test_log_polling_resumes_after_the_last_line_seen():
+    bus = RunEventBus()
+    bus.db = FakeDb([], [{"run_id": "r1", "user_id": "alice", "seq": 1, "message": "a"}])
+    subscription = bus.subscribe("alice", "r1")
+
+    async def scenario():
+        log_seqs = {}
+        await bus._poll_logs(log_seqs)
+        bus.db.run_logs.docs.append({"run_id": "r1", "user_id": "alice", "seq": 2, "message": "b"})
+        await bus._poll_logs(log_seqs)
+        bus.unsubscribe(subscription)
+        await bus._poll_logs(log_seqs)
+        return log_seqs
+
+    log_seqs = asyncio.run(scenario())
+    assert [event["seq"] for event in drain(subscription)] == [1, 2]
+    assert log_seqs == {}
+
+
+class StreamDb:
+    """runs and run_logs reads made by run_event_stream for one finished run."""
+
+    def __init__(self, run, lines):
+        self.runs = self
+        self.run_logs = LogStore(lines)
+        self.run = run
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(self.run)])
+
+
+class LogStore:
+    def __init__(self, lines):
+        self.lines = lines
+        self.reads = 0
+
+    def find(self, query, projection=None):
+        self.reads += 1
+        return FakeCursor([dict(line) for line in self.lines if line["seq"] > query["seq"]["$gt"]])
+
+
+def test_catch_up_pages_through_the_whole_backlog(monkeypatch):
+    monkeypatch.setattr(run_events, "CATCH_UP_PAGE_SIZE", 2)
+    db = StreamDb(
+        {"id": "r1", "user_id": "alice", "status": "succeeded", "results_count": 5},
+        [{"seq": seq, "message": f"line {seq}"} for seq in range(1, 6)]
+    )
+
+    async def scenario():
+        return [chunk async for chunk in run_event_stream(db, "alice", run_id="r1", after_seq=0)]
+
+    chunks = asyncio.run(scenario())
+    seqs = [json.loads(chunk.decode().split("data: ", 1)[1])["seq"] for chunk in chunks if chunk.startswith(b"event: log")]
+    assert seqs == [1, 2, 3, 4, 5]
+    assert db.run_logs.reads == 3
+    assert chunks[-1].startswith(b"event: end")
@@ -0,0 +1,56 @@
+import asyncio
+
+from run_logs import RunLogWriter
+
+
+class FakeRunLogs:
+    def __init__(self, existing=None):
+        self.docs = list(existing or [])
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = [doc for doc in self.docs if doc["run_id"] == query["run_id"]]
+        return max(docs, key=lambda doc: doc["seq"]) if docs else None
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+
+class FakeDb:
+    def __init__(self, existing=None):
+        self.run_logs = FakeRunLogs(existing)
+
+
+async def write_lines(db, messages, **kwargs):
+    writer = RunLogWriter(db, "run-1", user_id="user-1", **kwargs)
+    await writer.start()
+    for message in messages:
+        await writer.add(message)
+    await writer.close()
+    return writer
+
+
+def test_lines_are_numbered_from_one():
+    db = FakeDb()
+    asyncio.run(write_lines(db, ["a", "b", "c"], batch_size=2, flush_interval=3600))
+    assert [(doc["seq"], doc["message"]) for doc in db.run_logs.docs] == [(1, "a"), (2, "b"), (3, "c")]
+    assert all(doc["user_id"] == "user-1" and "expires_at" in doc for doc in db.run_logs.docs)
+
+
+def test_resumed_run_continues_after_existing_lines():
+    db = FakeDb([{"run_id": "run-1", "seq": 7}, {"run_id": "run-2", "seq": 40}])
+    writer = asyncio.run(write_lines(db, ["resumed"]))
+    assert writer.seq == 8
+    assert db.run_logs.docs[-1]["seq"] == 8
+
+
+def test_lines_stay_buffered_until_the_batch_fills():
+    async def scenario():
+        db = FakeDb()
+        writer = RunLogWriter(db, "run-1", batch_size=3, flush_interval=3600)
+        await writer.add("a")
+        await writer.add("b")
+        buffered = len(db.run_logs.docs)
+        await writer.add("c")
+        return buffered, len(db.run_logs.docs)
+
+    assert asyncio.run(scenario()) == (0, 3)
@@ -0,0 +1,183 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from task_manager import TaskManager, fair_share_order
+
+
+def run(run_id, user_id, created_at, priority=0):
+    return {"id": run_id, "user_id": user_id, "created_at": created_at, "priority": priority}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        return self
+
+    def limit(self, count):
+        return self
+
+    async def to_list(self, length):
+        return list(self.docs)
+
+
+class FakeRuns:
+    """Just enough of the runs collection for _claim_next_run."""
+
+    def __init__(self, queued, running_counts=None, taken=()):
+        self.queued = queued
+        self.running_counts = running_counts or {}
+        self.taken = set(taken)
+        self.claim_attempts = []
+        self.find_filter = None
+
+    def aggregate(self, pipeline):
+        return FakeCursor([{"_id": user_id, "count": count} for user_id, count in self.running_counts.items()])
+
+    def find(self, query, projection=None):
+        self.find_filter = query
+        excluded = set(query.get("user_id", {}).get("$nin", []))
+        return FakeCursor([doc for doc in self.queued if doc["user_id"] not in excluded])
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        self.claim_attempts.append(query["id"])
+        if query["id"] in self.taken:
+            return None  # Claimed by another worker in the meantime
+        doc = next(doc for doc in self.queued if doc["id"] == query["id"])
+        return {**doc, "status": "running"}
+
+
+class FakeDb:
+    def __init__(self, runs):
+        self.runs = runs
+
+
+def make_manager(runs, max_runs_per_user=2):
+    manager = TaskManager(max_runs_per_user=max_runs_per_user)
+    manager.db = FakeDb(runs)
+    return manager
+
+
+def test_users_take_turns_oldest_waiting_first():
+    candidates = [
+        run("a1", "alice", "01"), run("a2", "alice", "02"), run("a3", "alice", "03"),
+        run("b1", "bob", "04"), run("b2", "bob", "05")
+    ]
+    ordered = [doc["id"] for doc in fair_share_order(candidates, {})]
+    assert ordered == ["a1", "b1", "a2", "b2", "a3"]
+
+
+def test_users_with_fewer_running_runs_go_first():
+    candidates = [run("a1", "alice", "01"), run("b1", "bob", "02")]
+    ordered = [doc["id"] for doc in fair_share_order(candidates, {"alice": 1})]
+    assert ordered == ["b1", "a1"]
+
+
+def test_priority_only_orders_a_users_own_runs():
+    candidates = [
+        run("a1", "alice", "01"), run("a2", "alice", "02"),
+        run("b1", "bob", "03"), run("b2", "bob", "04", priority=10)
+    ]
+    ordered = [doc["id"] for doc in fair_share_order(candidates, {})]
+    # Bob's urgent run moves ahead of his own older run, not ahead of Alice
+    assert ordered == ["a1", "b2", "a2", "b1"]
+
+
+def test_no_candidates():
+    assert fair_share_order([], {}) == []
+
+
+def test_claim_takes_the_fair_share_winner():
+    runs = FakeRuns([run("a1", "alice", "01"), run("b1", "bob", "02")], running_counts={"alice": 1})
+    claimed = asyncio.run(make_manager(runs)._claim_next_run())
+    assert claimed["id"] == "b1"
+    assert runs.claim_attempts == ["b1"]
+
+
+def test_claim_skips_saturated_users():
+    runs = FakeRuns([run("a1", "alice", "01"), run("b1", "bob", "02")], running_counts={"alice": 2})
+    claimed = asyncio.run(make_manager(runs)._claim_next_run())
+    assert claimed["id"] == "b1"
+    assert runs.find_filter["user_id"] == {"$nin": ["alice"]}
+
+
+def test_claim_moves_on_when_a_run_was_taken_by_another_worker():
+    runs = FakeRuns([run("a1", "alice", "01"), run("b1", "bob", "02")], taken={"a1"})
+    claimed = asyncio.run(make_manager(runs)._claim_next_run())
+    assert claimed["id"] == "b1"
+    assert runs.claim_attempts == ["a1", "b1"]
+
+
+def test_claim_skips_runs_already_executing_locally():
+    runs = FakeRuns([run("a1", "alice", "01"), run("b1", "bob", "02")])
+    manager = make_manager(runs)
+    manager.task_locks.add("a1")
+    claimed = asyncio.run(manager._claim_next_run())
+    assert claimed["id"] == "b1"
+    assert runs.claim_attempts == ["b1"]
+
+
+def test_nothing_to_claim():
+    assert asyncio.run(make_manager(FakeRuns([]))._claim_next_run()) is None
+
+
+def test_released_leases_are_claimable_only_with_a_worker_id():
+    runs = FakeRuns([])
+    asyncio.run(make_manager(runs)._claim_next_run())
+    # Legacy runs stuck in "running" have neither a lease nor a worker_id
+    assert {"status": "running", "lease_expires_at": None, "worker_id": {"$ne": None}} in runs.find_filter["$or"]
+    assert {"status": "running", "lease_expires_at": None} not in runs.find_filter["$or"]
+
+
+class FakeUpdateResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class AbortableRuns:
+    def __init__(self, status):
+        self.status = status
+        self.update_filter = None
+
+    async def update_one(self, query, update):
+        self.update_filter = query
+        if self.status not in query["status"]["$in"]:
+            return FakeUpdateResult(0)
+        self.status = update["$set"]["status"]
+        return FakeUpdateResult(1)
+
+
+def abort(manager, runs):
+    return asyncio.run(manager.abort_run(FakeDb(runs), "r1", "alice"))
+
+
+def test_abort_marks_the_run_and_cancels_its_task():
+    manager = TaskManager()
+    cancelled = []
+
+    async def cancel_task(run_id):
+        cancelled.append(run_id)
+        return True
+
+    manager.cancel_task = cancel_task
+    runs = AbortableRuns("running")
+    assert abort(manager, runs) == (True, True)
+    assert runs.status == "aborted"
+    assert runs.update_filter == {"id": "r1", "user_id": "alice", "status": {"$in": ["running", "queued"]}}
+    assert cancelled == ["r1"]
+
+
+def test_abort_leaves_finished_runs_and_their_tasks_alone():
+    manager = TaskManager()
+
+    async def cancel_task(run_id):
+        raise AssertionError("finished runs must not be cancelled")
+
+    manager.cancel_task = cancel_task
+    runs = AbortableRuns("succeeded")
+    assert abort(manager, runs) == (False, False)
+    assert runs.status == "succeeded"